@@ -0,0 +1,32 @@
+"""
+Backend SQLite pour les installations mono-serveur.
+
+Identique au backend `django.db.backends.sqlite3`, avec :
+- des PRAGMA appliqués à chaque nouvelle connexion (journal WAL,
+  `synchronous`, `cache_size`, `mmap_size`...), passés dans
+  `OPTIONS['pragmas']`
+- des transactions `BEGIN IMMEDIATE` : le verrou d'écriture est pris dès le
+  début de `transaction.atomic()`, au lieu d'une promotion lecture -> écriture
+  en cours de transaction qui échoue immédiatement avec « database is locked »
+  quand un autre écrivain est actif (le `timeout` ne s'applique pas dans ce cas)
+"""
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Option propre à ce backend : ne pas la transmettre à sqlite3.connect()
+        self.pragmas = kwargs.pop('pragmas', {})
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -46,12 +46,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.sharding.ShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'tasks.profiling.ProfilingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -61,8 +64,16 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates du projet compactés au chargement (tasks/template_loaders.py)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'tasks.template_loaders.CompactLoader'
+                    if config('COMPACT_HTML', default=True, cast=bool)
+                    else 'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -79,20 +90,77 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': config('DB_NAME', default='eisenhower_todo'),
-        'USER': config('DB_USER', default='root'),
-        'PASSWORD': config('DB_PASSWORD', default=''),
-        'HOST': config('DB_HOST', default='127.0.0.1'),
-        'PORT': config('DB_PORT', default='3306'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+# DB_ENGINE=mysql (par défaut) ou sqlite pour une installation mono-serveur
+# sans serveur de base de données (voir config/backends/sqlite/base.py)
+DB_ENGINE = config('DB_ENGINE', default='mysql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'config.backends.sqlite',
+            # Chemin relatif au dossier du projet (ou absolu)
+            'NAME': BASE_DIR / config('SQLITE_PATH', default='db.sqlite3'),
+            'OPTIONS': {
+                # Attente maximale (secondes) d'un verrou d'écriture
+                'timeout': config('SQLITE_TIMEOUT', default=20, cast=int),
+                'pragmas': {
+                    'journal_mode': 'WAL',
+                    'synchronous': 'NORMAL',
+                    'cache_size': -config('SQLITE_CACHE_SIZE_KB', default=65536, cast=int),
+                    'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+                    'temp_store': 'MEMORY',
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': config('DB_NAME', default='eisenhower_todo'),
+            'USER': config('DB_USER', default='root'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='127.0.0.1'),
+            'PORT': config('DB_PORT', default='3306'),
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            },
+        }
     }
-}
+
+
+# Sharding des tâches par utilisateur (tasks/sharding.py) : DB_SHARDS bases
+# supplémentaires, shard0 à shardN-1, sur le même serveur que `default`
+# (fichiers <SQLITE_PATH>.shardN.sqlite3 ou bases <DB_NAME>_shardN).
+# Créer leurs tables avec `migrate --database shardN`.
+DB_SHARDS = config('DB_SHARDS', default=0, cast=int)
+
+for index in range(DB_SHARDS):
+    shard = dict(DATABASES['default'], OPTIONS=dict(DATABASES['default']['OPTIONS']))
+    if DB_ENGINE == 'sqlite':
+        shard['NAME'] = f"{DATABASES['default']['NAME']}.shard{index}.sqlite3"
+    else:
+        shard['NAME'] = f"{DATABASES['default']['NAME']}_shard{index}"
+    DATABASES[f'shard{index}'] = shard
+
+TASK_SHARDS = [f'shard{index}' for index in range(DB_SHARDS)]
+DATABASE_ROUTERS = ['tasks.sharding.ShardRouter'] if TASK_SHARDS else []
+
+
+# Password hashing
+# Coût PBKDF2 (défaut de Django 5.0 : 720000) ; les mots de passe sont
+# re-hachés au nouveau coût à la connexion suivante (voir users/hashers.py)
+
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=720000, cast=int)
+
+PASSWORD_HASHERS = [
+    'users.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
 
 
 # Password validation
@@ -144,3 +212,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'tasks:dashboard'
 LOGOUT_REDIRECT_URL = 'users:login'
+
+# Administration
+# Mode rapide pour les très grosses tables de tâches : comptages estimés,
+# pagination par clé, pas de date_hierarchy (voir tasks/admin.py)
+TASK_ADMIN_FAST_MODE = config('TASK_ADMIN_FAST_MODE', default=False, cast=bool)
+
+# Archivage : âge (en jours) des tâches terminées déplacées par archive_tasks
+TASK_ARCHIVE_AFTER_DAYS = config('TASK_ARCHIVE_AFTER_DAYS', default=90, cast=int)
+
+# Synchronisation différentielle : conservation (en jours) des traces de
+# suppression ; un client plus ancien repart d'une synchronisation complète
+TASK_SYNC_TOMBSTONE_DAYS = config('TASK_SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
+# Tâches de fond (tasks/jobs.py)
+# Sans worker (`manage.py run_worker`), laisser TASK_JOBS_ASYNC=False :
+# les jobs sont alors exécutés immédiatement dans la requête
+TASK_JOBS_ASYNC = config('TASK_JOBS_ASYNC', default=False, cast=bool)
+TASK_JOBS_CONCURRENCY = config('TASK_JOBS_CONCURRENCY', default=2, cast=int)
+TASK_JOBS_RETRY_DELAY = config('TASK_JOBS_RETRY_DELAY', default=30, cast=int)
+# Job RUNNING sans battement depuis N secondes : worker arrêté, job remis en file
+TASK_JOBS_STALE_TIMEOUT = config('TASK_JOBS_STALE_TIMEOUT', default=600, cast=int)
+
+# Profilage (tasks/profiling.py) : ?_profile=cpu ou ?_profile=mem pour le staff
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', default=50, cast=int)
+PROFILING_MEMORY_FRAMES = config('PROFILING_MEMORY_FRAMES', default=10, cast=int)
+
+# Compression des réponses (tasks/compression.py) : brotli si le paquet
+# `brotli` est installé, gzip sinon ; pas de compression sous le seuil (octets)
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# E-mails : récapitulatifs d'alertes (tasks/digest.py, manage.py send_alert_digests)
+# Backend console par défaut : les e-mails sont affichés au lieu d'être envoyés
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Eisenhower TODO <noreply@localhost>')
+# Adresse du site utilisée dans les liens des e-mails
+SITE_URL = config('SITE_URL', default='http://127.0.0.1:8000')
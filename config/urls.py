@@ -20,7 +20,13 @@ from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from tasks import profiling
+
 urlpatterns = [
+    # Profils de performance (staff uniquement)
+    path('admin/profiles/', admin.site.admin_view(profiling.profile_list), name='profile_list'),
+    path('admin/profiles/<str:name>/', admin.site.admin_view(profiling.profile_download), name='profile_download'),
+    
     path('admin/', admin.site.urls),
     
     # Applications
@@ -2,21 +2,335 @@
 Configuration de l'interface d'administration Django pour les tâches.
 """
 
-from django.contrib import admin
-from .models import Task, TaskStatistics
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import User
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import F
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.functional import cached_property
 
+from .dependencies import detach_tasks
+from .duplicates import index_task
+from .jobs import schedule_statistics_update
+from .models import (
+    AlertDigestRun, CalendarFeed, Job, Tag, Task, TaskArchive, TaskLshBucket, TaskStatistics, TaskTag, TaskTombstone,
+)
+from .sharding import shard_for_user, task_databases, use_shard
 
-@admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+
+# Paramètre GET portant le curseur de pagination par clé
+CURSOR_VAR = 'after'
+
+# Au-delà de ce nombre, les comptages filtrés sont plafonnés
+COUNT_LIMIT = 10000
+
+# Paramètre GET du shard affiché (DB_SHARDS)
+SHARD_VAR = 'shard'
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Retourne le nombre de lignes estimé par le SGBD pour la table du modèle,
+    sans parcourir la table. Retourne None si le moteur ne fournit pas
+    d'estimation.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+
+    if connection.vendor == 'mysql':
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class KeysetPage(Page):
+    """Page d'un KeysetPaginator, connaît le curseur de la page suivante."""
+
+    def __init__(self, object_list, number, paginator, next_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginateur par clé pour les grosses tables.
+
+    - Les pages sont lues avec `id < curseur ORDER BY id DESC LIMIT n`,
+      une page profonde coûte donc autant que la première (pas d'OFFSET).
+    - Le nombre total est estimé par le SGBD quand aucun filtre n'est
+      appliqué, et plafonné à COUNT_LIMIT sinon.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, cursor=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.cursor = cursor
+        self.next_cursor = None
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None:
+                self.count_is_estimate = True
+                return estimate
+
+        # Comptage borné : la base s'arrête dès COUNT_LIMIT lignes trouvées
+        count = queryset.order_by()[:COUNT_LIMIT].count()
+        self.count_is_estimate = count >= COUNT_LIMIT
+        return count
+
+    def page(self, number):
+        queryset = self.object_list.order_by('-pk')
+        if self.cursor:
+            queryset = queryset.filter(pk__lt=self.cursor)
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[:self.per_page + 1])
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            self.next_cursor = rows[-1].pk
+
+        return KeysetPage(rows, number, self, self.next_cursor)
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList qui ignore le curseur dans les filtres de l'admin."""
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    @property
+    def next_page_query(self):
+        """Query string de la page suivante (filtres conservés)."""
+        return self.get_query_string({CURSOR_VAR: self.paginator.next_cursor})
+
+    @property
+    def first_page_query(self):
+        return self.get_query_string(remove=[CURSOR_VAR])
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Choix de la base de tâches (shard) parcourue par la liste."""
+
+    title = 'base de tâches'
+    parameter_name = SHARD_VAR
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in task_databases()]
+
+    def value(self):
+        return super().value() or task_databases()[0]
+
+    def choices(self, changelist):
+        # Pas de choix « Tout » : une liste ne parcourt qu'un shard
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == alias,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        # Le shard est appliqué par ShardedAdminMixin autour de la vue
+        return queryset
+
+
+def admin_shard(request):
+    """Shard de la vue d'admin : paramètre `shard`, conservé d'une page à l'autre par les filtres préservés."""
+    alias = request.GET.get(SHARD_VAR)
+    if alias is None and '_changelist_filters' in request.GET:
+        alias = QueryDict(request.GET['_changelist_filters']).get(SHARD_VAR)
+    return alias if alias in task_databases() else task_databases()[0]
+
+
+class ShardedAdminMixin:
+    """
+    Admin d'un modèle réparti (voir `tasks/sharding.py`) : chaque vue
+    s'exécute dans le shard choisi par `ShardListFilter`, sans jointure
+    vers `auth_user` (autre base).
+    """
+
+    def _sharded(self):
+        return bool(settings.TASK_SHARDS)
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return [ShardListFilter, *list_filter] if self._sharded() else list_filter
+
+    def get_list_select_related(self, request):
+        return () if self._sharded() else super().get_list_select_related(request)
+
+    def get_search_fields(self, request):
+        search_fields = super().get_search_fields(request)
+        if self._sharded():
+            return [field for field in search_fields if 'user__' not in field]
+        return search_fields
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self._sharded():
+            # Utilisateurs lus dans la base `default`, en une requête
+            return qs.prefetch_related('user')
+        return qs
+
+    def _in_shard(self, request, view, *args, **kwargs):
+        if not self._sharded():
+            return view(request, *args, **kwargs)
+        with use_shard(admin_shard(request)):
+            response = view(request, *args, **kwargs)
+            # TemplateResponse : la liste n'est lue qu'au rendu
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self._in_shard(request, super().changelist_view, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        return self._in_shard(request, super().changeform_view, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self._in_shard(request, super().delete_view, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        return self._in_shard(request, super().history_view, object_id, extra_context)
+
+
+class TaskActionForm(ActionForm):
+    """Formulaire d'action avec le champ nécessaire à la réassignation."""
+
+    username = forms.CharField(
+        required=False,
+        label='Nouvel utilisateur',
+        help_text='Nom d\'utilisateur (action « Réassigner »)'
+    )
+
+
+def _refresh_statistics(user_ids):
+    """Planifie le recalcul des statistiques, une fois par utilisateur concerné."""
+    for user_id in set(user_ids):
+        schedule_statistics_update(user_id)
+
+
+def _bulk_update(queryset, **values):
+    """
+    Applique `values` en un seul UPDATE et retourne (nombre de lignes,
+    utilisateurs concernés) pour le recalcul des statistiques.
+    
+    Incrémente `version` comme `update_if_version` : les clients qui
+    modifient ensuite une de ces tâches reçoivent un conflit (409).
+    """
+    user_ids = set(queryset.order_by().values_list('user_id', flat=True).distinct())
+    values['version'] = F('version') + 1
+    values['updated_at'] = timezone.now()
+    updated = queryset.update(**values)
+    return updated, user_ids
+
+
+def _make_move_action(quadrant):
+    scores = Task.QUADRANT_SCORES[quadrant]
+
+    def action(modeladmin, request, queryset):
+        updated, user_ids = _bulk_update(
+            queryset,
+            urgency_score=scores['urgency'],
+            importance_score=scores['importance'],
+            quadrant=quadrant,
+        )
+        _refresh_statistics(user_ids)
+        modeladmin.message_user(
+            request, f'{updated} tâche(s) déplacée(s) vers {quadrant}.', messages.SUCCESS
+        )
+
+    action.__name__ = f'move_to_{quadrant.lower()}'
+    action.short_description = f'Déplacer vers {quadrant}'
+    return action
+
+
+@admin.action(description='Marquer comme terminées')
+def mark_done(modeladmin, request, queryset):
+    """Marque la sélection comme terminée en un seul UPDATE."""
+    recurring = list(queryset.exclude(status='DONE').exclude(recurrence=''))
+    updated, user_ids = _bulk_update(queryset.exclude(status='DONE'), status='DONE')
+    for task in recurring:
+        task.spawn_next_occurrence()
+    _refresh_statistics(user_ids)
+    modeladmin.message_user(request, f'{updated} tâche(s) marquée(s) comme terminée(s).', messages.SUCCESS)
+
+
+@admin.action(description='Réassigner à un autre utilisateur')
+def reassign(modeladmin, request, queryset):
+    """Transfère la sélection vers l'utilisateur saisi dans le formulaire d'action."""
+    username = request.POST.get('username', '').strip()
+    target = User.objects.filter(username=username).first()
+
+    if target is None:
+        modeladmin.message_user(request, f'Utilisateur « {username} » introuvable.', messages.ERROR)
+        return
+
+    if shard_for_user(target.pk) != queryset.db:
+        # Un UPDATE laisserait les tâches dans la base de l'ancien utilisateur
+        modeladmin.message_user(
+            request, f'{target.username} est dans une autre base de tâches : réassignation impossible.', messages.ERROR
+        )
+        return
+
+    # Les tâches disparaissent pour leurs anciens propriétaires (synchronisation)
+    TaskTombstone.record(queryset.exclude(user=target).only('pk', 'user_id'), using=queryset.db)
+    # Dépendances vers les tâches de l'ancien propriétaire, invisibles pour le nouveau,
+    # et étiquettes de l'ancien propriétaire (`Tag` appartient à un utilisateur)
+    moved = queryset.exclude(user=target).values_list('pk', flat=True)
+    detach_tasks(moved, using=queryset.db)
+    TaskTag.objects.using(queryset.db).filter(task__in=moved).delete()
+    # Les seaux LSH portent l'utilisateur (index `(user, key)`)
+    TaskLshBucket.objects.using(queryset.db).filter(task__in=queryset.values('pk')).update(user=target)
+    updated, user_ids = _bulk_update(queryset, user=target)
+    user_ids.add(target.pk)
+    _refresh_statistics(user_ids)
+    modeladmin.message_user(request, f'{updated} tâche(s) réassignée(s) à {target.username}.', messages.SUCCESS)
+
+
+class TaskAdmin(ShardedAdminMixin, admin.ModelAdmin):
     """
     Interface d'administration pour les tâches.
     """
     list_display = ['title', 'user', 'quadrant', 'status', 'urgency_score', 'importance_score', 'due_date', 'created_at']
     list_filter = ['quadrant', 'status', 'urgency_score', 'importance_score', 'created_at']
     search_fields = ['title', 'description', 'user__username']
+    list_select_related = ['user']
     readonly_fields = ['quadrant', 'created_at', 'updated_at']
     date_hierarchy = 'due_date'
-    
+    action_form = TaskActionForm
+    actions = [mark_done] + [_make_move_action(q) for q in Task.QUADRANT_SCORES] + [reassign]
+
     fieldsets = (
         ('Informations de base', {
             'fields': ('user', 'title', 'description')
@@ -27,25 +341,143 @@ class TaskAdmin(admin.ModelAdmin):
         ('Dates', {
             'fields': ('due_date', 'status', 'created_at', 'updated_at')
         }),
+        ('Récurrence', {
+            'fields': ('recurrence', 'recurrence_interval', 'recurrence_end')
+        }),
     )
-    
-    def get_queryset(self, request):
-        """Optimise les requêtes avec select_related."""
-        qs = super().get_queryset(request)
-        return qs.select_related('user')
+
+    def save_model(self, request, obj, form, change):
+        if change and 'user' in form.changed_data:
+            # Changement de propriétaire : comme l'action « Réassigner », la tâche
+            # disparaît pour l'ancien propriétaire (synchronisation)
+            TaskTombstone.record([Task(pk=obj.pk, user_id=form.initial['user'])], using=obj._state.db)
+            detach_tasks([obj], using=obj._state.db)
+            TaskTag.objects.using(obj._state.db).filter(task=obj).delete()
+        super().save_model(request, obj, form, change)
+        # Empreinte des quasi-doublons, comme les formulaires de l'application
+        if not change or {'title', 'description', 'user'} & set(form.changed_data):
+            index_task(obj, replace=change)
+
+    def delete_model(self, request, obj):
+        TaskTombstone.record([obj], using=obj._state.db)
+        detach_tasks([obj], using=obj._state.db)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        TaskTombstone.record(queryset.only('pk', 'user_id'), using=queryset.db)
+        detach_tasks(queryset.values_list('pk', flat=True), using=queryset.db)
+        super().delete_queryset(request, queryset)
+
+
+class FastTaskAdmin(TaskAdmin):
+    """
+    Variante de TaskAdmin pour les très grosses tables (TASK_ADMIN_FAST_MODE).
+
+    Pas de COUNT(*) exact, pas de date_hierarchy ni de facettes, filtres
+    limités aux colonnes indexées et pagination par clé triée sur l'id.
+    """
+    list_filter = ['quadrant', 'status']
+    search_fields = ['=user__username', '^title']
+    date_hierarchy = None
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    ordering = ['-pk']
+    sortable_by = ()
+    paginator = KeysetPaginator
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            cursor = int(request.GET.get(CURSOR_VAR, ''))
+        except ValueError:
+            cursor = None
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, cursor=cursor)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+admin.site.register(Task, FastTaskAdmin if settings.TASK_ADMIN_FAST_MODE else TaskAdmin)
 
 
 @admin.register(TaskStatistics)
-class TaskStatisticsAdmin(admin.ModelAdmin):
+class TaskStatisticsAdmin(ShardedAdminMixin, admin.ModelAdmin):
     """
     Interface d'administration pour les statistiques.
     """
     list_display = ['user', 'total_tasks_created', 'total_tasks_completed', 'completion_rate', 'last_updated']
-    readonly_fields = ['q1_completed', 'q2_completed', 'q3_completed', 'q4_completed', 
+    readonly_fields = ['q1_completed', 'q2_completed', 'q3_completed', 'q4_completed',
                        'total_tasks_created', 'total_tasks_completed', 'last_updated']
     search_fields = ['user__username']
-    
+
     def completion_rate(self, obj):
         """Affiche le taux de complétion."""
         return f"{obj.completion_rate}%"
     completion_rate.short_description = 'Taux de complétion'
+
+
+@admin.register(Tag)
+class TagAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    """
+    Interface d'administration pour les étiquettes.
+    """
+    list_display = ['name', 'user', 'created_at']
+    search_fields = ['name', 'user__username']
+    list_select_related = ['user']
+    readonly_fields = ['created_at']
+
+
+@admin.action(description='Restaurer dans les tâches')
+def restore_archives(modeladmin, request, queryset):
+    """Replace les tâches archivées sélectionnées dans la table des tâches."""
+    restored = 0
+    for archive in queryset:
+        archive.restore()
+        restored += 1
+    modeladmin.message_user(request, f'{restored} tâche(s) restaurée(s).', messages.SUCCESS)
+
+
+@admin.register(TaskArchive)
+class TaskArchiveAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    """
+    Interface d'administration pour les tâches archivées.
+    """
+    list_display = ['title', 'user', 'quadrant', 'completed_at', 'archived_at']
+    list_filter = ['quadrant']
+    search_fields = ['title', 'user__username']
+    list_select_related = ['user']
+    readonly_fields = ['original_id', 'description', 'archived_at']
+    exclude = ['description_zlib']
+    actions = [restore_archives]
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les flux agenda (supprimer un flux révoque son adresse).
+    """
+    list_display = ['user', 'created_at']
+    search_fields = ['user__username']
+    readonly_fields = ['token', 'created_at']
+    list_select_related = ['user']
+
+
+@admin.register(AlertDigestRun)
+class AlertDigestRunAdmin(admin.ModelAdmin):
+    """
+    Historique des envois de récapitulatifs d'alertes (filigrane `until`,
+    progression des exécutions interrompues).
+    """
+    list_display = ['until', 'digests_sent', 'task_count', 'created_at', 'completed_at']
+    readonly_fields = [
+        'since', 'until', 'shard', 'last_user_id', 'digests_sent', 'task_count', 'created_at', 'completed_at',
+    ]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les tâches de fond.
+    """
+    list_display = ['name', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['attempts', 'locked_at', 'created_at', 'finished_at', 'last_error']
@@ -0,0 +1,191 @@
+"""
+Analyses de productivité de la page Statistiques.
+
+L'historique d'un utilisateur (tâches et archives) est chargé en colonnes
+NumPy, avec une requête `values_list()` par table. Les métriques sont
+ensuite calculées par opérations vectorisées, sans boucle par tâche :
+- délais de réalisation (création -> complétion) : médiane, p90, distribution
+- par quadrant : totaux, délais, taux de respect des échéances
+- tendance hebdomadaire des retards sur les dernières semaines
+
+Le résultat est mis en cache par version de l'historique (nombre de lignes
+et dernière modification) et par heure.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Task, TaskArchive
+
+
+QUADRANTS = ('Q1', 'Q2', 'Q3', 'Q4')
+DAY = 86400.0
+WEEK = 7 * DAY
+TREND_WEEKS = 12
+CACHE_TIMEOUT = 3600
+
+# Bornes (en jours) de la distribution des délais de réalisation
+LEAD_TIME_BINS = (0, 1, 3, 7, 28, np.inf)
+LEAD_TIME_LABELS = ('< 1 jour', '1 à 3 jours', '3 à 7 jours', '1 à 4 semaines', '> 4 semaines')
+
+
+def _timestamps(values):
+    """Colonne de datetimes -> secondes depuis l'epoch (NaN pour None)."""
+    return np.fromiter(
+        (np.nan if value is None else value.timestamp() for value in values),
+        dtype=np.float64,
+        count=len(values),
+    )
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 1) if values.size else None
+
+
+class TaskHistory:
+    """
+    Historique d'un utilisateur en colonnes : une ligne par tâche, active,
+    terminée ou archivée. Les dates sont en secondes depuis l'epoch ;
+    `completed` vaut NaN pour les tâches non terminées.
+    """
+
+    def __init__(self, created, due, completed, quadrant):
+        self.created = created
+        self.due = due
+        self.completed = completed
+        self.quadrant = quadrant  # 0 à 3 pour Q1 à Q4
+
+    def __len__(self):
+        return self.created.size
+
+    @classmethod
+    def load(cls, user):
+        task_rows = list(
+            Task.objects.filter(user=user).order_by().values_list(
+                'created_at', 'due_date', 'updated_at', 'status', 'quadrant',
+            )
+        )
+        archive_rows = list(
+            TaskArchive.objects.filter(user=user).order_by().values_list(
+                'created_at', 'due_date', 'completed_at', 'quadrant',
+            )
+        )
+
+        # Tâches terminées : la date de complétion est la dernière modification
+        rows = [
+            (created, due, updated if status == 'DONE' else None, quadrant)
+            for created, due, updated, status, quadrant in task_rows
+        ]
+        rows.extend(archive_rows)
+
+        columns = list(zip(*rows)) if rows else [()] * 4
+        count = len(rows)
+        return cls(
+            created=_timestamps(columns[0]),
+            due=_timestamps(columns[1]),
+            completed=_timestamps(columns[2]),
+            quadrant=np.fromiter((int(q[1]) - 1 for q in columns[3]), dtype=np.int8, count=count),
+        )
+
+    def compute(self, now):
+        """Calcule toutes les métriques par rapport à l'instant `now`."""
+        now_ts = now.timestamp()
+        done = ~np.isnan(self.completed)
+        # Horloges décalées (tâches restaurées...) : pas de délai négatif
+        lead_days = np.maximum(self.completed - self.created, 0) / DAY
+        on_time = done & (self.completed <= self.due)
+
+        done_lead = lead_days[done]
+        histogram, _ = np.histogram(done_lead, bins=LEAD_TIME_BINS)
+
+        quadrants = {}
+        for index, name in enumerate(QUADRANTS):
+            in_quadrant = self.quadrant == index
+            quadrant_done = in_quadrant & done
+            completed = int(quadrant_done.sum())
+            quadrants[name] = {
+                'total': int(in_quadrant.sum()),
+                'completed': completed,
+                'active': int((in_quadrant & ~done).sum()),
+                'lead_p50': _percentile(lead_days[quadrant_done], 50),
+                'lead_p90': _percentile(lead_days[quadrant_done], 90),
+                'on_time_rate': round(100 * int((in_quadrant & on_time).sum()) / completed) if completed else None,
+            }
+
+        return {
+            'total': len(self),
+            'completed': int(done.sum()),
+            'overdue_open': int((~done & (self.due < now_ts)).sum()),
+            'lead_p50': _percentile(done_lead, 50),
+            'lead_p90': _percentile(done_lead, 90),
+            'lead_mean': round(float(done_lead.mean()), 1) if done_lead.size else None,
+            'on_time_rate': round(100 * int(on_time.sum()) / done_lead.size) if done_lead.size else None,
+            'lead_distribution': [
+                {
+                    'label': label,
+                    'count': int(count),
+                    'percent': round(100 * int(count) / done_lead.size) if done_lead.size else 0,
+                }
+                for label, count in zip(LEAD_TIME_LABELS, histogram)
+            ],
+            'quadrants': quadrants,
+            'weekly_trend': self._weekly_trend(now, now_ts, done),
+        }
+
+    def _weekly_trend(self, now, now_ts, done):
+        """
+        Pour chacune des TREND_WEEKS dernières semaines : tâches échues dans
+        la semaine, part terminée en retard ou toujours ouverte, et nombre de
+        tâches terminées.
+        """
+        # Semaine 0 = les 7 derniers jours
+        due_week = np.floor((now_ts - self.due) / WEEK)
+        in_window = (self.due <= now_ts) & (due_week < TREND_WEEKS)
+        late = ~done | (self.completed > self.due)
+
+        weeks = due_week[in_window].astype(np.intp)
+        due_counts = np.bincount(weeks, minlength=TREND_WEEKS)
+        late_counts = np.bincount(weeks, weights=late[in_window], minlength=TREND_WEEKS)
+
+        completed_week = np.floor((now_ts - self.completed[done]) / WEEK)
+        completed_week = completed_week[(completed_week >= 0) & (completed_week < TREND_WEEKS)].astype(np.intp)
+        completed_counts = np.bincount(completed_week, minlength=TREND_WEEKS)
+
+        return [
+            {
+                'start': now - timedelta(weeks=week + 1),
+                'due': int(due_counts[week]),
+                'late': int(late_counts[week]),
+                'late_rate': round(100 * float(late_counts[week]) / due_counts[week]) if due_counts[week] else None,
+                'completed': int(completed_counts[week]),
+            }
+            for week in reversed(range(TREND_WEEKS))
+        ]
+
+
+def history_version(user):
+    """Version de l'historique : change à chaque création, modification, suppression ou archivage."""
+    tasks = Task.objects.filter(user=user).aggregate(n=Count('id'), last=Max('updated_at'))
+    archives = TaskArchive.objects.filter(user=user).aggregate(n=Count('id'), last=Max('archived_at'))
+    parts = (tasks['n'], tasks['last'], archives['n'], archives['last'])
+    return '-'.join(str(part.timestamp() if hasattr(part, 'timestamp') else part) for part in parts)
+
+
+def get_analytics(user, now=None):
+    """
+    Retourne les métriques de productivité de l'utilisateur (voir
+    `TaskHistory.compute`), depuis le cache si l'historique n'a pas changé.
+    """
+    # Heure pleine : les tendances restent stables pendant la durée du cache
+    now = (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+    key = f'analytics:{user.pk}:{history_version(user)}:{int(now.timestamp())}'
+
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = TaskHistory.load(user).compute(now)
+        cache.set(key, analytics, CACHE_TIMEOUT)
+    return analytics
@@ -0,0 +1,229 @@
+"""
+API JSON de lecture des tâches.
+
+`GET /tasks/api/tasks/` liste les tâches de l'utilisateur connecté :
+- filtres identiques à ceux du dashboard (`TaskFilterForm` : status,
+  quadrant, search, tag)
+- `fields=` : sous-ensemble des colonnes retournées, seules ces colonnes sont
+  lues en base (`values()`) ; la description est exclue par défaut
+- pagination par curseur opaque (clé `(due_date, id)`) : chaque page est
+  une requête sur l'index `(user, due_date)`, sans OFFSET ni COUNT, quel que
+  soit son rang
+- sérialisation avec `orjson` si le paquet est installé
+
+`GET /tasks/api/sync/?since=<jeton>` : synchronisation différentielle
+(tâches modifiées et supprimées depuis le jeton), voir `tasks/sync.py`.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .forms import TaskFilterForm
+from .models import Task
+from .sync import SYNC_LAG, SYNC_LIMIT, changes, task_rows, tombstone_cutoff
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle : module json standard
+    orjson = None
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Colonnes publiées (la clé primaire est toujours incluse sous le nom `id`)
+COLUMN_FIELDS = (
+    'title', 'description', 'due_date', 'status', 'quadrant',
+    'urgency_score', 'importance_score', 'recurrence',
+    'created_at', 'updated_at', 'version',
+)
+# Indicateurs calculés en SQL (`Task.objects.with_flags`)
+FLAG_FIELDS = ('is_overdue', 'is_due_soon', 'priority')
+DEFAULT_FIELDS = tuple(field for field in COLUMN_FIELDS if field != 'description')
+
+
+class ApiError(Exception):
+    """Paramètre de requête invalide (réponse 400)."""
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Type non sérialisable : {type(value).__name__}')
+
+
+def json_response(data, status=200):
+    """Réponse JSON compacte (orjson si disponible, même format de dates sinon)."""
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def encode_cursor(due_date, pk):
+    """Curseur opaque désignant la dernière tâche d'une page."""
+    raw = f'{due_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        due_date, pk = raw.split('|')
+        return datetime.fromisoformat(due_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ApiError('Curseur invalide.')
+
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field != 'id' and field not in COLUMN_FIELDS + FLAG_FIELDS]
+    if unknown:
+        raise ApiError(f"Champ(s) inconnu(s) : {', '.join(unknown)}.")
+    return tuple(field for field in fields if field != 'id')
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError('Paramètre limit invalide.')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def task_page(user, params):
+    """
+    Retourne (résultats, curseur suivant ou None) pour les paramètres GET.
+    Lève ApiError si un paramètre est invalide.
+    """
+    filter_form = TaskFilterForm(params)
+    if not filter_form.is_valid():
+        raise ApiError('Filtres invalides.')
+    status = filter_form.cleaned_data.get('status')
+    quadrant = filter_form.cleaned_data.get('quadrant')
+    search = filter_form.cleaned_data.get('search')
+    tag = filter_form.cleaned_data.get('tag')
+
+    fields = parse_fields(params.get('fields'))
+    limit = parse_limit(params.get('limit'))
+
+    tasks = Task.objects.filter(user=user)
+    if status:
+        tasks = tasks.filter(status=status)
+    if quadrant:
+        tasks = tasks.filter(quadrant=quadrant)
+    if search:
+        tasks = tasks.filter(Q(title__icontains=search) | Q(description__icontains=search))
+    if tag:
+        tasks = tasks.tagged(user, tag)
+
+    cursor = params.get('cursor')
+    if cursor:
+        due_date, pk = decode_cursor(cursor)
+        tasks = tasks.filter(Q(due_date__gt=due_date) | Q(due_date=due_date, pk__gt=pk))
+
+    if any(field in FLAG_FIELDS for field in fields):
+        tasks = tasks.with_flags()
+
+    # La clé du curseur est toujours lue, même si elle n'est pas demandée
+    columns = ['pk', 'due_date', *(field for field in fields if field != 'due_date')]
+    rows = list(tasks.order_by('due_date', 'pk').values(*columns)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['due_date'], rows[-1]['pk'])
+
+    results = [
+        {'id': row['pk'], **{field: row[field] for field in fields}}
+        for row in rows
+    ]
+    return results, next_cursor
+
+
+@require_GET
+def task_list(request):
+    """
+    Liste paginée des tâches de l'utilisateur connecté.
+
+    Réponse : `{"results": [...], "next": <URL de la page suivante ou null>}`.
+    """
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Authentification requise.'}, status=401)
+
+    try:
+        results, next_cursor = task_page(request.user, request.GET)
+    except ApiError as error:
+        return json_response({'error': str(error)}, status=400)
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+    return json_response({'results': results, 'next': next_url})
+
+
+def sync_page(user, params, now=None):
+    """
+    Changements depuis le jeton `since` (tous si absent ou expiré).
+    Lève ApiError si le jeton est invalide.
+    """
+    now = now or timezone.now()
+    token = params.get('since')
+    since = decode_cursor(token) if token else None
+    reset = since is None or since[0] < tombstone_cutoff(now)
+    if reset:
+        since = None
+
+    rows = changes(user, since, limit=SYNC_LIMIT + 1)
+    more = len(rows) > SYNC_LIMIT
+    rows = rows[:SYNC_LIMIT]
+
+    if more:
+        next_since = rows[-1][:2]
+    else:
+        # Recul de SYNC_LAG, sans jamais revenir avant le jeton reçu
+        floor = (now - SYNC_LAG, 0)
+        next_since = max(since, floor) if since else floor
+
+    tasks = task_rows(user, [pk for _, pk, deleted in rows if not deleted], COLUMN_FIELDS)
+    return {
+        'tasks': [{'id': row['pk'], **{field: row[field] for field in COLUMN_FIELDS}} for row in tasks],
+        'deleted': [pk for _, pk, deleted in rows if deleted],
+        'reset': reset,
+        'more': more,
+        'next': encode_cursor(*next_since),
+    }
+
+
+@require_GET
+def task_sync(request):
+    """
+    Synchronisation différentielle des tâches de l'utilisateur connecté.
+
+    Réponse : `{"tasks": [...], "deleted": [id...], "reset": bool,
+    "more": bool, "next": <jeton>}`. Avec `reset`, le client remplace ses
+    données locales ; avec `more`, il rappelle aussitôt avec `next`.
+    """
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Authentification requise.'}, status=401)
+
+    try:
+        payload = sync_page(request.user, request.GET)
+    except ApiError as error:
+        return json_response({'error': str(error)}, status=400)
+    return json_response(payload)
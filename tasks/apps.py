@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TasksConfig(AppConfig):
     name = 'tasks'
+
+    def ready(self):
+        if settings.TASK_SHARDS:
+            from django.contrib.auth.models import User
+            from django.db.models.signals import pre_delete
+
+            from .sharding import delete_user_shard_rows
+
+            pre_delete.connect(delete_user_shard_rows, sender=User, dispatch_uid='tasks.sharding')
@@ -0,0 +1,146 @@
+"""
+Compression des réponses (brotli ou gzip).
+
+Comme `django.middleware.gzip.GZipMiddleware`, avec en plus :
+- brotli quand le client l'accepte et que le paquet `brotli` est installé
+- un seuil configurable (`COMPRESSION_MIN_SIZE`) en dessous duquel la
+  réponse est envoyée telle quelle
+"""
+
+import gzip
+import io
+import re
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : gzip uniquement
+    brotli = None
+
+
+BROTLI_QUALITY = 5  # Bon compromis vitesse / taille pour du HTML dynamique
+
+# Même protection contre BREACH que GZipMiddleware (nom de fichier gzip aléatoire)
+GZIP_MAX_RANDOM_BYTES = 100
+
+ACCEPT_ENCODING_TOKEN = re.compile(r'\s*([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+
+
+def accepted_encodings(header):
+    """Encodages acceptés par le client (q > 0), d'après Accept-Encoding."""
+    accepted = set()
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_TOKEN.match(item)
+        if not match:
+            continue
+        try:
+            quality = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(match[1].lower())
+    return accepted
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+        # Envoyer chaque morceau sans attendre la fin de la réponse
+        data = compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _gzip_sequence(sequence):
+    """
+    Comme `django.utils.text.compress_sequence` (nom de fichier aléatoire
+    contre BREACH), en vidant le compresseur après chaque morceau : une page
+    envoyée en flux arrive au navigateur section par section.
+    """
+    buffer = io.BytesIO()
+    filename = f'{get_random_string(secrets.randbelow(GZIP_MAX_RANDOM_BYTES))}.txt'
+    with gzip.GzipFile(filename=filename, mode='wb', compresslevel=6, fileobj=buffer, mtime=0) as zfile:
+        for chunk in sequence:
+            zfile.write(chunk)
+            zfile.flush()
+            data = _drain(buffer)
+            if data:
+                yield data
+    yield _drain(buffer)
+
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses de plus de `COMPRESSION_MIN_SIZE` octets.
+
+    À placer en tête de MIDDLEWARE : les middlewares situés au-dessus
+    verraient le contenu compressé.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                # Réponses asynchrones : laissées telles quelles
+                return response
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = _gzip_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # Le contenu compressé n'est plus identique octet par octet
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
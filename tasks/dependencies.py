@@ -0,0 +1,191 @@
+"""
+Dépendances entre tâches (« B ne peut commencer qu'une fois A terminée »).
+
+Les dépendances directes sont dans `TaskDependency` ; leur fermeture
+transitive est maintenue à chaque modification dans `TaskClosure`, une
+ligne par couple (tâche bloquante, tâche bloquée) avec le nombre de
+chemins qui les relient :
+- « cette tâche est-elle bloquée ? » : un EXISTS sur l'index
+  (descendant, ancestor), voir `Task.objects.with_blocked()`
+- « que débloque cette tâche ? » : une requête sur l'index
+  (ancestor, descendant), voir `unblocked_by()`
+- un cycle est détecté par une seule lecture de la fermeture
+
+Ajouter ou retirer l'arc A → B ajoute ou retire, pour chaque ancêtre X de
+A (A compris) et chaque descendant Y de B (B compris), `paths(X, A) *
+paths(B, Y)` chemins entre X et Y : quelques requêtes, quelle que soit la
+profondeur du graphe. Les modifications d'un même utilisateur sont
+sérialisées par un verrou sur sa ligne `TaskStatistics`.
+
+Avant de supprimer (ou d'archiver) des tâches, `detach_tasks()` retire
+leurs dépendances directes, entrantes et sortantes : les chemins qui
+passaient par elles disparaissent de la fermeture (la cascade ne
+supprimerait que les lignes où elles figurent).
+"""
+
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Task, TaskClosure, TaskDependency, TaskStatistics
+
+
+class DependencyCycle(ValueError):
+    """La dépendance demandée créerait un cycle."""
+
+
+def _lock_graph(user_id, using):
+    TaskStatistics.objects.using(using).select_for_update().get_or_create(user_id=user_id)
+
+
+def _ancestors(task, using):
+    """{pk: nombre de chemins} des tâches qui bloquent `task`, elle comprise."""
+    rows = TaskClosure.objects.using(using).filter(descendant=task).values_list('ancestor_id', 'paths')
+    return {task.pk: 1, **dict(rows)}
+
+
+def _descendants(task, using):
+    """{pk: nombre de chemins} des tâches bloquées par `task`, elle comprise."""
+    rows = TaskClosure.objects.using(using).filter(ancestor=task).values_list('descendant_id', 'paths')
+    return {task.pk: 1, **dict(rows)}
+
+
+def _apply_paths(blocker, task, using, sign):
+    """Ajoute (sign=1) ou retire (sign=-1) les chemins passant par l'arc blocker → task."""
+    ancestors = _ancestors(blocker, using)
+    descendants = _descendants(task, using)
+    deltas = {
+        (ancestor, descendant): ancestor_paths * descendant_paths
+        for ancestor, ancestor_paths in ancestors.items()
+        for descendant, descendant_paths in descendants.items()
+    }
+
+    existing = {
+        (row.ancestor_id, row.descendant_id): row
+        for row in TaskClosure.objects.using(using).filter(ancestor__in=ancestors, descendant__in=descendants)
+    }
+
+    created, updated, emptied = [], [], []
+    for (ancestor, descendant), delta in deltas.items():
+        row = existing.get((ancestor, descendant))
+        if row is None:
+            if sign > 0:
+                created.append(TaskClosure(ancestor_id=ancestor, descendant_id=descendant, paths=delta))
+            continue
+        row.paths += sign * delta
+        (updated if row.paths > 0 else emptied).append(row)
+
+    if created:
+        TaskClosure.objects.using(using).bulk_create(created)
+    if updated:
+        TaskClosure.objects.using(using).bulk_update(updated, ['paths'])
+    if emptied:
+        TaskClosure.objects.using(using).filter(pk__in=[row.pk for row in emptied]).delete()
+
+
+def would_create_cycle(task, blockers):
+    """Tâches de `blockers` qui ne peuvent pas bloquer `task` (elle-même ou l'une des tâches qu'elle bloque)."""
+    blocker_ids = {blocker.pk for blocker in blockers}
+    if not blocker_ids:
+        return []
+    cyclic = set(
+        TaskClosure.objects.using(task._state.db)
+        .filter(ancestor=task, descendant__in=blocker_ids)
+        .values_list('descendant_id', flat=True)
+    )
+    if task.pk in blocker_ids:
+        cyclic.add(task.pk)
+    return [blocker for blocker in blockers if blocker.pk in cyclic]
+
+
+def add_dependency(task, blocker):
+    """
+    `task` dépend désormais de `blocker`. Lève DependencyCycle si `blocker`
+    dépend déjà (directement ou non) de `task`.
+    """
+    if task.user_id != blocker.user_id:
+        raise ValueError("Une tâche ne peut dépendre que d'une tâche du même utilisateur.")
+
+    using = task._state.db
+    with transaction.atomic(using=using):
+        _lock_graph(task.user_id, using)
+        if would_create_cycle(task, [blocker]):
+            raise DependencyCycle(f'« {blocker.title} » dépend déjà de « {task.title} ».')
+
+        _, created = TaskDependency.objects.using(using).get_or_create(task=task, blocker=blocker)
+        if created:
+            _apply_paths(blocker, task, using, sign=1)
+
+
+def remove_dependency(task, blocker):
+    """Retire la dépendance directe de `task` envers `blocker` (sans effet si elle n'existe pas)."""
+    using = task._state.db
+    with transaction.atomic(using=using):
+        _lock_graph(task.user_id, using)
+        deleted, _ = TaskDependency.objects.using(using).filter(task=task, blocker=blocker).delete()
+        if deleted:
+            _apply_paths(blocker, task, using, sign=-1)
+
+
+def detach_tasks(tasks, using=None):
+    """
+    Retire toutes les dépendances directes touchant `tasks` (tâches ou
+    clés primaires), à appeler avant leur suppression ou leur archivage.
+    """
+    using = using or router.db_for_write(TaskDependency)
+    pks = [getattr(task, 'pk', task) for task in tasks]
+    dependencies = list(
+        TaskDependency.objects.using(using)
+        .filter(Q(task_id__in=pks) | Q(blocker_id__in=pks))
+        .select_related('task', 'blocker')
+        .order_by('pk')
+    )
+    if not dependencies:
+        return
+
+    with transaction.atomic(using=using):
+        for user_id in sorted({dependency.task.user_id for dependency in dependencies}):
+            _lock_graph(user_id, using)
+        for dependency in dependencies:
+            dependency.delete(using=using)
+            _apply_paths(dependency.blocker, dependency.task, using, sign=-1)
+
+
+def set_dependencies(task, blockers):
+    """Remplace les dépendances directes de `task` par `blockers` (formulaire de tâche)."""
+    wanted = {blocker.pk: blocker for blocker in blockers}
+    current = {dependency.blocker_id: dependency.blocker for dependency in task.dependencies.select_related('blocker')}
+
+    with transaction.atomic(using=task._state.db):
+        for pk in current.keys() - wanted.keys():
+            remove_dependency(task, current[pk])
+        for pk in wanted.keys() - current.keys():
+            add_dependency(task, wanted[pk])
+
+
+def is_blocked(task):
+    """La tâche dépend-elle d'une tâche non terminée ? (une requête)"""
+    return (
+        TaskClosure.objects.using(task._state.db)
+        .filter(descendant=task)
+        .exclude(ancestor__status='DONE')
+        .exists()
+    )
+
+
+def unblocked_by(task):
+    """
+    Tâches non terminées que la fin de `task` débloque : `task` est leur
+    dernière tâche bloquante non terminée (une requête).
+    """
+    other_blockers = (
+        TaskClosure.objects
+        .filter(descendant=OuterRef('pk'))
+        .exclude(ancestor=task)
+        .exclude(ancestor__status='DONE')
+    )
+    return (
+        Task.objects.using(task._state.db)
+        .filter(closure_ancestors__ancestor=task)
+        .exclude(status='DONE')
+        .exclude(Exists(other_blockers))
+    )
@@ -0,0 +1,142 @@
+"""
+Récapitulatifs d'alertes par e-mail, pour tous les utilisateurs.
+
+Une exécution (`manage.py send_alert_digests`, à planifier avec cron) :
+- lit en une seule requête par base de tâches (shard), sur l'index
+  `due_date`, les tâches non terminées qui ont franchi un seuil depuis
+  l'exécution précédente (filigrane `AlertDigestRun.until`) : échéance
+  dépassée, ou échéance entrée dans les prochaines 24 heures
+- parcourt le résultat en flux (`iterator()`), trié par utilisateur, et
+  construit un récapitulatif par utilisateur
+- charge les destinataires (actifs, avec e-mail) d'un lot en une requête
+  sur la base `default`, puis envoie les e-mails du lot sur une seule
+  connexion du backend e-mail de Django (`EMAIL_BACKEND`)
+
+L'exécution (`AlertDigestRun`) est enregistrée avant le premier envoi, puis
+sa progression (shard, dernier utilisateur) après chaque lot envoyé. Après
+une erreur (serveur SMTP indisponible...), l'exécution suivante reprend la
+même fenêtre après le dernier utilisateur servi : seul le lot en échec peut
+être renvoyé. Le filigrane n'avance qu'une fois tous les lots envoyés.
+"""
+
+from datetime import timedelta
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import AlertDigestRun, Task
+from .sharding import task_databases
+
+
+DUE_SOON = timedelta(hours=24)  # Même seuil que Task.is_due_soon
+FIRST_RUN_LOOKBACK = timedelta(days=1)
+BATCH_SIZE = 100
+CHUNK_SIZE = 2000
+
+# Pas de jointure sur auth_user : les tâches peuvent être dans un autre shard
+ROW_FIELDS = ('user_id', 'pk', 'title', 'due_date', 'quadrant')
+
+
+def crossed_thresholds(since, until, using=None):
+    """
+    Tâches non terminées ayant franchi un seuil entre `since` et `until`,
+    triées par utilisateur puis échéance (tuples de `ROW_FIELDS`).
+    """
+    return (
+        Task.objects
+        .using(using)
+        .filter(
+            Q(due_date__gt=since, due_date__lte=until)
+            | Q(due_date__gt=since + DUE_SOON, due_date__lte=until + DUE_SOON)
+        )
+        .exclude(status='DONE')
+        .order_by('user_id', 'due_date', 'pk')
+        .values_list(*ROW_FIELDS)
+    )
+
+
+def build_digests(rows, until):
+    """Regroupe les lignes (triées par utilisateur) en un récapitulatif par utilisateur."""
+    for user_id, tasks in groupby(rows, key=lambda row: row[0]):
+        overdue, due_soon = [], []
+        for _, pk, title, due_date, quadrant in tasks:
+            task = {'pk': pk, 'title': title, 'due_date': due_date, 'quadrant': quadrant}
+            (overdue if due_date <= until else due_soon).append(task)
+        yield {'user_id': user_id, 'overdue': overdue, 'due_soon': due_soon}
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def recipients(user_ids):
+    """{user_id: (username, email)} des utilisateurs actifs ayant un e-mail."""
+    rows = (
+        User.objects
+        .filter(pk__in=user_ids, is_active=True)
+        .exclude(email='')
+        .values_list('pk', 'username', 'email')
+    )
+    return {pk: (username, email) for pk, username, email in rows}
+
+
+def render_digest(digest):
+    context = {**digest, 'site_url': settings.SITE_URL}
+    subject = render_to_string('emails/alert_digest_subject.txt', context).strip()
+    body = render_to_string('emails/alert_digest.txt', context)
+    return EmailMessage(subject, body, to=[digest['email']])
+
+
+def send_alert_digests(now=None, batch_size=BATCH_SIZE, connection=None):
+    """
+    Envoie les récapitulatifs des seuils franchis depuis la dernière exécution,
+    ou termine l'exécution précédente si elle a été interrompue (`now` est
+    alors ignoré : sa fenêtre est reprise telle quelle).
+
+    Returns:
+        AlertDigestRun: L'exécution terminée (nouveau filigrane)
+    """
+    run = AlertDigestRun.objects.order_by('-until').first()
+    if run is None or run.completed_at is not None:
+        until = now or timezone.now()
+        since = run.until if run else until - FIRST_RUN_LOOKBACK
+        run = AlertDigestRun.objects.create(since=since, until=until)
+
+    databases = task_databases()
+    if run.shard in databases:
+        databases = databases[databases.index(run.shard):]
+
+    connection = connection or get_connection()
+
+    with connection:
+        for alias in databases:
+            rows = crossed_thresholds(run.since, run.until, using=alias)
+            if alias == run.shard and run.last_user_id is not None:
+                rows = rows.filter(user_id__gt=run.last_user_id)
+            rows = rows.iterator(chunk_size=CHUNK_SIZE)
+            for batch in _batches(build_digests(rows, run.until), batch_size):
+                users = recipients([digest['user_id'] for digest in batch])
+                messages = []
+                for digest in batch:
+                    if digest['user_id'] not in users:
+                        continue
+                    digest['username'], digest['email'] = users[digest['user_id']]
+                    messages.append(render_digest(digest))
+                    run.task_count += len(digest['overdue']) + len(digest['due_soon'])
+                if messages:
+                    run.digests_sent += connection.send_messages(messages) or 0
+
+                # Lot envoyé : une reprise commence après son dernier utilisateur
+                run.shard, run.last_user_id = alias, batch[-1]['user_id']
+                run.save(update_fields=['shard', 'last_user_id', 'digests_sent', 'task_count'])
+
+    run.completed_at = timezone.now()
+    run.save(update_fields=['completed_at'])
+    return run
@@ -0,0 +1,276 @@
+"""
+Détection des quasi-doublons de tâches (MinHash + LSH).
+
+- texte normalisé (minuscules, sans accents ni ponctuation) du titre et de
+  la description, découpé en trigrammes de caractères
+- signature MinHash de `NUM_PERM` valeurs (`TaskFingerprint`) : la part de
+  valeurs égales entre deux signatures estime la similarité de Jaccard des
+  trigrammes
+- signature découpée en `BANDS` bandes de `ROWS` valeurs, une ligne
+  `TaskLshBucket` par bande (index `(user, key)`) : deux tâches proches
+  partagent au moins un seau avec une forte probabilité (99 % à 0,8 de
+  similarité), deux tâches éloignées rarement
+
+Formulaires (et admin, occurrences récurrentes, restaurations) : la
+signature est calculée et enregistrée à la sauvegarde, les candidats sont
+lus en une requête sur les seaux de la tâche, quel que soit le nombre de
+tâches de l'utilisateur. `manage.py find_duplicates` indexe les
+tâches sans empreinte puis parcourt les seaux une fois, triés par
+utilisateur et seau : le coût est linéaire en nombre de tâches, et seuls
+les couples candidats d'un utilisateur sont en mémoire à la fois.
+
+Seules les tâches non terminées sont comparées.
+"""
+
+import hashlib
+import re
+import unicodedata
+import zlib
+from itertools import combinations, groupby, islice
+from operator import itemgetter
+
+import numpy as np
+from django.db import transaction
+
+from .models import Task, TaskFingerprint, TaskLshBucket
+
+
+NUM_PERM = 40
+BANDS = 10
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MAX_TEXT_LENGTH = 1000
+DUPLICATE_THRESHOLD = 0.8
+MAX_CANDIDATE_ROWS = 50   # Lignes de seaux lues par le formulaire (tâche × bande)
+MAX_BUCKET_SIZE = 50      # Au-delà, seuls les premiers membres d'un seau sont comparés
+MAX_WARNINGS = 3
+
+
+def _coefficients(name):
+    """Coefficients 64 bits fixes (identiques d'un processus et d'une version à l'autre)."""
+    values = [
+        int.from_bytes(hashlib.blake2b(f'{name}:{i}'.encode(), digest_size=8).digest(), 'little')
+        for i in range(NUM_PERM)
+    ]
+    return np.array(values, dtype=np.uint64)
+
+
+# Hachage multiplicatif (a * x + b) mod 2**64 (débordement des uint64), bits de poids fort
+_A = _coefficients('minhash-a') | np.uint64(1)
+_B = _coefficients('minhash-b')
+
+
+def normalize(text):
+    """« Réunion : Budget 2024 » -> « reunion budget 2024 »."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', text.lower()).split())[:MAX_TEXT_LENGTH]
+
+
+def shingles(title, description=''):
+    text = normalize(f'{title} {description or ""}')
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, description=''):
+    """Signature MinHash (tableau de `NUM_PERM` uint32), None si le texte est vide."""
+    grams = shingles(title, description)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+    values = _A[:, None] * hashes[None, :] + _B[:, None]
+    return (values >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def to_bytes(sig):
+    return sig.astype('<u4').tobytes()
+
+
+def from_bytes(raw):
+    return np.frombuffer(bytes(raw), dtype='<u4')
+
+
+def similarity(a, b):
+    """Similarité de Jaccard estimée entre deux signatures (0 à 1)."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def band_keys(sig):
+    """Clé (entier signé 64 bits) du seau de chaque bande."""
+    raw = sig.astype('<u4').tobytes()
+    size = ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + raw[band * size:(band + 1) * size], digest_size=8).digest(),
+            'little',
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def _store(rows, using, replace):
+    """
+    Enregistre les empreintes de `rows` : tuples (pk, user_id, titre, description).
+    Retourne le nombre de signatures enregistrées.
+    """
+    fingerprints, buckets = [], []
+    indexed = 0
+    for pk, user_id, title, description in rows:
+        sig = signature(title, description)
+        if sig is None:
+            # Texte sans trigramme : empreinte vide, sans seau (jamais candidate),
+            # pour que `index_missing` ne relise pas la tâche à chaque passage
+            fingerprints.append(TaskFingerprint(task_id=pk, signature=b''))
+            continue
+        indexed += 1
+        fingerprints.append(TaskFingerprint(task_id=pk, signature=to_bytes(sig)))
+        buckets.extend(TaskLshBucket(task_id=pk, user_id=user_id, key=key) for key in band_keys(sig))
+
+    with transaction.atomic(using=using):
+        if replace:
+            pks = [row[0] for row in rows]
+            TaskLshBucket.objects.using(using).filter(task_id__in=pks).delete()
+            TaskFingerprint.objects.using(using).filter(task_id__in=pks).delete()
+        TaskFingerprint.objects.using(using).bulk_create(fingerprints)
+        TaskLshBucket.objects.using(using).bulk_create(buckets)
+    return indexed
+
+
+def index_task(task, replace=True):
+    """Calcule et enregistre l'empreinte de `task` (après création ou changement de texte)."""
+    _store([(task.pk, task.user_id, task.title, task.description)], task._state.db, replace)
+
+
+def similar_tasks(task, threshold=DUPLICATE_THRESHOLD, limit=MAX_WARNINGS):
+    """
+    Tâches non terminées de l'utilisateur proches de `task` : liste de
+    (similarité, pk, titre), la plus proche d'abord. Une requête bornée
+    par `MAX_CANDIDATE_ROWS`, indépendante du nombre de tâches.
+    """
+    sig = signature(task.title, task.description)
+    if sig is None:
+        return []
+
+    rows = (
+        TaskLshBucket.objects
+        .using(task._state.db)
+        .filter(user_id=task.user_id, key__in=band_keys(sig))
+        .exclude(task_id=task.pk)
+        .exclude(task__status='DONE')
+        .values_list('task_id', 'task__title', 'task__fingerprint__signature')[:MAX_CANDIDATE_ROWS]
+    )
+    matches = {}
+    for pk, title, raw in rows:
+        if pk not in matches and raw is not None:
+            score = similarity(sig, from_bytes(raw))
+            if score >= threshold:
+                matches[pk] = (score, pk, title)
+    return sorted(matches.values(), key=lambda match: (-match[0], match[1]))[:limit]
+
+
+def index_missing(using=None, batch_size=1000, rebuild=False, user_id=None):
+    """
+    Enregistre les empreintes des tâches qui n'en ont pas (toutes avec
+    `rebuild`), par lots ordonnés par clé primaire. Retourne leur nombre.
+    """
+    tasks = Task.objects.using(using).order_by('pk')
+    if user_id is not None:
+        tasks = tasks.filter(user_id=user_id)
+    if not rebuild:
+        tasks = tasks.filter(fingerprint__isnull=True)
+
+    indexed = last_pk = 0
+    while True:
+        rows = list(
+            tasks.filter(pk__gt=last_pk).values_list('pk', 'user_id', 'title', 'description')[:batch_size]
+        )
+        if not rows:
+            return indexed
+        indexed += _store(rows, using, replace=rebuild)
+        last_pk = rows[-1][0]
+
+
+def candidate_pairs(using=None, user_id=None, chunk_size=2000):
+    """
+    Couples (pk, pk) partageant un seau, par utilisateur : `(user_id, couples)`
+    pour chaque utilisateur, en un parcours trié des seaux.
+    """
+    # Les seaux des tâches terminées restent en base : exclus ici, ils ne
+    # prennent pas les places des `MAX_BUCKET_SIZE` membres comparés
+    buckets = TaskLshBucket.objects.using(using).exclude(task__status='DONE')
+    if user_id is not None:
+        buckets = buckets.filter(user_id=user_id)
+    rows = buckets.order_by('user_id', 'key').values_list('user_id', 'key', 'task_id').iterator(chunk_size=chunk_size)
+    for user, user_rows in groupby(rows, key=itemgetter(0)):
+        # Un couple partageant plusieurs bandes n'est compté qu'une fois
+        pairs = set()
+        for _, members in groupby(user_rows, key=itemgetter(1)):
+            pks = sorted({row[2] for row in islice(members, MAX_BUCKET_SIZE)})
+            pairs.update(combinations(pks, 2))
+        yield user, pairs
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def find_duplicates(using=None, user_id=None, threshold=DUPLICATE_THRESHOLD, batch_size=1000):
+    """
+    Groupes de quasi-doublons parmi les tâches non terminées, produits
+    utilisateur par utilisateur.
+
+    Yields:
+        dict: Groupe `{'user_id', 'tasks': [(pk, titre)...], 'score'}`,
+        `score` étant la similarité minimale des couples retenus
+    """
+    for user, pairs in candidate_pairs(using, user_id):
+        yield from _user_groups(using, user, pairs, threshold, batch_size)
+
+
+def _user_groups(using, user_id, pairs, threshold, batch_size):
+    """Groupes (union-find) des couples d'un utilisateur dont la similarité atteint `threshold`."""
+    parent, scores = {}, {}
+
+    def find(pk):
+        while parent.setdefault(pk, pk) != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    tasks = {}
+    for batch in _batches(pairs, batch_size):
+        pks = {pk for pair in batch for pk in pair} - tasks.keys()
+        rows = (
+            TaskFingerprint.objects
+            .using(using)
+            .filter(task_id__in=pks)
+            .exclude(task__status='DONE')
+            .values_list('task_id', 'task__title', 'signature')
+        )
+        tasks.update((pk, (title, from_bytes(raw))) for pk, title, raw in rows)
+
+        for first, second in batch:
+            if first not in tasks or second not in tasks:
+                continue
+            score = similarity(tasks[first][1], tasks[second][1])
+            if score >= threshold:
+                root_first, root_second = find(first), find(second)
+                parent[root_second] = root_first
+                scores[root_first] = min(score, scores.get(root_first, 1.0), scores.get(root_second, 1.0))
+
+    groups = {}
+    for pk in parent:
+        groups.setdefault(find(pk), []).append(pk)
+
+    for root, members in sorted(groups.items()):
+        if len(members) > 1:
+            yield {
+                'user_id': user_id,
+                'tasks': [(pk, tasks[pk][0]) for pk in sorted(members)],
+                'score': scores[root],
+            }
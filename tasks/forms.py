@@ -3,44 +3,109 @@ Formulaires Django pour la création et modification de tâches.
 """
 
 from django import forms
+from django.db.models import Q
 from django.utils import timezone
-from .models import Task
+from .dependencies import set_dependencies, would_create_cycle
+from .duplicates import index_task, similar_tasks
+from .models import Tag, Task
 from .services import TaskIntelligenceService
 
 
-class TaskForm(forms.ModelForm):
+class DuplicateCheckMixin:
+    """
+    Enregistre l'empreinte de la tâche quand son texte change (dans
+    `save_m2m()`) et expose `duplicates` : tâches proches déjà présentes,
+    voir `tasks/duplicates.py`.
+    """
+    duplicates = ()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._indexed = self.instance.pk is not None
+    
+    def _save_m2m(self):
+        super()._save_m2m()
+        if 'title' in self.changed_data or 'description' in self.changed_data:
+            index_task(self.instance, replace=self._indexed)
+            self.duplicates = similar_tasks(self.instance)
+
+
+class TaskForm(DuplicateCheckMixin, forms.ModelForm):
     """
     Formulaire pour créer et modifier une tâche.
     Inclut des widgets personnalisés pour une meilleure UX.
+    
+    `depends_on` : tâches à terminer avant celle-ci (voir
+    `tasks/dependencies.py`) et `tag_list` : étiquettes séparées par des
+    virgules, enregistrées par `save_m2m()`. `version` : version de la
+    tâche affichée, comparée à celle en base avant l'enregistrement (voir
+    `task_update`).
     """
     
+    version = forms.IntegerField(required=False, widget=forms.HiddenInput)
+    
+    tag_list = forms.CharField(
+        required=False,
+        label='Étiquettes',
+        help_text='Séparées par des virgules (ex : projet x, maison)',
+        widget=forms.TextInput(attrs={
+            'class': 'field',
+            'placeholder': 'projet x, maison',
+        }),
+    )
+    
+    depends_on = forms.ModelMultipleChoiceField(
+        queryset=Task.objects.none(),
+        required=False,
+        label='Dépend de',
+        help_text='Tâches à terminer avant de pouvoir commencer celle-ci',
+        widget=forms.SelectMultiple(attrs={
+            'class': 'field',
+            'size': 5,
+        }),
+    )
+    
     class Meta:
         model = Task
-        fields = ['title', 'description', 'due_date', 'urgency_score', 'importance_score', 'status']
+        fields = [
+            'title', 'description', 'due_date', 'urgency_score', 'importance_score', 'status',
+            'recurrence', 'recurrence_interval', 'recurrence_end',
+        ]
         widgets = {
             'title': forms.TextInput(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
                 'placeholder': 'Ex: Finir le rapport trimestriel',
                 'required': True,
             }),
             'description': forms.Textarea(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
                 'placeholder': 'Décrivez votre tâche en détail...',
                 'rows': 4,
             }),
             'due_date': forms.DateTimeInput(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
                 'type': 'datetime-local',
                 'required': True,
             }),
             'urgency_score': forms.Select(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
             }),
             'importance_score': forms.Select(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
             }),
             'status': forms.Select(attrs={
-                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent transition-all',
+                'class': 'field',
+            }),
+            'recurrence': forms.Select(attrs={
+                'class': 'field',
+            }),
+            'recurrence_interval': forms.NumberInput(attrs={
+                'class': 'field',
+                'min': 1,
+            }),
+            'recurrence_end': forms.DateTimeInput(attrs={
+                'class': 'field',
+                'type': 'datetime-local',
             }),
         }
         labels = {
@@ -50,15 +115,34 @@ class TaskForm(forms.ModelForm):
             'urgency_score': 'Niveau d\'urgence',
             'importance_score': 'Niveau d\'importance',
             'status': 'Statut',
+            'recurrence': 'Récurrence',
+            'recurrence_interval': 'Tous les',
+            'recurrence_end': 'Jusqu\'au (optionnel)',
         }
         help_texts = {
             'urgency_score': '1 = Pas urgent, 5 = Très urgent',
             'importance_score': '1 = Pas important, 5 = Très important',
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
         
+        # Dépendances possibles : tâches non terminées de l'utilisateur
+        user_id = user.pk if user is not None else self.instance.user_id
+        current = []
+        if self.instance.pk:
+            current = list(self.instance.dependencies.values_list('blocker_id', flat=True))
+            self.initial.setdefault('depends_on', current)
+            self.initial.setdefault('tag_list', ', '.join(self.instance.tag_names))
+            self.initial.setdefault('version', self.instance.version)
+        self.fields['depends_on'].queryset = (
+            Task.objects.filter(user_id=user_id)
+            .filter(~Q(status='DONE') | Q(pk__in=current))
+            .exclude(pk=self.instance.pk)
+            .only('pk', 'title', 'quadrant')
+            .order_by('due_date')
+        )
+        
         # Si c'est une nouvelle tâche, suggérer automatiquement les priorités
         if not self.instance.pk and self.data:
             # Auto-suggestion basée sur les données soumises
@@ -96,6 +180,27 @@ class TaskForm(forms.ModelForm):
         
         return due_date
     
+    def clean_depends_on(self):
+        """Refuse les dépendances qui créeraient un cycle."""
+        blockers = list(self.cleaned_data['depends_on'])
+        if self.instance.pk:
+            cyclic = would_create_cycle(self.instance, blockers)
+            if cyclic:
+                titles = ', '.join(f'« {task.title} »' for task in cyclic)
+                raise forms.ValidationError(f'Dépendance circulaire : {titles} dépend déjà de cette tâche.')
+        return blockers
+    
+    def clean_tag_list(self):
+        names = [Tag.normalize(name) for name in self.cleaned_data['tag_list'].split(',')]
+        return ', '.join(sorted({name for name in names if name}))
+    
+    def _save_m2m(self):
+        super()._save_m2m()
+        if 'tag_list' in self.changed_data:
+            self.instance.set_tags(self.cleaned_data['tag_list'].split(','))
+        if 'depends_on' in self.changed_data:
+            set_dependencies(self.instance, self.cleaned_data['depends_on'])
+    
     def clean(self):
         """Validation globale du formulaire."""
         cleaned_data = super().clean()
@@ -108,10 +213,15 @@ class TaskForm(forms.ModelForm):
         if title and len(title.strip()) < 3:
             raise forms.ValidationError("Le titre doit contenir au moins 3 caractères.")
         
+        recurrence_end = cleaned_data.get('recurrence_end')
+        due_date = cleaned_data.get('due_date')
+        if recurrence_end and due_date and recurrence_end < due_date:
+            raise forms.ValidationError("La fin de la récurrence doit être postérieure à l'échéance.")
+        
         return cleaned_data
 
 
-class QuickTaskForm(forms.ModelForm):
+class QuickTaskForm(DuplicateCheckMixin, forms.ModelForm):
     """
     Formulaire simplifié pour créer rapidement une tâche.
     Utilisé pour l'ajout rapide depuis le dashboard.
@@ -122,11 +232,11 @@ class QuickTaskForm(forms.ModelForm):
         fields = ['title', 'due_date']
         widgets = {
             'title': forms.TextInput(attrs={
-                'class': 'w-full px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent',
+                'class': 'field-sm w-full',
                 'placeholder': 'Nouvelle tâche rapide...',
             }),
             'due_date': forms.DateTimeInput(attrs={
-                'class': 'w-full px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500 focus:border-transparent',
+                'class': 'field-sm w-full',
                 'type': 'datetime-local',
             }),
         }
@@ -155,6 +265,7 @@ class QuickTaskForm(forms.ModelForm):
         
         if commit:
             task.save()
+            self._save_m2m()
         
         return task
 
@@ -183,7 +294,7 @@ class TaskFilterForm(forms.Form):
         choices=STATUS_CHOICES,
         required=False,
         widget=forms.Select(attrs={
-            'class': 'px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500',
+            'class': 'field-sm',
         })
     )
     
@@ -191,14 +302,26 @@ class TaskFilterForm(forms.Form):
         choices=QUADRANT_CHOICES,
         required=False,
         widget=forms.Select(attrs={
-            'class': 'px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500',
+            'class': 'field-sm',
         })
     )
     
     search = forms.CharField(
         required=False,
         widget=forms.TextInput(attrs={
-            'class': 'px-4 py-2 rounded-lg border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:ring-2 focus:ring-purple-500',
+            'class': 'field-sm',
             'placeholder': 'Rechercher une tâche...',
         })
     )
+    
+    tag = forms.CharField(
+        required=False,
+        max_length=50,
+        widget=forms.TextInput(attrs={
+            'class': 'field-sm',
+            'placeholder': 'Étiquette',
+        })
+    )
+    
+    def clean_tag(self):
+        return Tag.normalize(self.cleaned_data['tag'])
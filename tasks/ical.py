@@ -0,0 +1,229 @@
+"""
+Flux iCalendar (RFC 5545) des échéances, pour les applications d'agenda.
+
+Les agendas interrogent le flux toutes les quelques minutes ; chaque appel
+doit donc coûter le moins possible :
+- une requête d'agrégat (nombre de tâches, dernière modification) sur la
+  fenêtre d'échéances suffit à répondre `304 Not Modified` (ETag et
+  Last-Modified)
+- sinon les entrées sont produites au fil de l'eau (StreamingHttpResponse),
+  par lots, depuis une requête sur l'index (user, due_date)
+- chaque entrée sérialisée est mise en cache par (tâche, updated_at) : seules
+  les tâches modifiées depuis le dernier appel sont relues en entier
+- seule la prochaine occurrence d'une tâche récurrente existe en base : les
+  suivantes sont générées à la volée (`Task.occurrences()`) jusqu'à la fin
+  de la fenêtre, depuis une requête sur les séries actives
+"""
+
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Task
+from .sharding import shard_for_user
+
+
+# Fenêtre d'échéances publiée, autour de la date du jour
+PAST_DAYS = 30
+FUTURE_DAYS = 365
+
+BATCH_SIZE = 500
+CACHE_TIMEOUT = 7 * 86400
+
+# Type d'entrée : VEVENT (affiché par tous les agendas) ou VTODO (rappels)
+KINDS = ('event', 'todo')
+
+EVENT_DURATION = 'PT30M'
+PRODID = '-//Eisenhower TODO//Échéances//FR'
+
+# Priorité iCalendar (1 = la plus haute, 9 = la plus basse)
+QUADRANT_PRIORITY = {'Q1': 1, 'Q2': 3, 'Q3': 5, 'Q4': 9}
+TODO_STATUS = {'TODO': 'NEEDS-ACTION', 'IN_PROGRESS': 'IN-PROCESS', 'DONE': 'COMPLETED'}
+
+# Colonnes relues pour les entrées absentes du cache
+ENTRY_FIELDS = (
+    'pk', 'title', 'description', 'due_date', 'status',
+    'quadrant', 'created_at', 'updated_at',
+)
+
+
+def feed_window(now):
+    """Bornes de la fenêtre publiée, alignées sur minuit local (flux stable dans la journée)."""
+    today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+
+def feed_tasks(user, now):
+    # Flux anonyme (jeton) : la base est celle du propriétaire du jeton
+    start, end = feed_window(now)
+    return Task.objects.using(shard_for_user(user.pk)).filter(user=user, due_date__range=(start, end)).order_by()
+
+
+def feed_series(user, now):
+    """Séries récurrentes actives dont des occurrences peuvent tomber dans la fenêtre."""
+    _, end = feed_window(now)
+    return (
+        Task.objects.using(shard_for_user(user.pk))
+        .filter(user=user, due_date__lte=end)
+        .exclude(recurrence='')
+        .exclude(status='DONE')
+        .order_by()
+    )
+
+
+def feed_version(user, now, kind):
+    """
+    Retourne (etag, last_modified) du flux.
+
+    Le nombre de tâches détecte les suppressions, la dernière modification
+    les créations et mises à jour, la date du jour le glissement de la fenêtre.
+    Les séries dont l'échéance précède la fenêtre comptent aussi : leurs
+    occurrences générées y tombent.
+    """
+    stats = (feed_tasks(user, now) | feed_series(user, now)).aggregate(n=Count('id'), last=Max('updated_at'))
+    start, _ = feed_window(now)
+    today = start + timedelta(days=PAST_DAYS)
+    last_modified = max(stats['last'], today) if stats['last'] else today
+
+    parts = (kind, today.date(), stats['n'], stats['last'] and stats['last'].timestamp())
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return digest, last_modified
+
+
+def escape_text(value):
+    """Échappe une valeur TEXT (RFC 5545, 3.3.11)."""
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+        .replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Replie une ligne de contenu à 75 octets (RFC 5545, 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Ne pas couper au milieu d'un caractère UTF-8
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # l'espace de continuation compte
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def serialize_task(row, kind, uid=None):
+    """
+    Entrée VEVENT ou VTODO d'une tâche (dict de `ENTRY_FIELDS`). `uid`
+    remplace l'identifiant dérivé de la tâche (occurrences générées).
+    """
+    uid = uid or f"task-{row['pk']}"
+    lines = [
+        'BEGIN:VTODO' if kind == 'todo' else 'BEGIN:VEVENT',
+        f"UID:{uid}@eisenhower-todo",
+        # Horodatage stable : l'entrée reste identique tant que la tâche ne change pas
+        f"DTSTAMP:{format_datetime(row['updated_at'])}",
+        f"CREATED:{format_datetime(row['created_at'])}",
+        f"LAST-MODIFIED:{format_datetime(row['updated_at'])}",
+        f"SUMMARY:{escape_text(row['title'])}",
+    ]
+    if row['description']:
+        lines.append(f"DESCRIPTION:{escape_text(row['description'])}")
+    lines.append(f"PRIORITY:{QUADRANT_PRIORITY[row['quadrant']]}")
+    lines.append(f"CATEGORIES:{row['quadrant']}")
+
+    if kind == 'todo':
+        lines.append(f"DUE:{format_datetime(row['due_date'])}")
+        lines.append(f"STATUS:{TODO_STATUS[row['status']]}")
+        if row['status'] == 'DONE':
+            lines.append(f"COMPLETED:{format_datetime(row['updated_at'])}")
+        lines.append('END:VTODO')
+    else:
+        lines.append(f"DTSTART:{format_datetime(row['due_date'])}")
+        lines.append(f'DURATION:{EVENT_DURATION}')
+        lines.append('TRANSP:TRANSPARENT')
+        lines.append('END:VEVENT')
+
+    return ''.join(fold(line) for line in lines)
+
+
+def _entry_key(kind, pk, updated_at):
+    return f'ics:{kind}:{pk}:{updated_at.timestamp()}'
+
+
+def _serialize_batch(batch, kind, using):
+    """Entrées d'un lot de (pk, updated_at), depuis le cache ou la base."""
+    keys = {pk: _entry_key(kind, pk, updated_at) for pk, updated_at in batch}
+    cached = cache.get_many(keys.values())
+
+    missing = [pk for pk, key in keys.items() if key not in cached]
+    if missing:
+        fresh = {}
+        for row in Task.objects.using(using).filter(pk__in=missing).order_by().values(*ENTRY_FIELDS):
+            # Clé recalculée : la tâche a pu changer depuis la lecture du lot
+            fresh[_entry_key(kind, row['pk'], row['updated_at'])] = serialize_task(row, kind)
+            keys[row['pk']] = _entry_key(kind, row['pk'], row['updated_at'])
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    for pk, _ in batch:
+        entry = cached.get(keys[pk])
+        if entry is not None:  # Tâche supprimée entre-temps
+            yield entry
+
+
+def _serialize_occurrences(series, start, end, kind):
+    """Entrées des occurrences générées d'une série, dans la fenêtre `[start, end]`."""
+    row = {field: getattr(series, field) for field in ENTRY_FIELDS}
+    for occurrence in series.occurrences(until=end):
+        if occurrence.due_date < start:
+            continue
+        row.update(due_date=occurrence.due_date, status='TODO')
+        # UID stable tant que la série garde la même échéance
+        yield serialize_task(row, kind, uid=f"task-{series.pk}-{format_datetime(occurrence.due_date)}")
+
+
+def iter_feed(user, now, kind):
+    """Produit le calendrier morceau par morceau (un lot d'entrées à la fois)."""
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        f'{fold("PRODID:" + PRODID)}'
+        'CALSCALE:GREGORIAN\r\n'
+        'METHOD:PUBLISH\r\n'
+        f'{fold("X-WR-CALNAME:" + escape_text("Échéances – " + user.username))}'
+        'X-PUBLISHED-TTL:PT15M\r\n'
+    )
+
+    rows = feed_tasks(user, now).order_by('due_date', 'pk').values_list('pk', 'updated_at')
+    using = rows.db
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield ''.join(_serialize_batch(batch, kind, using))
+            batch = []
+    if batch:
+        yield ''.join(_serialize_batch(batch, kind, using))
+
+    start, end = feed_window(now)
+    for series in feed_series(user, now).iterator(chunk_size=BATCH_SIZE):
+        yield ''.join(_serialize_occurrences(series, start, end, kind))
+
+    yield 'END:VCALENDAR\r\n'
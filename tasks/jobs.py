@@ -0,0 +1,290 @@
+"""
+File d'attente de tâches de fond, persistée dans la base de données.
+
+- `enqueue(name, payload, dedup_key=...)` ajoute un job (ou l'exécute
+  immédiatement si `TASK_JOBS_ASYNC` est désactivé)
+- `claim_next()` réserve un job avec `SELECT ... FOR UPDATE SKIP LOCKED`
+  puis un UPDATE conditionnel (sûr aussi sur les moteurs sans verrou de ligne)
+- `manage.py run_worker` exécute les jobs avec un pool de threads ou de processus ;
+  un job en cours rafraîchit `locked_at` (battement) et chaque worker remet
+  périodiquement en file les jobs dont le battement s'est arrêté
+- `purge_user` supprime un utilisateur et son historique par lots
+  (`manage.py purge_user`, action de l'admin des utilisateurs)
+
+Aucun broker externe n'est nécessaire.
+"""
+
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, Task, TaskArchive, TaskStatistics
+from .sharding import use_user_shard
+
+
+logger = logging.getLogger(__name__)
+
+# Registre nom -> fonction
+registry = {}
+
+
+def job(name):
+    """Décorateur enregistrant une fonction comme job exécutable par le worker."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, dedup_key=None, delay=0, max_attempts=3):
+    """
+    Ajoute un job à la file.
+
+    Si un job en attente porte déjà la même `dedup_key`, aucun nouveau job
+    n'est créé et le job existant est retourné.
+
+    Quand `TASK_JOBS_ASYNC` est désactivé (par défaut), le job est exécuté
+    immédiatement dans la requête, sans passer par la table.
+    """
+    if name not in registry:
+        raise KeyError(f"Job inconnu : {name}")
+
+    payload = payload or {}
+
+    if not settings.TASK_JOBS_ASYNC:
+        registry[name](**payload)
+        return None
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload,
+                dedup_key=dedup_key,
+                max_attempts=max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        existing = Job.objects.filter(dedup_key=dedup_key).first()
+        if existing is None:
+            # Le job existant a démarré entre-temps : on en crée un nouveau
+            return enqueue(name, payload, dedup_key, delay, max_attempts)
+        return existing
+
+
+def claim_next():
+    """
+    Réserve le prochain job exécutable et le passe en RUNNING.
+
+    Returns:
+        Job ou None
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', run_after__lte=now)
+            .order_by('run_after', 'pk')
+            .first()
+        )
+        if job is None:
+            return None
+
+        # UPDATE conditionnel : un seul worker gagne, même sans FOR UPDATE
+        claimed = Job.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            dedup_key=None,
+        )
+
+    if not claimed:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def _heartbeat(job_pk, interval, done):
+    """Rafraîchit `locked_at` toutes les `interval` secondes jusqu'à la fin du job."""
+    try:
+        while not done.wait(interval):
+            Job.objects.filter(pk=job_pk, status='RUNNING').update(locked_at=timezone.now())
+    finally:
+        connections.close_all()
+
+
+def run_job(job, heartbeat=None):
+    """
+    Exécute un job réservé et enregistre son résultat (avec nouvel essai si besoin).
+
+    Args:
+        heartbeat (float): Intervalle (secondes) de rafraîchissement de
+            `locked_at` pendant l'exécution ; un job plus long que le délai
+            de `requeue_stale` n'est alors pas remis en file
+    """
+    done = threading.Event()
+    if heartbeat:
+        threading.Thread(target=_heartbeat, args=(job.pk, heartbeat, done), daemon=True).start()
+    try:
+        registry[job.name](**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Échec du job %s", job)
+
+        if job.attempts < job.max_attempts:
+            # Nouvel essai avec attente exponentielle
+            Job.objects.filter(pk=job.pk).update(
+                status='PENDING',
+                last_error=error,
+                run_after=timezone.now() + timedelta(seconds=settings.TASK_JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='FAILED',
+                last_error=error,
+                finished_at=timezone.now(),
+            )
+        return False
+    finally:
+        done.set()
+
+    Job.objects.filter(pk=job.pk).update(status='DONE', finished_at=timezone.now())
+    return True
+
+
+def requeue_stale(timeout):
+    """Remet en file les jobs RUNNING abandonnés (worker arrêté brutalement, plus de battement)."""
+    limit = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status='RUNNING', locked_at__lt=limit).update(status='PENDING')
+
+
+def work(stop_event=None, poll_interval=1.0, burst=False, stale_timeout=None):
+    """
+    Boucle d'un worker : réserve et exécute les jobs jusqu'à l'arrêt.
+
+    Les jobs abandonnés (plus de battement depuis `stale_timeout` secondes)
+    sont remis en file au démarrage puis périodiquement ; un job en cours
+    bat trois fois par délai.
+
+    Args:
+        stop_event: threading.Event / multiprocessing.Event d'arrêt (optionnel)
+        poll_interval (float): Attente (secondes) quand la file est vide
+        burst (bool): S'arrêter dès que la file est vide
+        stale_timeout (float): Délai d'abandon (`TASK_JOBS_STALE_TIMEOUT` par défaut)
+
+    Returns:
+        int: Nombre de jobs exécutés
+    """
+    stale_timeout = stale_timeout or settings.TASK_JOBS_STALE_TIMEOUT
+    heartbeat = stale_timeout / 3
+    next_sweep = 0.0
+    processed = 0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            close_old_connections()
+            if time.monotonic() >= next_sweep:
+                requeued = requeue_stale(stale_timeout)
+                if requeued:
+                    logger.warning("%d job(s) abandonné(s) remis en file", requeued)
+                next_sweep = time.monotonic() + heartbeat
+
+            job = claim_next()
+
+            if job is None:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            run_job(job, heartbeat)
+            processed += 1
+    finally:
+        # Chaque thread / processus possède ses propres connexions
+        connections.close_all()
+
+    return processed
+
+
+# ---------------------------------------------------------------------------
+# Jobs de l'application
+# ---------------------------------------------------------------------------
+
+@job('update_statistics')
+def update_statistics(user_id):
+    """Recalcule les statistiques d'un utilisateur."""
+    with use_user_shard(user_id):
+        stats, _ = TaskStatistics.objects.get_or_create(user_id=user_id)
+        stats.update_statistics()
+
+
+def schedule_statistics_update(user_id):
+    """Planifie le recalcul des statistiques (un seul job en attente par utilisateur)."""
+    return enqueue('update_statistics', {'user_id': user_id}, dedup_key=f'stats:{user_id}')
+
+
+# Taille par défaut des lots de suppression de `purge_user`
+PURGE_BATCH_SIZE = 1000
+
+
+@job('purge_user')
+def purge_user(user_id, batch_size=PURGE_BATCH_SIZE, pause=0.0, progress=None):
+    """
+    Supprime un utilisateur et tout son historique sans longue transaction.
+
+    Le compte est d'abord désactivé (plus de connexion ni de nouvelles
+    tâches), puis tâches et archives sont supprimées par lots ordonnés par
+    clé primaire, une courte transaction par lot. La ligne de l'utilisateur
+    n'est supprimée qu'à la fin, avec les quelques lignes restantes
+    (statistiques, flux agenda...).
+
+    Chaque lot étant validé, une suppression interrompue reprend simplement
+    là où elle s'était arrêtée en relançant le job ou la commande.
+
+    Args:
+        pause (float): Attente (secondes) entre deux lots, pour laisser
+            passer les écritures des autres utilisateurs
+        progress: Fonction appelée avec le nombre de lignes supprimées
+
+    Returns:
+        int: Nombre de tâches et d'archives supprimées
+    """
+    User.objects.filter(pk=user_id).update(is_active=False)
+
+    deleted = 0
+    with use_user_shard(user_id) as shard:
+        for model in (Task, TaskArchive):
+            rows = model.objects.filter(user_id=user_id).order_by('pk')
+            last_pk = 0
+            while True:
+                pks = list(rows.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+
+                with transaction.atomic(using=shard):
+                    model.objects.filter(pk__in=pks).delete()
+
+                last_pk = pks[-1]
+                deleted += len(pks)
+                if progress:
+                    progress(deleted)
+                if pause:
+                    time.sleep(pause)
+
+    with transaction.atomic():
+        User.objects.filter(pk=user_id).delete()
+    return deleted
+
+
+def schedule_user_purge(user_id):
+    """Planifie la suppression d'un utilisateur (un seul job en attente par utilisateur)."""
+    return enqueue('purge_user', {'user_id': user_id}, dedup_key=f'purge:{user_id}')
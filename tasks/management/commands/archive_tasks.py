@@ -0,0 +1,72 @@
+"""
+Commande d'archivage des tâches terminées.
+
+Supprime aussi les traces de suppression (`TaskTombstone`) plus anciennes
+que `TASK_SYNC_TOMBSTONE_DAYS`.
+
+Usage :
+    python manage.py archive_tasks
+    python manage.py archive_tasks --days 30 --batch-size 500
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.dependencies import detach_tasks
+from tasks.models import Task, TaskArchive, TaskTombstone
+from tasks.sharding import task_databases, use_shard
+from tasks.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Déplace les tâches terminées depuis plus de N jours vers la table d'archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_ARCHIVE_AFTER_DAYS,
+            help="Âge minimal (en jours depuis la complétion) des tâches à archiver",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Nombre de tâches déplacées par transaction",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        archived = pruned = 0
+        # Chaque base de tâches (shard) est traitée à son tour
+        for alias in task_databases():
+            with use_shard(alias):
+                candidates = Task.objects.filter(status='DONE', updated_at__lt=cutoff).order_by('pk')
+                last_pk = 0
+                while True:
+                    # Lots ordonnés par clé primaire : chaque transaction reste courte
+                    batch = list(candidates.filter(pk__gt=last_pk)[:batch_size])
+                    if not batch:
+                        break
+
+                    with transaction.atomic(using=alias):
+                        TaskArchive.objects.bulk_create([TaskArchive.from_task(task) for task in batch])
+                        TaskTombstone.record(batch)
+                        detach_tasks(batch, using=alias)
+                        Task.objects.filter(pk__in=[task.pk for task in batch]).delete()
+
+                    last_pk = batch[-1].pk
+                    archived += len(batch)
+                    self.stdout.write(f"{archived} tâche(s) archivée(s)...")
+
+                pruned += prune_tombstones(using=alias)
+
+        self.stdout.write(self.style.SUCCESS(f"Archivage terminé : {archived} tâche(s) déplacée(s)."))
+        if pruned:
+            self.stdout.write(f"{pruned} trace(s) de suppression expirée(s) supprimée(s).")
@@ -0,0 +1,78 @@
+"""
+Commande de détection des quasi-doublons de tâches (MinHash + LSH).
+
+Usage :
+    python manage.py find_duplicates
+    python manage.py find_duplicates --user alice --threshold 0.9
+    python manage.py find_duplicates --rebuild --batch-size 5000
+
+Indexe d'abord les tâches sans empreinte (créées en masse, modifiées par
+`QuerySet.update()`...), toutes avec `--rebuild`, puis liste les groupes
+de tâches non terminées proches.
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.duplicates import DUPLICATE_THRESHOLD, find_duplicates, index_missing
+from tasks.sharding import shard_for_user, task_databases, use_shard
+
+
+class Command(BaseCommand):
+    help = "Recherche les quasi-doublons parmi les tâches non terminées (coût linéaire)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Nom d'utilisateur (tous par défaut)")
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DUPLICATE_THRESHOLD,
+            help="Similarité minimale (0 à 1) de deux tâches d'un groupe",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Nombre de tâches indexées (ou comparées) par lot",
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Recalcule toutes les empreintes",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError("--threshold doit être compris entre 0 et 1")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+
+        user_id = None
+        databases = task_databases()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Utilisateur « {options['user']} » introuvable.")
+            user_id = user.pk
+            databases = [shard_for_user(user_id)]
+
+        groups = []
+        for alias in databases:
+            with use_shard(alias):
+                indexed = index_missing(alias, options['batch_size'], options['rebuild'], user_id)
+                if indexed:
+                    self.stdout.write(f"{alias} : {indexed} tâche(s) indexée(s).")
+                groups.extend(find_duplicates(alias, user_id, options['threshold'], options['batch_size']))
+
+        usernames = dict(User.objects.filter(pk__in={group['user_id'] for group in groups}).values_list('pk', 'username'))
+        for group in groups:
+            self.stdout.write(
+                f"{usernames.get(group['user_id'], group['user_id'])} (similarité ≥ {group['score']:.0%}) :"
+            )
+            for pk, title in group['tasks']:
+                self.stdout.write(f"  #{pk} {title}")
+
+        duplicates = sum(len(group['tasks']) - 1 for group in groups)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(groups)} groupe(s) de quasi-doublons, {duplicates} tâche(s) en trop."
+        ))
@@ -0,0 +1,443 @@
+"""
+Test de charge concurrent de l'application.
+
+Simule des utilisateurs connectés qui enchaînent un mélange pondéré de
+requêtes (dashboard, ajout rapide, changement de statut, déplacement de
+quadrant) et affiche débit, latences, temps jusqu'au premier octet (TTFB),
+taux d'erreur et verrous.
+
+Usage :
+    python manage.py loadtest --users 20 --requests 50
+    python manage.py loadtest --target asgi --pool process --concurrency 4
+    python manage.py loadtest --target http://127.0.0.1:8000 --mix dashboard=80,toggle=20
+    python manage.py loadtest --mix dashboard=100 --accept-encoding identity
+    DB_ENGINE=sqlite python manage.py loadtest   # comparer avec la base MySQL
+"""
+
+import asyncio
+import http.client
+import io
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections
+from django.test import Client
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from tasks.duplicates import index_missing
+from tasks.models import Task
+from tasks.sharding import shard_for_user, use_user_shard
+
+
+USERNAME_PREFIX = 'loadtest_'
+DEFAULT_MIX = 'dashboard=60,create=10,toggle=20,move=10'
+CSRF_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+# Erreurs de verrouillage relevées pendant le test (cibles wsgi / asgi)
+lock_errors = Counter()
+
+
+def _classify_lock_error(sender, request=None, **kwargs):
+    """Compte les attentes de verrou et interblocages remontés par la base."""
+    exc = sys.exc_info()[1]
+    if not isinstance(exc, OperationalError):
+        return
+    message = str(exc).lower()
+    if 'deadlock' in message:
+        lock_errors['deadlock'] += 1
+    elif 'lock wait timeout' in message or 'database is locked' in message:
+        lock_errors['lock_wait'] += 1
+
+
+# ---------------------------------------------------------------------------
+# Transports : appel direct WSGI / ASGI, ou serveur HTTP local
+#
+# `request()` retourne (statut, octets reçus, délai du premier octet en s) ;
+# le premier octet est celui du premier fragment non vide du corps.
+# ---------------------------------------------------------------------------
+
+class WSGITransport:
+    """Appelle directement `config.wsgi.application`."""
+
+    def __init__(self, cookies):
+        from config.wsgi import application
+        self.application = application
+        self.cookies = cookies
+
+    def request(self, method, path, data=None, headers=None):
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': '127.0.0.1',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': '127.0.0.1',
+            'HTTP_COOKIE': self.cookies,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in (headers or {}).items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        status = []
+        size = 0
+        first_byte = None
+        start = time.perf_counter()
+        result = self.application(environ, lambda s, h, exc_info=None: status.append(s))
+        try:
+            for chunk in result:
+                if chunk and first_byte is None:
+                    first_byte = time.perf_counter() - start
+                size += len(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(status[0].split()[0]), size, first_byte or time.perf_counter() - start
+
+    def close(self):
+        pass
+
+
+class ASGITransport:
+    """Appelle directement `config.asgi.application` dans une boucle asyncio dédiée."""
+
+    def __init__(self, cookies):
+        from config.asgi import application
+        self.application = application
+        self.cookies = cookies
+        self.loop = asyncio.new_event_loop()
+
+    async def _call(self, method, path, body, headers):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+        pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        status = []
+        size = 0
+        first_byte = None
+        start = time.perf_counter()
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            # Pas de déconnexion du client pendant la requête
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal size, first_byte
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                body = message.get('body', b'')
+                if body and first_byte is None:
+                    first_byte = time.perf_counter() - start
+                size += len(body)
+
+        await self.application(scope, receive, send)
+        return status[0], size, first_byte or time.perf_counter() - start
+
+    def request(self, method, path, data=None, headers=None):
+        body = urlencode(data or {}).encode()
+        headers = dict(headers or {})
+        headers.update({
+            'Host': '127.0.0.1',
+            'Cookie': self.cookies,
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Content-Length': str(len(body)),
+        })
+        return self.loop.run_until_complete(self._call(method, path, body, headers))
+
+    def close(self):
+        self.loop.close()
+
+
+class HTTPTransport:
+    """Envoie les requêtes à un serveur local (runserver, gunicorn, uvicorn...)."""
+
+    def __init__(self, cookies, base_url):
+        url = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        self.host = url.netloc
+        self.cookies = cookies
+
+    def request(self, method, path, data=None, headers=None):
+        body = urlencode(data or {})
+        headers = dict(headers or {})
+        headers.update({
+            'Host': self.host,
+            'Cookie': self.cookies,
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+        start = time.perf_counter()
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        head = response.read(1)
+        first_byte = time.perf_counter() - start
+        return response.status, len(head) + len(response.read()), first_byte
+
+    def close(self):
+        self.connection.close()
+
+
+# ---------------------------------------------------------------------------
+# Utilisateur virtuel
+# ---------------------------------------------------------------------------
+
+def _run_user(task_ids, session_key, target, mix, requests, seed, accept_encoding):
+    """
+    Exécute le scénario d'un utilisateur virtuel.
+
+    Returns:
+        tuple: (liste de (opération, latence, statut, octets reçus, TTFB), compteur de verrous)
+    """
+    rng = random.Random(seed)
+    csrf_token = get_random_string(32, CSRF_CHARS)
+    cookies = f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}'
+    post_headers = {'X-CSRFToken': csrf_token, 'X-Requested-With': 'XMLHttpRequest'}
+
+    if target == 'wsgi':
+        transport = WSGITransport(cookies)
+    elif target == 'asgi':
+        transport = ASGITransport(cookies)
+    else:
+        transport = HTTPTransport(cookies, target)
+
+    locks_before = Counter(lock_errors)
+    operations, weights = zip(*mix.items())
+    samples = []
+
+    try:
+        for _ in range(requests):
+            operation = rng.choices(operations, weights)[0]
+            task_id = rng.choice(task_ids)
+
+            if operation == 'dashboard':
+                call = ('GET', '/tasks/', None, {})
+            elif operation == 'create':
+                due_date = timezone.localtime() + timedelta(hours=rng.randint(1, 240))
+                call = ('POST', '/tasks/quick-create/', {
+                    'title': f'Tâche de charge {rng.randint(0, 10 ** 6)}',
+                    'due_date': due_date.strftime('%Y-%m-%dT%H:%M'),
+                }, post_headers)
+            elif operation == 'toggle':
+                call = ('POST', f'/tasks/{task_id}/toggle-status/', None, post_headers)
+            else:
+                call = ('POST', f'/tasks/{task_id}/update-quadrant/',
+                        {'quadrant': rng.choice(['Q1', 'Q2', 'Q3', 'Q4'])}, post_headers)
+
+            method, path, data, headers = call
+            headers = {**headers, 'Accept-Encoding': accept_encoding}
+            start = time.perf_counter()
+            try:
+                status, size, first_byte = transport.request(method, path, data, headers)
+            except Exception:
+                status, size, first_byte = 0, 0, 0.0
+            samples.append((operation, time.perf_counter() - start, status, size, first_byte))
+    finally:
+        transport.close()
+        connections.close_all()
+
+    return samples, dict(Counter(lock_errors) - locks_before)
+
+
+def _init_process():
+    import django
+    django.setup()
+    got_request_exception.connect(_classify_lock_error)
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Test de charge : utilisateurs simulés en parallèle contre l'application WSGI/ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Nombre d'utilisateurs simulés")
+        parser.add_argument('--requests', type=int, default=50, help="Requêtes par utilisateur")
+        parser.add_argument('--tasks', type=int, default=50, help="Tâches créées par utilisateur")
+        parser.add_argument('--concurrency', type=int, default=8, help="Taille du pool")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+        parser.add_argument(
+            '--target',
+            default='wsgi',
+            help="'wsgi', 'asgi' ou URL d'un serveur local (ex : http://127.0.0.1:8000)",
+        )
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Pondération des opérations ({DEFAULT_MIX})")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--accept-encoding',
+            default='br, gzip',
+            help="En-tête Accept-Encoding envoyé ('identity' pour mesurer les pages non compressées)",
+        )
+        parser.add_argument('--cleanup', action='store_true', help="Supprimer les utilisateurs de test à la fin")
+
+    def _parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            if name not in ('dashboard', 'create', 'toggle', 'move'):
+                raise CommandError(f"Opération inconnue : {name}")
+            mix[name] = float(weight or 1)
+        return mix
+
+    def _prepare_users(self, count, tasks_per_user):
+        """Crée (ou réutilise) les utilisateurs de test, leurs tâches et leurs sessions."""
+        now = timezone.now()
+        prepared = []
+
+        for index in range(count):
+            user, created = User.objects.get_or_create(username=f'{USERNAME_PREFIX}{index}')
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+
+            with use_user_shard(user.pk):
+                missing = tasks_per_user - Task.objects.filter(user=user).count()
+                if missing > 0:
+                    Task.objects.bulk_create([
+                        Task(
+                            user=user,
+                            title=f'Tâche {i}',
+                            due_date=now + timedelta(hours=i % 240 - 24),
+                            urgency_score=i % 5 + 1,
+                            importance_score=(i * 3) % 5 + 1,
+                            quadrant=Task(urgency_score=i % 5 + 1, importance_score=(i * 3) % 5 + 1).calculate_quadrant(),
+                        )
+                        for i in range(missing)
+                    ])
+                    index_missing(shard_for_user(user.pk), user_id=user.pk)
+
+            client = Client()
+            client.force_login(user)
+            session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+            with use_user_shard(user.pk):
+                task_ids = list(Task.objects.filter(user=user).values_list('pk', flat=True)[:tasks_per_user])
+            prepared.append((task_ids, session_key))
+
+        return prepared
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        target = options['target']
+        if target not in ('wsgi', 'asgi') and not target.startswith('http'):
+            raise CommandError("--target doit valoir 'wsgi', 'asgi' ou une URL http://")
+
+        if not settings.ALLOWED_HOSTS or '127.0.0.1' not in settings.ALLOWED_HOSTS:
+            self.stdout.write(self.style.WARNING("127.0.0.1 absent de ALLOWED_HOSTS : réponses 400 attendues."))
+
+        self.stdout.write(f"Préparation de {options['users']} utilisateur(s)...")
+        prepared = self._prepare_users(options['users'], options['tasks'])
+
+        got_request_exception.connect(_classify_lock_error)
+        if options['pool'] == 'process':
+            connections.close_all()
+            executor = ProcessPoolExecutor(options['concurrency'], initializer=_init_process)
+        else:
+            executor = ThreadPoolExecutor(options['concurrency'])
+
+        self.stdout.write(
+            f"Lancement ({target}, pool {options['pool']} x{options['concurrency']}, "
+            f"base {connections['default'].vendor})..."
+        )
+        started = time.perf_counter()
+        with executor:
+            futures = [
+                executor.submit(
+                    _run_user, task_ids, session_key, target, mix,
+                    options['requests'], options['seed'] + index, options['accept_encoding'],
+                )
+                for index, (task_ids, session_key) in enumerate(prepared)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        samples = [sample for user_samples, _ in results for sample in user_samples]
+        locks = Counter()
+        for _, user_locks in results:
+            locks.update(user_locks)
+        if options['pool'] == 'thread':
+            # Compteur partagé entre threads : les deltas se chevauchent
+            locks = Counter(lock_errors)
+        got_request_exception.disconnect(_classify_lock_error)
+
+        self._report(samples, elapsed, locks)
+
+        if options['cleanup']:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _report(self, samples, elapsed, locks):
+        total = len(samples)
+        errors = sum(1 for _, _, status, _, _ in samples if status == 0 or status >= 500)
+        client_errors = sum(1 for _, _, status, _, _ in samples if 400 <= status < 500)
+        received = sum(size for _, _, _, size, _ in samples)
+
+        self.stdout.write("")
+        self.stdout.write(f"Requêtes : {total} en {elapsed:.2f} s ({total / elapsed if elapsed else 0:.1f} req/s)")
+        self.stdout.write(
+            f"Erreurs : {errors} ({100 * errors / total if total else 0:.1f} %), réponses 4xx : {client_errors}"
+        )
+        self.stdout.write(
+            f"Verrous : {locks.get('lock_wait', 0)} attente(s) expirée(s), {locks.get('deadlock', 0)} interblocage(s)"
+        )
+        self.stdout.write(f"Octets reçus : {received / 1024:.1f} Kio ({received / total / 1024 if total else 0:.1f} Kio/requête)")
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'Opération':<12}{'N':>7}{'moy.':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+            f"{'TTFB p50':>10}{'TTFB p90':>10}{'Kio moy.':>10}   (ms)"
+        )
+
+        by_operation = {}
+        for operation, latency, _, size, first_byte in samples:
+            by_operation.setdefault(operation, []).append((latency * 1000, size, first_byte * 1000))
+        by_operation['total'] = [
+            (latency * 1000, size, first_byte * 1000) for _, latency, _, size, first_byte in samples
+        ]
+
+        for operation, values in by_operation.items():
+            latencies = [latency for latency, _, _ in values]
+            sizes = [size for _, size, _ in values]
+            first_bytes = [first_byte for _, _, first_byte in values]
+            self.stdout.write(
+                f"{operation:<12}{len(latencies):>7}{statistics.fmean(latencies):>10.1f}"
+                f"{_percentile(latencies, 50):>10.1f}{_percentile(latencies, 90):>10.1f}"
+                f"{_percentile(latencies, 99):>10.1f}{max(latencies):>10.1f}"
+                f"{_percentile(first_bytes, 50):>10.1f}{_percentile(first_bytes, 90):>10.1f}"
+                f"{statistics.fmean(sizes) / 1024:>10.1f}"
+            )
@@ -0,0 +1,71 @@
+"""
+Commande de suppression d'un utilisateur et de son historique, par lots.
+
+Usage :
+    python manage.py purge_user alice
+    python manage.py purge_user alice --batch-size 500 --pause 0.1 --noinput
+
+Interrompue, la commande se relance telle quelle : les lots déjà supprimés
+sont validés et la suppression reprend avec les lignes restantes.
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.jobs import PURGE_BATCH_SIZE, purge_user
+from tasks.models import Task, TaskArchive
+from tasks.sharding import use_user_shard
+
+
+class Command(BaseCommand):
+    help = "Supprime un utilisateur et ses tâches par lots (courtes transactions, reprise possible)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Nom d'utilisateur à supprimer")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help="Nombre de lignes supprimées par transaction",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help="Attente (secondes) entre deux lots",
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help="Ne pas demander de confirmation",
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"Utilisateur « {options['username']} » introuvable.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+
+        with use_user_shard(user.pk):
+            total = Task.objects.filter(user=user).count() + TaskArchive.objects.filter(user=user).count()
+
+        if options['interactive']:
+            answer = input(
+                f"Supprimer définitivement {user.username} et ses {total} tâche(s) et archive(s) ? [oui/non] "
+            )
+            if answer.strip().lower() not in ('oui', 'o', 'yes', 'y'):
+                self.stdout.write("Suppression annulée.")
+                return
+
+        deleted = purge_user(
+            user.pk,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=lambda count: self.stdout.write(f"{count}/{total} ligne(s) supprimée(s)..."),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Utilisateur {user.username} supprimé ({deleted} tâche(s) et archive(s))."
+        ))
@@ -0,0 +1,125 @@
+"""
+Commande de réconciliation des statistiques (`TaskStatistics`).
+
+Usage :
+    python manage.py reconcile_stats
+    python manage.py reconcile_stats --dry-run
+    python manage.py reconcile_stats --workers 8 --range-size 5000
+
+Calcule les compteurs exacts par plages d'identifiants d'utilisateurs,
+réparties sur un pool de processus, affiche les écarts puis les corrige
+(sauf `--dry-run`). Voir `tasks/reconcile.py`.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tasks.models import TaskStatistics
+from tasks.reconcile import STAT_FIELDS, reconcile_range, user_ranges
+from tasks.sharding import task_databases
+
+
+def _init_process():
+    import django
+    django.setup()
+
+
+def _reconcile(alias, low, high, fix):
+    try:
+        return reconcile_range(alias, low, high, fix)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Compare les statistiques enregistrées aux tâches réelles et corrige les écarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Nombre de processus (1 : dans le processus courant)",
+        )
+        parser.add_argument(
+            '--range-size',
+            type=int,
+            default=1000,
+            help="Nombre d'identifiants d'utilisateurs par plage",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les écarts sans les corriger")
+        parser.add_argument('--limit', type=int, default=20, help="Nombre d'utilisateurs détaillés dans le rapport")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers doit être positif")
+        if options['range_size'] < 1:
+            raise CommandError("--range-size doit être positif")
+
+        fix = not options['dry_run']
+        jobs = [
+            (alias, low, high, fix)
+            for alias in task_databases()
+            for low, high in user_ranges(alias, options['range_size'])
+        ]
+
+        if options['workers'] == 1 or len(jobs) < 2:
+            results = [reconcile_range(*job) for job in jobs]
+        else:
+            # Connexions non partagées avec les processus enfants
+            connections.close_all()
+            with ProcessPoolExecutor(min(options['workers'], len(jobs)), initializer=_init_process) as executor:
+                results = list(executor.map(_reconcile, *zip(*jobs)))
+
+        self._report(results, options['limit'], fix)
+
+    def _report(self, results, limit, fix):
+        drift, deleted = {}, []
+        for result in results:
+            drift.update(result['drift'])
+            deleted.extend(result['deleted'])
+        checked = sum(result['users'] for result in results)
+
+        labels = {field: TaskStatistics._meta.get_field(field).verbose_name for field in STAT_FIELDS}
+        users, gaps = Counter(), Counter()
+        missing = 0
+        for changes in drift.values():
+            for field, (stored, expected) in changes.items():
+                users[field] += 1
+                gaps[field] += abs(expected - (stored or 0))
+            missing += any(stored is None for stored, _ in changes.values())
+
+        shown = sorted(drift)[:limit]
+        usernames = dict(User.objects.filter(pk__in=shown).values_list('pk', 'username'))
+        for user_id in shown:
+            details = ', '.join(
+                f"{labels[field]} {'∅' if stored is None else stored} → {expected}"
+                for field, (stored, expected) in drift[user_id].items()
+            )
+            self.stdout.write(f"{usernames.get(user_id, user_id)} : {details}")
+        if len(drift) > len(shown):
+            self.stdout.write(f"... et {len(drift) - len(shown)} autre(s).")
+
+        for field in STAT_FIELDS:
+            if users[field]:
+                self.stdout.write(f"  {labels[field]} : {users[field]} utilisateur(s), écart cumulé {gaps[field]}")
+
+        if deleted:
+            self.stdout.write(f"  Statistiques d'utilisateurs supprimés : {len(deleted)} ligne(s)")
+
+        summary = f"{checked} utilisateur(s) vérifié(s) ({len(results)} plage(s))"
+        if not drift and not deleted:
+            self.stdout.write(self.style.SUCCESS(f"{summary}, aucun écart."))
+            return
+        summary += f", {len(drift)} en écart dont {missing} sans statistiques"
+        if deleted:
+            summary += f", {len(deleted)} utilisateur(s) supprimé(s)"
+        if fix:
+            self.stdout.write(self.style.SUCCESS(f"{summary} : corrigé(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary} (--dry-run : aucune correction)."))
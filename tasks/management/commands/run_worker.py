@@ -0,0 +1,94 @@
+"""
+Worker de la file de tâches de fond.
+
+Usage :
+    python manage.py run_worker
+    python manage.py run_worker --concurrency 4 --mode process
+    python manage.py run_worker --burst   # vide la file puis s'arrête
+"""
+
+import multiprocessing
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import jobs
+
+
+def _process_main(stop_event, poll_interval, burst, stale_timeout):
+    """Point d'entrée d'un processus worker."""
+    import django
+    django.setup()
+    return jobs.work(stop_event, poll_interval, burst, stale_timeout)
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches de fond enregistrées dans la table Job."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TASK_JOBS_CONCURRENCY,
+            help="Nombre de workers en parallèle",
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['thread', 'process'],
+            default='thread',
+            help="Pool de threads (par défaut) ou de processus",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help="Attente (secondes) quand la file est vide",
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help="S'arrêter dès que la file est vide",
+        )
+        parser.add_argument(
+            '--stale-timeout',
+            type=int,
+            default=settings.TASK_JOBS_STALE_TIMEOUT,
+            help="Remettre en file les jobs sans battement depuis plus de N secondes",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_args = (options['poll_interval'], options['burst'], options['stale_timeout'])
+
+        if options['mode'] == 'process':
+            # Les connexions ne doivent pas être partagées avec les processus fils
+            connections.close_all()
+            stop_event = multiprocessing.Event()
+            workers = [
+                multiprocessing.Process(target=_process_main, args=(stop_event, *worker_args))
+                for _ in range(concurrency)
+            ]
+        else:
+            stop_event = threading.Event()
+            workers = [
+                threading.Thread(target=jobs.work, args=(stop_event, *worker_args), daemon=True)
+                for _ in range(concurrency)
+            ]
+
+        self.stdout.write(f"Démarrage de {concurrency} worker(s) ({options['mode']})...")
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé, fin des jobs en cours...")
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS("Worker arrêté."))
@@ -0,0 +1,29 @@
+"""
+Commande d'envoi des récapitulatifs d'alertes par e-mail.
+
+Usage (à planifier, par exemple toutes les heures avec cron) :
+    python manage.py send_alert_digests
+    python manage.py send_alert_digests --batch-size 200
+"""
+
+from django.core.management.base import BaseCommand
+
+from tasks.digest import BATCH_SIZE, send_alert_digests
+
+
+class Command(BaseCommand):
+    help = "Envoie à chaque utilisateur le récapitulatif des tâches passées en retard ou dues sous 24 h."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help="Nombre d'e-mails envoyés par appel au backend",
+        )
+
+    def handle(self, *args, **options):
+        run = send_alert_digests(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{run.digests_sent} récapitulatif(s) envoyé(s), {run.task_count} tâche(s) signalée(s)."
+        ))
@@ -0,0 +1,258 @@
+"""
+Instantané en mémoire de la matrice d'Eisenhower d'un utilisateur.
+
+Les tâches actives sont chargées en une seule requête `values_list()` dans
+des enregistrements compacts (`__slots__`), répartis par quadrant. Le
+dashboard, les insights, les alertes et la recommandation sont ensuite
+calculés à partir de cet instantané sans nouvelle requête.
+
+Les indicateurs (`is_overdue`, `is_due_soon`, `priority`) sont calculés
+en SQL par `Task.objects.with_flags()` à l'horodatage unique de la requête
+(`request_now`) : toutes les cartes d'une page sont cohérentes entre elles.
+`is_blocked` (dépendance non terminée) est lu dans la même requête, sur la
+table de fermeture des dépendances (`tasks/dependencies.py`). Les
+étiquettes des tâches actives sont chargées au premier affichage d'une
+colonne, par une seconde requête quel que soit le nombre de tâches.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Task, TaskTag
+
+
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+QUADRANT_LABELS = dict(Task.QUADRANT_CHOICES)
+
+RECOMMENDATIONS = {
+    'Q1': 'À FAIRE MAINTENANT - Priorité absolue !',
+    'Q2': 'À PLANIFIER - Bloquez du temps dans votre agenda',
+    'Q3': 'À DÉLÉGUER - Peut-être confier à quelqu\'un d\'autre ?',
+    'Q4': 'À ÉLIMINER - Est-ce vraiment nécessaire ?',
+}
+
+
+def request_now(request):
+    """Horodatage de la requête, fixé au premier appel et partagé par tous les calculs."""
+    now = getattr(request, '_now', None)
+    if now is None:
+        now = timezone.now()
+        request._now = now
+    return now
+
+
+class TaskRecord:
+    """
+    Vue en lecture seule d'une tâche active.
+
+    Expose les mêmes attributs que `Task` pour les templates
+    (`task_card.html`, alertes, tâche recommandée). Les indicateurs
+    proviennent des annotations de `Task.objects.with_flags()`.
+    """
+
+    FIELDS = (
+        'pk', 'title', 'description', 'due_date', 'urgency_score',
+        'importance_score', 'status', 'quadrant', 'updated_at', 'recurrence',
+        'version', 'is_overdue', 'is_due_soon', 'priority', 'is_blocked',
+    )
+
+    __slots__ = FIELDS + ('tag_names',)
+
+    def __init__(self, row):
+        self.tag_names = []
+        (self.pk, self.title, self.description, self.due_date, self.urgency_score,
+         self.importance_score, self.status, self.quadrant, self.updated_at,
+         self.recurrence, self.version, self.is_overdue, self.is_due_soon, self.priority,
+         self.is_blocked) = row
+
+    def __str__(self):
+        return f"{self.title} ({self.get_quadrant_display()})"
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def recommendation(self):
+        """Retourne une recommandation d'action selon le quadrant."""
+        return RECOMMENDATIONS.get(self.quadrant, 'Aucune recommandation')
+
+    def get_status_display(self):
+        return STATUS_LABELS.get(self.status, self.status)
+
+    def get_quadrant_display(self):
+        return QUADRANT_LABELS.get(self.quadrant, self.quadrant)
+
+    def get_priority_score(self):
+        return self.priority
+
+
+class TaskMatrix:
+    """
+    Tâches actives (non terminées) d'un utilisateur, chargées une seule fois.
+
+    Utiliser `TaskMatrix.for_request(request)` dans les vues : l'instantané
+    est mémorisé sur la requête et partagé par tous les calculs.
+    """
+
+    QUADRANTS = ('Q1', 'Q2', 'Q3', 'Q4')
+
+    # Ordre d'affichage des colonnes du dashboard (tâches bloquées en dernier)
+    COLUMN_ORDER = {
+        'Q1': lambda t: (t.is_blocked, -t.urgency_score, t.due_date),
+        'Q2': lambda t: (t.is_blocked, -t.importance_score, t.due_date),
+        'Q3': lambda t: (t.is_blocked, t.due_date),
+        'Q4': lambda t: (t.is_blocked, t.due_date),
+    }
+
+    def __init__(self, user, now=None):
+        self.user = user
+        self.now = now or timezone.now()
+
+        rows = (
+            Task.objects.filter(user=user)
+            .exclude(status='DONE')
+            .with_flags(self.now)
+            .with_blocked()
+            .values_list(*TaskRecord.FIELDS)
+        )
+
+        # Ordre global = Meta.ordering de Task (importance, urgence, échéance)
+        self.tasks = [TaskRecord(row) for row in rows]
+        self.quadrants = {quadrant: [] for quadrant in self.QUADRANTS}
+        for task in self.tasks:
+            self.quadrants[task.quadrant].append(task)
+        self._tags_loaded = False
+
+    @classmethod
+    def for_request(cls, request):
+        """Retourne la matrice de l'utilisateur connecté, construite une fois par requête."""
+        matrix = getattr(request, '_task_matrix', None)
+        if matrix is None:
+            matrix = cls(request.user, now=request_now(request))
+            request._task_matrix = matrix
+        return matrix
+
+    def _load_tags(self):
+        """Renseigne `tag_names` de toutes les tâches actives (une requête, une seule fois)."""
+        if self._tags_loaded or not self.tasks:
+            return
+        self._tags_loaded = True
+
+        by_pk = {task.pk: task for task in self.tasks}
+        tags = (
+            TaskTag.objects.filter(task__user=self.user)
+            .exclude(task__status='DONE')
+            .order_by('tag__name')
+            .values_list('task_id', 'tag__name')
+        )
+        for task_id, name in tags:
+            if task_id in by_pk:  # Tâche terminée entre les deux requêtes
+                by_pk[task_id].tag_names.append(name)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def count(self, quadrant):
+        return len(self.quadrants[quadrant])
+
+    def column(self, quadrant, status=None, search=None, tag=None):
+        """
+        Tâches d'un quadrant dans l'ordre d'affichage du dashboard,
+        avec les filtres optionnels de `TaskFilterForm`.
+        """
+        self._load_tags()
+        tasks = self.quadrants[quadrant]
+
+        if tag:
+            tasks = [t for t in tasks if tag in t.tag_names]
+        if status:
+            tasks = [t for t in tasks if t.status == status]
+        if search:
+            needle = search.casefold()
+            tasks = [
+                t for t in tasks
+                if needle in t.title.casefold() or needle in (t.description or '').casefold()
+            ]
+
+        return sorted(tasks, key=self.COLUMN_ORDER[quadrant])
+
+    def tag_counts(self):
+        """{quadrant: [(étiquette, nombre de tâches), ...]}, les plus fréquentes d'abord."""
+        self._load_tags()
+        counts = {}
+        for quadrant, tasks in self.quadrants.items():
+            counter = Counter(name for task in tasks for name in task.tag_names)
+            counts[quadrant] = sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+        return counts
+
+    def alerts(self):
+        """Alertes du dashboard (voir `TaskIntelligenceService.check_and_send_alerts`)."""
+        in_two_days = self.now + timedelta(days=2)
+
+        overdue, due_soon, q2_becoming_urgent = [], [], []
+        for task in self.tasks:
+            if task.is_overdue:
+                overdue.append(task)
+            elif task.is_due_soon:
+                due_soon.append(task)
+            if task.quadrant == 'Q2' and task.due_date <= in_two_days:
+                q2_becoming_urgent.append(task)
+
+        alerts = []
+        if overdue:
+            alerts.append({
+                'type': 'danger',
+                'icon': '🚨',
+                'message': f"Vous avez {len(overdue)} tâche(s) en retard !",
+                'tasks': overdue[:3]
+            })
+        if due_soon:
+            alerts.append({
+                'type': 'warning',
+                'icon': '⏰',
+                'message': f"{len(due_soon)} tâche(s) due(s) dans les 24 heures",
+                'tasks': due_soon[:3]
+            })
+        if q2_becoming_urgent:
+            alerts.append({
+                'type': 'info',
+                'icon': '📢',
+                'message': f"{len(q2_becoming_urgent)} tâche(s) importante(s) deviennent urgentes",
+                'tasks': q2_becoming_urgent[:3]
+            })
+
+        return alerts
+
+    def recommended(self):
+        """
+        Prochaine tâche recommandée (voir `TaskIntelligenceService.get_next_recommended_task`).
+        Les tâches bloquées par une dépendance ne sont jamais recommandées.
+        """
+        now = self.now
+        q1_tasks = [t for t in self.quadrants['Q1'] if not t.is_blocked]
+        q2_tasks = [t for t in self.quadrants['Q2'] if not t.is_blocked]
+
+        # 1. Tâches en retard dans Q1
+        overdue_q1 = [t for t in q1_tasks if t.is_overdue]
+        if overdue_q1:
+            return min(overdue_q1, key=lambda t: t.due_date)
+
+        # 2. Tâches Q1 dues aujourd'hui
+        end_of_day = now.replace(hour=23, minute=59, second=59)
+        today_q1 = [t for t in q1_tasks if t.due_date <= end_of_day]
+        if today_q1:
+            return min(today_q1, key=lambda t: t.due_date)
+
+        # 3. Tâches Q1 par score de priorité
+        if q1_tasks:
+            return max(q1_tasks, key=lambda t: t.priority)
+
+        # 4. Tâches Q2 par score de priorité
+        if q2_tasks:
+            return max(q2_tasks, key=lambda t: t.priority)
+
+        # 5. Sinon, n'importe quelle tâche active non bloquée
+        return next((t for t in self.tasks if not t.is_blocked), None)
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name="ID d'origine")),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('description_zlib', models.BinaryField(blank=True, null=True, verbose_name='Description (compressée)')),
+                ('due_date', models.DateTimeField(verbose_name="Date d'échéance")),
+                ('created_at', models.DateTimeField(verbose_name='Créé le')),
+                ('completed_at', models.DateTimeField(verbose_name='Complété le')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivé le')),
+                ('urgency_score', models.PositiveSmallIntegerField(verbose_name="Niveau d'urgence")),
+                ('importance_score', models.PositiveSmallIntegerField(verbose_name="Niveau d'importance")),
+                ('quadrant', models.CharField(choices=[('Q1', 'Urgent & Important - À FAIRE MAINTENANT'), ('Q2', 'Important mais pas urgent - À PLANIFIER'), ('Q3', 'Urgent mais pas important - À DÉLÉGUER'), ('Q4', 'Ni urgent ni important - À ÉLIMINER')], max_length=2, verbose_name='Quadrant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Tâche archivée',
+                'verbose_name_plural': 'Tâches archivées',
+                'ordering': ['-completed_at'],
+                'indexes': [models.Index(fields=['user', 'completed_at'], name='tasks_taska_user_id_42067f_idx'), models.Index(fields=['user', 'quadrant'], name='tasks_taska_user_id_362af7_idx')],
+            },
+        ),
+    ]
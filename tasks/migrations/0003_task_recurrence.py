@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_taskarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'Aucune'), ('DAILY', 'Tous les jours'), ('WEEKLY', 'Toutes les semaines'), ('MONTHLY', 'Tous les mois')], default='', max_length=10, verbose_name='Récurrence'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin de la récurrence'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Ex : 2 avec « Toutes les semaines » = une semaine sur deux', verbose_name='Intervalle de récurrence'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_recurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Paramètres')),
+                ('dedup_key', models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name='Clé de déduplication')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échoué')], default='PENDING', max_length=10, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Tentatives max.')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécuter après')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+            ],
+            options={
+                'verbose_name': 'Tâche de fond',
+                'verbose_name_plural': 'Tâches de fond',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='tasks_job_status_302b95_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:31
+
+import django.db.models.deletion
+import tasks.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=tasks.models._new_feed_token, max_length=64, unique=True, verbose_name='Jeton')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Flux agenda',
+                'verbose_name_plural': 'Flux agenda',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='tasks_task_user_id_075050_idx'),
+        ),
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+    ]
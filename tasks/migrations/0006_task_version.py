@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Version'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertDigestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('until', models.DateTimeField(verbose_name="Seuils traités jusqu'au")),
+                ('digests_sent', models.PositiveIntegerField(default=0, verbose_name='Récapitulatifs envoyés')),
+                ('task_count', models.PositiveIntegerField(default=0, verbose_name='Tâches signalées')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Exécuté le')),
+            ],
+            options={
+                'verbose_name': 'Envoi de récapitulatifs',
+                'verbose_name_plural': 'Envois de récapitulatifs',
+                'ordering': ['-until'],
+                'get_latest_by': 'until',
+            },
+        ),
+    ]
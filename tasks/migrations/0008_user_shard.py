@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class AlterShardedUserField(migrations.AlterField):
+    """
+    Retire la contrainte vers `auth_user` seulement si le sharding est activé
+    (DB_SHARDS) : les lignes d'un shard référencent des utilisateurs de la
+    base `default`. Sans sharding, la clé étrangère reste contrainte en base.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if settings.TASK_SHARDS:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if settings.TASK_SHARDS:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0007_alert_digest_run'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_shard', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('alias', models.CharField(max_length=50, verbose_name='Base')),
+            ],
+            options={
+                'verbose_name': 'Shard utilisateur',
+                'verbose_name_plural': 'Shards utilisateurs',
+            },
+        ),
+        AlterShardedUserField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        AlterShardedUserField(
+            model_name='taskarchive',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        AlterShardedUserField(
+            model_name='taskstatistics',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_statistics', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_user_shard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDependency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('blocker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependents', to='tasks.task', verbose_name='Dépend de')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependencies', to='tasks.task', verbose_name='Tâche')),
+            ],
+            options={
+                'verbose_name': 'Dépendance',
+                'verbose_name_plural': 'Dépendances',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paths', models.PositiveIntegerField(default=1, verbose_name='Chemins')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closure_descendants', to='tasks.task', verbose_name='Tâche bloquante')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closure_ancestors', to='tasks.task', verbose_name='Tâche bloquée')),
+            ],
+            options={
+                'verbose_name': 'Fermeture des dépendances',
+                'verbose_name_plural': 'Fermeture des dépendances',
+                'indexes': [models.Index(fields=['ancestor', 'descendant'], name='tasks_taskc_ancesto_779273_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskclosure',
+            constraint=models.UniqueConstraint(fields=('descendant', 'ancestor'), name='unique_task_closure'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskdependency',
+            constraint=models.UniqueConstraint(fields=('task', 'blocker'), name='unique_task_dependency'),
+        ),
+    ]
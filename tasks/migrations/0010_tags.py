@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_dependencies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Nom')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Étiquette',
+                'verbose_name_plural': 'Étiquettes',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tags', to='tasks.tag')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tags', to='tasks.task')),
+            ],
+            options={
+                'verbose_name': 'Étiquette de tâche',
+                'verbose_name_plural': 'Étiquettes de tâches',
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskTag', to='tasks.tag', verbose_name='Étiquettes'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_user_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktag',
+            index=models.Index(fields=['tag', 'task'], name='tasks_taskt_tag_id_57069b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasktag',
+            constraint=models.UniqueConstraint(fields=('task', 'tag'), name='unique_task_tag'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(verbose_name='ID de la tâche')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Supprimée le')),
+            ],
+            options={
+                'verbose_name': 'Tâche supprimée',
+                'verbose_name_plural': 'Tâches supprimées',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'updated_at'], name='tasks_task_user_id_66b666_idx'),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_tombstones', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tasks_taskt_user_id_0dfe22_idx'),
+        ),
+    ]
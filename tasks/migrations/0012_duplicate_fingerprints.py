@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_sync_tombstones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskFingerprint',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='tasks.task', verbose_name='Tâche')),
+                ('signature', models.BinaryField(verbose_name='Signature MinHash')),
+            ],
+            options={
+                'verbose_name': 'Empreinte de tâche',
+                'verbose_name_plural': 'Empreintes de tâches',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskLshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(verbose_name='Seau')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='tasks.task')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Seau LSH',
+                'verbose_name_plural': 'Seaux LSH',
+                'indexes': [models.Index(fields=['user', 'key'], name='tasks_taskl_user_id_761b8f_idx')],
+            },
+        ),
+    ]
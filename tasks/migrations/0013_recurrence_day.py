@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_duplicate_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_day',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Jour de récurrence'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def complete_previous_runs(apps, schema_editor):
+    # Les exécutions existantes n'étaient enregistrées qu'une fois terminées
+    AlertDigestRun = apps.get_model('tasks', 'AlertDigestRun')
+    AlertDigestRun.objects.using(schema_editor.connection.alias).update(completed_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_recurrence_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertdigestrun',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Terminé le'),
+        ),
+        migrations.AddField(
+            model_name='alertdigestrun',
+            name='last_user_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Dernier utilisateur servi'),
+        ),
+        migrations.AddField(
+            model_name='alertdigestrun',
+            name='shard',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Dernière base traitée'),
+        ),
+        migrations.AddField(
+            model_name='alertdigestrun',
+            name='since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Seuils traités depuis le'),
+        ),
+        migrations.RunPython(complete_previous_runs, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,87 @@
-from django.db import models
+import calendar
+import secrets
+import zlib
+
+from django.db import models, transaction
+from django.db.models import BooleanField, Case, Count, Exists, F, OuterRef, Q, Value, When
+from django.db.models.functions import Least
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 
+class TaskQuerySet(models.QuerySet):
+    """QuerySet des tâches."""
+    
+    def with_flags(self, now=None):
+        """
+        Annote `is_overdue`, `is_due_soon` et `priority` en SQL, tous calculés
+        par rapport au même instant `now` (par défaut : maintenant).
+        
+        Mêmes règles que les propriétés de `Task` et `get_priority_score()`,
+        qui retournent ensuite les valeurs annotées sans recalcul.
+        """
+        now = now or timezone.now()
+        in_24h = now + timedelta(hours=24)
+        in_3_days = now + timedelta(days=3)
+        
+        return self.annotate(
+            is_overdue=Case(
+                When(Q(due_date__lt=now) & ~Q(status='DONE'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            is_due_soon=Case(
+                When(due_date__gt=now, due_date__lt=in_24h, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            priority=Least(
+                (F('urgency_score') + F('importance_score')) * 10 + Case(
+                    When(due_date__lt=in_24h, then=Value(20)),
+                    When(due_date__lt=in_3_days, then=Value(10)),
+                    default=Value(0),
+                ),
+                Value(100),
+            ),
+        )
+    
+    def with_blocked(self):
+        """
+        Annote `is_blocked` : la tâche dépend (directement ou non) d'une
+        tâche non terminée. Un seul EXISTS sur la table de fermeture
+        (`TaskClosure`), sans parcours récursif.
+        """
+        open_blockers = (
+            TaskClosure.objects
+            .filter(descendant=OuterRef('pk'))
+            .exclude(ancestor__status='DONE')
+        )
+        return self.annotate(is_blocked=Exists(open_blockers))
+    
+    def tagged(self, user, name):
+        """
+        Tâches portant l'étiquette `name` de `user` : jointure sur les index
+        uniques (user, name) de `Tag` et (tag, task) de `TaskTag`.
+        """
+        return self.filter(tags__user=user, tags__name=name)
+    
+    def update_if_version(self, pk, version, **values):
+        """
+        Modifie la tâche `pk` en un seul UPDATE conditionnel
+        (`... WHERE id = pk AND version = version`), en incrémentant `version`
+        et en mettant à jour `updated_at`.
+        
+        `version=None` désactive la vérification. Retourne True si la ligne a
+        été modifiée, False si elle n'existe pas (dans ce QuerySet) ou si sa
+        version a changé entre-temps.
+        """
+        rows = self.filter(pk=pk)
+        if version is not None:
+            rows = rows.filter(version=version)
+        return rows.update(version=F('version') + 1, updated_at=timezone.now(), **values) == 1
+
+
 class Task(models.Model):
     """
     Modèle représentant une tâche dans la matrice d'Eisenhower.
@@ -27,11 +105,30 @@ class Task(models.Model):
         ('Q4', 'Ni urgent ni important - À ÉLIMINER'),
     ]
     
+    # Règles de récurrence
+    RECURRENCE_CHOICES = [
+        ('', 'Aucune'),
+        ('DAILY', 'Tous les jours'),
+        ('WEEKLY', 'Toutes les semaines'),
+        ('MONTHLY', 'Tous les mois'),
+    ]
+    
+    # Scores appliqués lorsqu'une tâche est déplacée vers un quadrant
+    QUADRANT_SCORES = {
+        'Q1': {'urgency': 5, 'importance': 5},
+        'Q2': {'urgency': 2, 'importance': 5},
+        'Q3': {'urgency': 5, 'importance': 2},
+        'Q4': {'urgency': 2, 'importance': 2},
+    }
+    
     # Champs de base
+    # Sans contrainte en base : les tâches peuvent vivre dans un autre shard
+    # que l'utilisateur (voir tasks/sharding.py)
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
         related_name='tasks',
+        db_constraint=False,
         verbose_name='Utilisateur'
     )
     title = models.CharField(
@@ -87,19 +184,67 @@ class Task(models.Model):
         verbose_name='Quadrant'
     )
     
+    # Verrouillage optimiste : incrémentée à chaque modification
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Version'
+    )
+    
     # Ordre pour le drag & drop
     order = models.IntegerField(
         default=0,
         verbose_name='Ordre d\'affichage'
     )
     
+    # Récurrence : seule la prochaine occurrence existe en base,
+    # la suivante est créée quand celle-ci est terminée
+    recurrence = models.CharField(
+        max_length=10,
+        choices=RECURRENCE_CHOICES,
+        blank=True,
+        default='',
+        verbose_name='Récurrence'
+    )
+    recurrence_interval = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Intervalle de récurrence',
+        help_text='Ex : 2 avec « Toutes les semaines » = une semaine sur deux'
+    )
+    recurrence_end = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Fin de la récurrence'
+    )
+    # Jour du mois d'origine d'une série mensuelle (31 pour une série du 31,
+    # même quand l'occurrence courante tombe le 28 février)
+    recurrence_day = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Jour de récurrence'
+    )
+    
+    # Étiquettes (projets, contextes...) de l'utilisateur
+    tags = models.ManyToManyField(
+        'Tag',
+        through='TaskTag',
+        blank=True,
+        related_name='tasks',
+        verbose_name='Étiquettes'
+    )
+    
+    objects = TaskQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-importance_score', '-urgency_score', 'due_date']
         verbose_name = 'Tâche'
         verbose_name_plural = 'Tâches'
         indexes = [
             models.Index(fields=['user', 'quadrant', 'status']),
+            models.Index(fields=['user', 'due_date']),
             models.Index(fields=['due_date']),
+            # Synchronisation différentielle (`tasks/sync.py`)
+            models.Index(fields=['user', 'updated_at']),
         ]
     
     def __str__(self):
@@ -109,9 +254,21 @@ class Task(models.Model):
         """
         Surcharge de la méthode save pour calculer automatiquement
         le quadrant selon les scores d'urgence et d'importance.
+        
+        Toute modification incrémente `version` (voir `update_if_version`)
+        en SQL (`version + 1`) : deux modifications concurrentes ne peuvent
+        pas écrire le même numéro. La valeur enregistrée est relue.
         """
         self.quadrant = self.calculate_quadrant()
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        
+        self.version = F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
         super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
     
     def calculate_quadrant(self):
         """
@@ -134,15 +291,44 @@ class Task(models.Model):
     
     @property
     def is_overdue(self):
-        """Vérifie si la tâche est en retard."""
+        """Vérifie si la tâche est en retard (valeur annotée par with_flags() si présente)."""
+        if '_is_overdue' in self.__dict__:
+            return self._is_overdue
         return self.due_date < timezone.now() and self.status != 'DONE'
     
+    @is_overdue.setter
+    def is_overdue(self, value):
+        self._is_overdue = value
+    
     @property
     def is_due_soon(self):
-        """Vérifie si la tâche est due dans les 24 heures."""
+        """Vérifie si la tâche est due dans les 24 heures (valeur annotée si présente)."""
+        if '_is_due_soon' in self.__dict__:
+            return self._is_due_soon
         time_until_due = self.due_date - timezone.now()
         return timedelta(0) < time_until_due < timedelta(hours=24)
     
+    @is_due_soon.setter
+    def is_due_soon(self, value):
+        self._is_due_soon = value
+    
+    @property
+    def tag_names(self):
+        """Noms des étiquettes (sans requête si chargées par `prefetch_related('tags')`)."""
+        return sorted(tag.name for tag in self.tags.all())
+    
+    def set_tags(self, names):
+        """Remplace les étiquettes de la tâche par `names` (créées au besoin)."""
+        names = {Tag.normalize(name) for name in names} - {''}
+        tags = Tag.objects.using(self._state.db).filter(user_id=self.user_id, name__in=names)
+        missing = names - {tag.name for tag in tags}
+        if missing:
+            Tag.objects.using(self._state.db).bulk_create(
+                [Tag(user_id=self.user_id, name=name) for name in missing], ignore_conflicts=True
+            )
+            tags = tags.all()
+        self.tags.set(tags)
+    
     @property
     def urgency_level_display(self):
         """Retourne un label visuel pour le niveau d'urgence."""
@@ -180,11 +366,116 @@ class Task(models.Model):
         }
         return recommendations.get(self.quadrant, 'Aucune recommandation')
     
+    def _recurrence_day(self):
+        """
+        Jour du mois d'origine de la série : `recurrence_day` tant que
+        l'échéance correspond à ce jour (ramené au dernier jour des mois
+        plus courts), sinon le jour de l'échéance (date modifiée à la main).
+        """
+        due = timezone.localtime(self.due_date)
+        last_day = calendar.monthrange(due.year, due.month)[1]
+        if self.recurrence_day and due.day == min(self.recurrence_day, last_day):
+            return self.recurrence_day
+        return due.day
+    
+    def next_due_date(self, after=None):
+        """
+        Retourne l'échéance de l'occurrence suivant `after` (par défaut
+        l'échéance actuelle), ou None si la tâche n'est pas récurrente ou
+        si la récurrence est terminée.
+        
+        Calcul en heure locale : l'heure affichée reste la même de part et
+        d'autre d'un changement d'heure, et le jour du mois est celui de
+        l'utilisateur, pas celui d'UTC.
+        """
+        if not self.recurrence:
+            return None
+        
+        current = timezone.localtime(after or self.due_date).replace(tzinfo=None)
+        step = self.recurrence_interval or 1
+        
+        if self.recurrence == 'DAILY':
+            next_date = current + timedelta(days=step)
+        elif self.recurrence == 'WEEKLY':
+            next_date = current + timedelta(weeks=step)
+        else:
+            # Jour d'origine de la série, ramené au dernier jour si le mois est plus court
+            month_index = current.month - 1 + step
+            year = current.year + month_index // 12
+            month = month_index % 12 + 1
+            day = min(self._recurrence_day(), calendar.monthrange(year, month)[1])
+            next_date = current.replace(year=year, month=month, day=day)
+        
+        next_date = timezone.make_aware(next_date)
+        if self.recurrence_end and next_date > self.recurrence_end:
+            return None
+        return next_date
+    
+    def _build_occurrence(self, due_date):
+        """Copie non enregistrée de la tâche pour l'échéance donnée."""
+        return Task(
+            user_id=self.user_id,
+            title=self.title,
+            description=self.description,
+            due_date=due_date,
+            urgency_score=self.urgency_score,
+            importance_score=self.importance_score,
+            quadrant=self.quadrant,
+            recurrence=self.recurrence,
+            recurrence_interval=self.recurrence_interval,
+            recurrence_end=self.recurrence_end,
+            recurrence_day=self._recurrence_day() if self.recurrence == 'MONTHLY' else None,
+        )
+    
+    def occurrences(self, until):
+        """
+        Génère les occurrences futures (non enregistrées) jusqu'à `until`.
+        Utilisé pour consulter une fenêtre à venir sans créer de lignes.
+        """
+        due_date = self.next_due_date()
+        while due_date is not None and due_date <= until:
+            yield self._build_occurrence(due_date)
+            due_date = self.next_due_date(after=due_date)
+    
+    def spawn_next_occurrence(self):
+        """
+        Crée l'occurrence suivante d'une tâche récurrente terminée.
+        
+        La règle est transférée à la nouvelle tâche : l'occurrence terminée
+        redevient une tâche simple, ce qui évite toute double création si
+        elle est rouverte puis terminée à nouveau.
+        
+        Returns:
+            Task ou None: La nouvelle occurrence
+        """
+        # Import local : `duplicates` importe les modèles
+        from .duplicates import index_task
+        
+        next_task = None
+        next_due_date = self.next_due_date()
+        
+        if next_due_date is not None:
+            next_task = self._build_occurrence(next_due_date)
+            next_task.save()
+            index_task(next_task, replace=False)
+        
+        if self.recurrence:
+            self.recurrence = ''
+            self.save(update_fields=['recurrence', 'updated_at'])
+        
+        return next_task
+    
     def get_priority_score(self):
         """
         Calcule un score de priorité global (0-100).
         Utilisé pour le tri intelligent des tâches.
+        
+        Retourne directement `priority` si la tâche a été chargée avec
+        `Task.objects.with_flags()`.
         """
+        if 'priority' in self.__dict__:
+            return self.priority
+        
         # Score basé sur urgence et importance
         base_score = (self.urgency_score * 10) + (self.importance_score * 10)
         
@@ -198,6 +489,172 @@ class Task(models.Model):
         return min(base_score, 100)
 
 
+class Tag(models.Model):
+    """
+    Étiquette d'un utilisateur (projet, contexte...), à la place des
+    mots-clés saisis dans les titres. Noms normalisés par `Tag.normalize`.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='tags',
+        db_constraint=False,
+        verbose_name='Utilisateur'
+    )
+    name = models.CharField(max_length=50, verbose_name='Nom')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Étiquette'
+        verbose_name_plural = 'Étiquettes'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_user_tag'),
+        ]
+    
+    def __str__(self):
+        return self.name
+    
+    @staticmethod
+    def normalize(name):
+        """« #Projet  X » -> « projet x »."""
+        return ' '.join(name.strip().lstrip('#').split()).lower()[:50]
+
+
+class TaskTag(models.Model):
+    """Association tâche / étiquette (table intermédiaire de `Task.tags`)."""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='task_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='task_tags')
+    
+    class Meta:
+        verbose_name = 'Étiquette de tâche'
+        verbose_name_plural = 'Étiquettes de tâches'
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'tag'], name='unique_task_tag'),
+        ]
+        indexes = [
+            # Filtre par étiquette : de l'étiquette vers ses tâches
+            models.Index(fields=['tag', 'task']),
+        ]
+
+
+class TaskDependency(models.Model):
+    """
+    Dépendance directe : `task` ne peut commencer qu'une fois `blocker`
+    terminée. Modifiée uniquement par `tasks/dependencies.py`, qui tient à
+    jour la fermeture transitive (`TaskClosure`).
+    """
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='dependencies',
+        verbose_name='Tâche'
+    )
+    blocker = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='dependents',
+        verbose_name='Dépend de'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    
+    class Meta:
+        verbose_name = 'Dépendance'
+        verbose_name_plural = 'Dépendances'
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'blocker'], name='unique_task_dependency'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.title} ← {self.blocker.title}"
+
+
+class TaskClosure(models.Model):
+    """
+    Fermeture transitive des dépendances : une ligne par couple
+    (`ancestor` bloque `descendant`, directement ou non).
+    
+    `paths` compte les chemins entre les deux tâches, ce qui permet de
+    retirer une dépendance sans recalculer le graphe : la ligne disparaît
+    quand son dernier chemin est retiré.
+    """
+    ancestor = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='closure_descendants',
+        verbose_name='Tâche bloquante'
+    )
+    descendant = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='closure_ancestors',
+        verbose_name='Tâche bloquée'
+    )
+    paths = models.PositiveIntegerField(default=1, verbose_name='Chemins')
+    
+    class Meta:
+        verbose_name = 'Fermeture des dépendances'
+        verbose_name_plural = 'Fermeture des dépendances'
+        constraints = [
+            # Index (descendant, ancestor) : « cette tâche est-elle bloquée ? »
+            models.UniqueConstraint(fields=['descendant', 'ancestor'], name='unique_task_closure'),
+        ]
+        indexes = [
+            # « que débloque cette tâche ? »
+            models.Index(fields=['ancestor', 'descendant']),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.paths})"
+
+
+class TaskFingerprint(models.Model):
+    """
+    Signature MinHash du titre et de la description d'une tâche, pour la
+    détection des quasi-doublons (voir `tasks/duplicates.py`). Vide quand le
+    texte n'a aucun trigramme (ponctuation seule...).
+    """
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint',
+        verbose_name='Tâche'
+    )
+    signature = models.BinaryField(verbose_name='Signature MinHash')
+    
+    class Meta:
+        verbose_name = 'Empreinte de tâche'
+        verbose_name_plural = 'Empreintes de tâches'
+    
+    def __str__(self):
+        return f"Empreinte de la tâche {self.task_id}"
+
+
+class TaskLshBucket(models.Model):
+    """
+    Seau LSH d'une tâche : une ligne par bande de sa signature MinHash.
+    Deux tâches d'un même utilisateur partageant un seau sont candidates.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='lsh_buckets')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_constraint=False,
+        verbose_name='Utilisateur'
+    )
+    key = models.BigIntegerField(verbose_name='Seau')
+    
+    class Meta:
+        verbose_name = 'Seau LSH'
+        verbose_name_plural = 'Seaux LSH'
+        indexes = [
+            # Candidats d'une tâche, et parcours trié de find_duplicates
+            models.Index(fields=['user', 'key']),
+        ]
+
+
 class TaskStatistics(models.Model):
     """
     Modèle pour stocker les statistiques de productivité par utilisateur.
@@ -205,7 +662,8 @@ class TaskStatistics(models.Model):
     user = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
-        related_name='task_statistics'
+        related_name='task_statistics',
+        db_constraint=False
     )
     
     # Compteurs par quadrant
@@ -236,15 +694,317 @@ class TaskStatistics(models.Model):
         return round((self.total_tasks_completed / self.total_tasks_created) * 100, 1)
     
     def update_statistics(self):
-        """Met à jour les statistiques basées sur les tâches de l'utilisateur."""
+        """
+        Met à jour les statistiques basées sur les tâches de l'utilisateur.
+        Les tâches archivées (toutes terminées) sont incluses.
+        """
         tasks = Task.objects.filter(user=self.user)
+        archived = dict(
+            TaskArchive.objects.filter(user=self.user)
+            .values_list('quadrant')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        total_archived = sum(archived.values())
         
-        self.total_tasks_created = tasks.count()
-        self.total_tasks_completed = tasks.filter(status='DONE').count()
+        self.total_tasks_created = tasks.count() + total_archived
+        self.total_tasks_completed = tasks.filter(status='DONE').count() + total_archived
         
-        self.q1_completed = tasks.filter(quadrant='Q1', status='DONE').count()
-        self.q2_completed = tasks.filter(quadrant='Q2', status='DONE').count()
-        self.q3_completed = tasks.filter(quadrant='Q3', status='DONE').count()
-        self.q4_completed = tasks.filter(quadrant='Q4', status='DONE').count()
+        self.q1_completed = tasks.filter(quadrant='Q1', status='DONE').count() + archived.get('Q1', 0)
+        self.q2_completed = tasks.filter(quadrant='Q2', status='DONE').count() + archived.get('Q2', 0)
+        self.q3_completed = tasks.filter(quadrant='Q3', status='DONE').count() + archived.get('Q3', 0)
+        self.q4_completed = tasks.filter(quadrant='Q4', status='DONE').count() + archived.get('Q4', 0)
         
         self.save()
+
+
+class TaskArchive(models.Model):
+    """
+    Tâche terminée déplacée hors de la table des tâches actives.
+    
+    Représentation compacte : scores sur de petits entiers, description
+    compressée (zlib), pas de colonnes de statut ni d'ordre d'affichage.
+    Voir la commande `manage.py archive_tasks`.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        db_constraint=False,
+        verbose_name='Utilisateur'
+    )
+    original_id = models.BigIntegerField(
+        unique=True,
+        verbose_name='ID d\'origine'
+    )
+    title = models.CharField(max_length=200, verbose_name='Titre')
+    description_zlib = models.BinaryField(
+        blank=True,
+        null=True,
+        verbose_name='Description (compressée)'
+    )
+    due_date = models.DateTimeField(verbose_name='Date d\'échéance')
+    created_at = models.DateTimeField(verbose_name='Créé le')
+    completed_at = models.DateTimeField(verbose_name='Complété le')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Archivé le')
+    urgency_score = models.PositiveSmallIntegerField(verbose_name='Niveau d\'urgence')
+    importance_score = models.PositiveSmallIntegerField(verbose_name='Niveau d\'importance')
+    quadrant = models.CharField(
+        max_length=2,
+        choices=Task.QUADRANT_CHOICES,
+        verbose_name='Quadrant'
+    )
+    
+    class Meta:
+        ordering = ['-completed_at']
+        verbose_name = 'Tâche archivée'
+        verbose_name_plural = 'Tâches archivées'
+        indexes = [
+            models.Index(fields=['user', 'completed_at']),
+            models.Index(fields=['user', 'quadrant']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (archivée)"
+    
+    @property
+    def description(self):
+        """Description décompressée."""
+        if not self.description_zlib:
+            return None
+        return zlib.decompress(bytes(self.description_zlib)).decode('utf-8')
+    
+    @classmethod
+    def from_task(cls, task):
+        """Construit (sans l'enregistrer) l'archive d'une tâche terminée."""
+        description = None
+        if task.description:
+            description = zlib.compress(task.description.encode('utf-8'), 9)
+        
+        return cls(
+            user_id=task.user_id,
+            original_id=task.pk,
+            title=task.title,
+            description_zlib=description,
+            due_date=task.due_date,
+            created_at=task.created_at,
+            completed_at=task.updated_at,
+            urgency_score=task.urgency_score,
+            importance_score=task.importance_score,
+            quadrant=task.quadrant,
+        )
+    
+    @transaction.atomic
+    def restore(self):
+        """
+        Replace la tâche dans la table des tâches (statut DONE, même id)
+        et supprime l'archive. Retourne la tâche restaurée.
+        
+        La tâche reçoit une date de modification actuelle et sa trace
+        d'archivage est supprimée : les clients synchronisés la reçoivent
+        comme un changement (comme toute modification d'une tâche terminée,
+        sa date de complétion devient celle de la restauration).
+        """
+        from .duplicates import index_task
+        
+        task = Task(
+            pk=self.original_id,
+            user_id=self.user_id,
+            title=self.title,
+            description=self.description,
+            due_date=self.due_date,
+            urgency_score=self.urgency_score,
+            importance_score=self.importance_score,
+            status='DONE',
+        )
+        task.save(force_insert=True)
+        
+        # auto_now_add écrase la date de création : on la rétablit
+        Task.objects.filter(pk=task.pk).update(created_at=self.created_at)
+        TaskTombstone.objects.filter(user_id=self.user_id, task_id=self.original_id).delete()
+        self.delete()
+        # L'empreinte a été supprimée avec la tâche archivée
+        index_task(task, replace=False)
+        return task
+
+
+class TaskTombstone(models.Model):
+    """
+    Trace d'une tâche supprimée, archivée ou réassignée, pour que les
+    clients synchronisés (`tasks/sync.py`) la retirent à leur tour.
+    Conservée `TASK_SYNC_TOMBSTONE_DAYS` jours (nettoyée par archive_tasks).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_tombstones',
+        db_constraint=False,
+        verbose_name='Utilisateur'
+    )
+    task_id = models.BigIntegerField(verbose_name='ID de la tâche')
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name='Supprimée le')
+    
+    class Meta:
+        verbose_name = 'Tâche supprimée'
+        verbose_name_plural = 'Tâches supprimées'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"Tâche {self.task_id} supprimée le {self.deleted_at:%d/%m/%Y %H:%M}"
+    
+    @classmethod
+    def record(cls, tasks, using=None):
+        """Enregistre (en une requête) la disparition de `tasks` pour leur utilisateur."""
+        now = timezone.now()
+        tombstones = [cls(user_id=task.user_id, task_id=task.pk, deleted_at=now) for task in tasks]
+        if tombstones:
+            cls.objects.using(using).bulk_create(tombstones)
+
+
+class Job(models.Model):
+    """
+    Tâche de fond persistée en base (file d'attente locale, sans broker).
+    
+    Voir `tasks/jobs.py` pour la mise en file et `manage.py run_worker`
+    pour l'exécution.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échoué'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name='Nom')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Paramètres')
+    
+    # Clé de déduplication : une seule tâche en attente par clé.
+    # Remise à NULL dès que la tâche démarre.
+    dedup_key = models.CharField(
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True,
+        verbose_name='Clé de déduplication'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='PENDING',
+        verbose_name='Statut'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Tentatives max.')
+    last_error = models.TextField(blank=True, default='', verbose_name='Dernière erreur')
+    
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Exécuter après')
+    locked_at = models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')
+    
+    class Meta:
+        verbose_name = 'Tâche de fond'
+        verbose_name_plural = 'Tâches de fond'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
+
+
+def _new_feed_token():
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeed(models.Model):
+    """
+    Jeton secret du flux iCalendar (.ics) d'un utilisateur.
+    
+    Les applications d'agenda ne s'authentifient pas : l'URL du flux
+    contient ce jeton, qui peut être régénéré pour révoquer l'ancienne URL.
+    Voir `tasks/ical.py`.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed',
+        verbose_name='Utilisateur'
+    )
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=_new_feed_token,
+        verbose_name='Jeton'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    
+    class Meta:
+        verbose_name = 'Flux agenda'
+        verbose_name_plural = 'Flux agenda'
+    
+    def __str__(self):
+        return f"Flux agenda de {self.user.username}"
+    
+    def regenerate(self):
+        """Remplace le jeton : l'ancienne URL du flux cesse de fonctionner."""
+        self.token = _new_feed_token()
+        self.save(update_fields=['token'])
+
+
+class AlertDigestRun(models.Model):
+    """
+    Exécution de l'envoi des récapitulatifs d'alertes.
+    
+    `until` sert de filigrane : l'exécution suivante ne traite que les
+    échéances qui ont franchi un seuil depuis. Voir `tasks/digest.py`.
+    
+    La progression (`shard`, `last_user_id`) est enregistrée après chaque
+    lot envoyé : une exécution interrompue (`completed_at` vide) reprend
+    après le dernier utilisateur servi, sans renvoyer les lots précédents.
+    """
+    since = models.DateTimeField(blank=True, null=True, verbose_name='Seuils traités depuis le')
+    until = models.DateTimeField(verbose_name='Seuils traités jusqu\'au')
+    shard = models.CharField(max_length=50, blank=True, verbose_name='Dernière base traitée')
+    last_user_id = models.PositiveIntegerField(blank=True, null=True, verbose_name='Dernier utilisateur servi')
+    digests_sent = models.PositiveIntegerField(default=0, verbose_name='Récapitulatifs envoyés')
+    task_count = models.PositiveIntegerField(default=0, verbose_name='Tâches signalées')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Exécuté le')
+    completed_at = models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')
+    
+    class Meta:
+        ordering = ['-until']
+        get_latest_by = 'until'
+        verbose_name = 'Envoi de récapitulatifs'
+        verbose_name_plural = 'Envois de récapitulatifs'
+    
+    def __str__(self):
+        return f"Récapitulatifs jusqu'au {self.until:%d/%m/%Y %H:%M}"
+
+
+class UserShard(models.Model):
+    """
+    Annuaire des shards : base de données des tâches de chaque utilisateur.
+    
+    Rempli au premier accès par `tasks.sharding.shard_for_user` (hachage
+    stable de l'id) ; modifier une entrée suppose d'avoir déplacé les
+    lignes de l'utilisateur.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_shard',
+        verbose_name='Utilisateur'
+    )
+    alias = models.CharField(max_length=50, verbose_name='Base')
+    
+    class Meta:
+        verbose_name = 'Shard utilisateur'
+        verbose_name_plural = 'Shards utilisateurs'
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.alias}"
@@ -0,0 +1,187 @@
+"""
+Profilage CPU / mémoire à la demande.
+
+- Un membre du staff ajoute `?_profile=cpu` ou `?_profile=mem` à une URL :
+  la vue est exécutée sous `cProfile` ou `tracemalloc`
+- `PROFILING_SAMPLE_RATE` > 0 profile (CPU) une fraction des requêtes
+- Les résultats sont écrits dans `PROFILING_DIR` (tampon circulaire de
+  `PROFILING_MAX_FILES` fichiers) et consultables sur `/admin/profiles/`
+"""
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+
+PROFILE_PARAM = '_profile'
+
+# Un seul profilage à la fois : cProfile et tracemalloc sont globaux au processus
+_lock = threading.Lock()
+
+
+def _profile_dir():
+    path = settings.PROFILING_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _profile_name(request, kind, extension):
+    """
+    Nom de fichier lisible : date, type, utilisateur et chemin de la requête,
+    suivis d'un suffixe aléatoire (deux profils de la même milliseconde ne
+    s'écrasent pas).
+    """
+    slug = re.sub(r'[^a-zA-Z0-9]+', '-', request.path).strip('-') or 'root'
+    user = request.user.username if request.user.is_authenticated else 'anonyme'
+    user = re.sub(r'[^a-zA-Z0-9_.-]+', '', user) or 'utilisateur'
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    return f"{stamp}-{kind}-{user}-{slug[:60]}-{uuid.uuid4().hex[:8]}{extension}"
+
+
+def _trim_ring_buffer():
+    """Supprime les profils les plus anciens au-delà de PROFILING_MAX_FILES."""
+    directory = _profile_dir()
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in entries[:max(0, len(entries) - settings.PROFILING_MAX_FILES)]:
+        os.remove(entry.path)
+
+
+def list_profiles():
+    """Retourne les profils disponibles, du plus récent au plus ancien."""
+    directory = _profile_dir()
+    entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [
+        {
+            'name': entry.name,
+            'size': entry.stat().st_size,
+            'created': datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc),
+        }
+        for entry in entries
+    ]
+
+
+class ProfilingMiddleware:
+    """
+    Middleware de profilage, à placer après AuthenticationMiddleware.
+
+    Sans paramètre `_profile` et avec un taux d'échantillonnage nul, le coût
+    par requête se limite à une recherche dans `request.GET`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        kind = request.GET.get(PROFILE_PARAM)
+
+        if kind is not None:
+            if kind not in ('cpu', 'mem') or not request.user.is_staff:
+                kind = None
+        elif self.sample_rate and random.random() < self.sample_rate:
+            kind = 'cpu'
+
+        if kind is None or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            if kind == 'cpu':
+                response, name = self._profile_cpu(request)
+            else:
+                response, name = self._profile_memory(request)
+            _trim_ring_buffer()
+        finally:
+            _lock.release()
+
+        response['X-Profile-Id'] = name
+        return response
+
+    def _get_full_response(self, request):
+        response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            # Réponse en flux : le contenu est produit pendant la mesure
+            response.streaming_content = [b''.join(response.streaming_content)]
+        return response
+
+    def _profile_cpu(self, request):
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self._get_full_response, request)
+
+        name = _profile_name(request, 'cpu', '.prof')
+        profiler.dump_stats(os.path.join(_profile_dir(), name))
+        return response, name
+
+    def _profile_memory(self, request):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(settings.PROFILING_MEMORY_FRAMES)
+        tracemalloc.reset_peak()
+
+        before = tracemalloc.take_snapshot()
+        response = self._get_full_response(request)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        if not was_tracing:
+            tracemalloc.stop()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+
+        lines = [
+            f"{request.method} {request.get_full_path()}",
+            f"Pic mémoire : {peak / 1024:.1f} Kio, mémoire tracée : {current / 1024:.1f} Kio",
+            "",
+            "Top 30 des allocations (différence avant / après la vue) :",
+        ]
+        lines.extend(str(stat) for stat in stats[:30])
+
+        name = _profile_name(request, 'mem', '.txt')
+        with open(os.path.join(_profile_dir(), name), 'w', encoding='utf-8') as report:
+            report.write('\n'.join(lines) + '\n')
+        return response, name
+
+
+# ---------------------------------------------------------------------------
+# Pages d'administration
+# ---------------------------------------------------------------------------
+
+def profile_list(request):
+    """Liste des profils enregistrés (réservée au staff via admin_view)."""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Profils de performance',
+        'profiles': list_profiles(),
+        'max_files': settings.PROFILING_MAX_FILES,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    }
+    return render(request, 'admin/profiles.html', context)
+
+
+def profile_download(request, name):
+    """Téléchargement d'un profil."""
+    if os.path.basename(name) != name:
+        raise Http404
+    path = os.path.join(_profile_dir(), name)
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -0,0 +1,158 @@
+"""
+Réconciliation des statistiques (`TaskStatistics`) avec les tâches réelles.
+
+Les compteurs ne sont recalculés que par les vues (`update_statistics()`) :
+une suppression depuis l'admin, un `QuerySet.delete()` ou une modification
+en masse les laissent dériver. `manage.py reconcile_stats` :
+- découpe les identifiants d'utilisateurs de chaque base de tâches (shard)
+  en plages `[low, high)`, réparties sur un pool de processus
+- par plage, calcule les valeurs attendues en deux requêtes agrégées
+  groupées par utilisateur (`Task`, `TaskArchive`) et lit les statistiques
+  enregistrées en une troisième
+- corrige les écarts par plage : lignes verrouillées, valeurs recalculées
+  sous verrou puis `bulk_update` (et `bulk_create` des lignes manquantes,
+  en mise à jour si une vue la crée entre-temps)
+- supprime les statistiques des utilisateurs supprimés (lignes laissées
+  dans un shard, sans contrainte vers `auth_user`)
+
+Mêmes règles que `update_statistics()` : les tâches archivées comptent comme
+créées et terminées.
+"""
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import Task, TaskArchive, TaskStatistics
+
+
+QUADRANT_FIELDS = {'Q1': 'q1_completed', 'Q2': 'q2_completed', 'Q3': 'q3_completed', 'Q4': 'q4_completed'}
+STAT_FIELDS = ('total_tasks_created', 'total_tasks_completed', *QUADRANT_FIELDS.values())
+
+
+def user_ranges(using=None, range_size=1000):
+    """Plages `(low, high)` d'identifiants d'utilisateurs couvrant les lignes de la base."""
+    low = high = None
+    for model in (Task, TaskArchive, TaskStatistics):
+        bounds = model.objects.using(using).aggregate(low=Min('user_id'), high=Max('user_id'))
+        if bounds['low'] is not None:
+            low = bounds['low'] if low is None else min(low, bounds['low'])
+            high = bounds['high'] if high is None else max(high, bounds['high'])
+    if low is None:
+        return []
+    return [(start, start + range_size) for start in range(low, high + 1, range_size)]
+
+
+def expected_statistics(using=None, low=None, high=None, user_ids=None):
+    """
+    Valeurs exactes des compteurs par utilisateur (`{user_id: {champ: valeur}}`),
+    pour la plage `[low, high)` ou la liste `user_ids`.
+    """
+    def scoped(model):
+        rows = model.objects.using(using)
+        if user_ids is not None:
+            return rows.filter(user_id__in=user_ids)
+        return rows.filter(user_id__gte=low, user_id__lt=high)
+
+    done = Q(status='DONE')
+    tasks = scoped(Task).values('user_id').order_by().annotate(
+        total_tasks_created=Count('pk'),
+        total_tasks_completed=Count('pk', filter=done),
+        **{field: Count('pk', filter=done & Q(quadrant=q)) for q, field in QUADRANT_FIELDS.items()},
+    )
+    archived = scoped(TaskArchive).values('user_id').order_by().annotate(
+        total=Count('pk'),
+        **{field: Count('pk', filter=Q(quadrant=q)) for q, field in QUADRANT_FIELDS.items()},
+    )
+
+    expected = {}
+    for row in tasks:
+        expected[row.pop('user_id')] = row
+    for row in archived:
+        counts = expected.setdefault(row.pop('user_id'), dict.fromkeys(STAT_FIELDS, 0))
+        total = row.pop('total')
+        counts['total_tasks_created'] += total
+        counts['total_tasks_completed'] += total
+        for field, value in row.items():
+            counts[field] += value
+    return expected
+
+
+def _drift(stored, expected):
+    """Écarts `{champ: (enregistré, attendu)}` ; `stored` vaut None si la ligne manque."""
+    return {
+        field: (stored[field] if stored else None, expected[field])
+        for field in STAT_FIELDS
+        if stored is None or stored[field] != expected[field]
+    }
+
+
+def reconcile_range(using, low, high, fix=True):
+    """
+    Compare (et corrige avec `fix`) les statistiques de la plage `[low, high)`.
+
+    Returns:
+        dict: `{'using', 'users': utilisateurs vérifiés, 'drift': {user_id: écarts},
+        'deleted': utilisateurs supprimés dont les statistiques restent}`, données
+        simples transmissibles entre processus
+    """
+    expected = expected_statistics(using, low, high)
+    stored = {
+        row['user_id']: row
+        for row in TaskStatistics.objects.using(using)
+        .filter(user_id__gte=low, user_id__lt=high)
+        .values('user_id', *STAT_FIELDS)
+    }
+    zero = dict.fromkeys(STAT_FIELDS, 0)
+    users = stored.keys() | expected.keys()
+    # Utilisateurs dans la base `default`, les statistiques dans leur shard
+    existing = set(User.objects.filter(pk__in=users).values_list('pk', flat=True))
+    deleted = sorted(stored.keys() - existing)
+    drift = {}
+    for user_id in sorted(users & existing):
+        changes = _drift(stored.get(user_id), expected.get(user_id, zero))
+        if changes:
+            drift[user_id] = changes
+
+    if fix and drift:
+        _fix(using, list(drift))
+    if fix and deleted:
+        TaskStatistics.objects.using(using).filter(user_id__in=deleted).delete()
+    return {'using': using, 'users': len(users), 'drift': drift, 'deleted': deleted}
+
+
+def _fix(using, user_ids):
+    """Réécrit les statistiques de `user_ids`, recalculées sous verrou."""
+    with transaction.atomic(using=using):
+        rows = {
+            stats.user_id: stats
+            for stats in TaskStatistics.objects.using(using).select_for_update().filter(user_id__in=user_ids)
+        }
+        # Relu sous verrou : une mise à jour concurrente n'est pas écrasée par une valeur périmée
+        expected = expected_statistics(using, user_ids=user_ids)
+        zero = dict.fromkeys(STAT_FIELDS, 0)
+        now = timezone.now()
+
+        missing = []
+        for user_id in user_ids:
+            stats = rows.get(user_id)
+            if stats is None:
+                stats = TaskStatistics(user_id=user_id)
+                missing.append(stats)
+            for field, value in expected.get(user_id, zero).items():
+                setattr(stats, field, value)
+            stats.last_updated = now  # auto_now n'est pas appliqué par bulk_update
+
+        fields = [*STAT_FIELDS, 'last_updated']
+        TaskStatistics.objects.using(using).bulk_update(rows.values(), fields)
+        # Ligne créée entre-temps par une vue (`get_or_create`) : mise à jour
+        # plutôt qu'une IntegrityError qui annulerait toute la plage
+        # (MySQL : ON DUPLICATE KEY UPDATE, sans colonnes cibles)
+        with_target = connections[using].features.supports_update_conflicts_with_target
+        TaskStatistics.objects.using(using).bulk_create(
+            missing,
+            update_conflicts=True,
+            unique_fields=['user'] if with_target else None,
+            update_fields=fields,
+        )
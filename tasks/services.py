@@ -6,6 +6,7 @@ Contient les algorithmes de priorisation et de recommandation.
 from django.utils import timezone
 from datetime import timedelta
 from .models import Task, TaskStatistics
+from .matrix import TaskMatrix
 
 
 class TaskIntelligenceService:
@@ -77,7 +78,7 @@ class TaskIntelligenceService:
         }
     
     @staticmethod
-    def get_tasks_requiring_attention(user):
+    def get_tasks_requiring_attention(user, now=None):
         """
         Retourne les tâches nécessitant une attention immédiate.
         
@@ -88,11 +89,12 @@ class TaskIntelligenceService:
         
         Args:
             user: L'utilisateur Django
+            now (datetime): Instant de référence (par défaut : maintenant)
         
         Returns:
-            QuerySet: Tâches nécessitant attention
+            QuerySet: Tâches nécessitant attention, annotées par `with_flags()`
         """
-        now = timezone.now()
+        now = now or timezone.now()
         tomorrow = now + timedelta(hours=24)
         
         tasks = Task.objects.filter(user=user).exclude(status='DONE')
@@ -102,15 +104,16 @@ class TaskIntelligenceService:
             due_date__lte=tomorrow
         ) | tasks.filter(quadrant='Q1')
         
-        return urgent_tasks.distinct().order_by('due_date')
+        return urgent_tasks.distinct().with_flags(now).order_by('due_date')
     
     @staticmethod
-    def get_productivity_insights(user):
+    def get_productivity_insights(user, matrix=None):
         """
         Génère des insights sur la productivité de l'utilisateur.
         
         Args:
             user: L'utilisateur Django
+            matrix (TaskMatrix): Instantané des tâches actives (optionnel)
         
         Returns:
             dict: Insights et recommandations
@@ -120,18 +123,18 @@ class TaskIntelligenceService:
         if created or stats.total_tasks_created == 0:
             stats.update_statistics()
         
-        tasks = Task.objects.filter(user=user)
-        active_tasks = tasks.exclude(status='DONE')
+        if matrix is None:
+            matrix = TaskMatrix(user)
         
         # Analyse de la distribution des tâches
-        q1_count = active_tasks.filter(quadrant='Q1').count()
-        q2_count = active_tasks.filter(quadrant='Q2').count()
-        q3_count = active_tasks.filter(quadrant='Q3').count()
-        q4_count = active_tasks.filter(quadrant='Q4').count()
+        q1_count = matrix.count('Q1')
+        q2_count = matrix.count('Q2')
+        q3_count = matrix.count('Q3')
+        q4_count = matrix.count('Q4')
         
         insights = {
             'completion_rate': stats.completion_rate,
-            'total_active': active_tasks.count(),
+            'total_active': len(matrix),
             'quadrant_distribution': {
                 'Q1': q1_count,
                 'Q2': q2_count,
@@ -174,7 +177,7 @@ class TaskIntelligenceService:
         return insights
     
     @staticmethod
-    def get_next_recommended_task(user):
+    def get_next_recommended_task(user, matrix=None):
         """
         Recommande la prochaine tâche à accomplir selon un algorithme intelligent.
         
@@ -184,98 +187,36 @@ class TaskIntelligenceService:
         3. Tâches Q1 avec le score de priorité le plus élevé
         4. Tâches Q2 avec le score de priorité le plus élevé
         
+        Les tâches bloquées par une dépendance non terminée sont ignorées.
+        
         Args:
             user: L'utilisateur Django
+            matrix (TaskMatrix): Instantané des tâches actives (optionnel)
         
         Returns:
-            Task ou None: La tâche recommandée
+            TaskRecord ou None: La tâche recommandée
         """
-        now = timezone.now()
-        active_tasks = Task.objects.filter(user=user).exclude(status='DONE')
-        
-        # 1. Tâches en retard dans Q1
-        overdue_q1 = active_tasks.filter(
-            quadrant='Q1',
-            due_date__lt=now
-        ).order_by('due_date').first()
-        
-        if overdue_q1:
-            return overdue_q1
-        
-        # 2. Tâches Q1 dues aujourd'hui
-        end_of_day = now.replace(hour=23, minute=59, second=59)
-        today_q1 = active_tasks.filter(
-            quadrant='Q1',
-            due_date__lte=end_of_day
-        ).order_by('due_date').first()
-        
-        if today_q1:
-            return today_q1
-        
-        # 3. Tâches Q1 par score de priorité
-        q1_tasks = active_tasks.filter(quadrant='Q1')
-        if q1_tasks.exists():
-            return max(q1_tasks, key=lambda t: t.get_priority_score())
-        
-        # 4. Tâches Q2 par score de priorité
-        q2_tasks = active_tasks.filter(quadrant='Q2')
-        if q2_tasks.exists():
-            return max(q2_tasks, key=lambda t: t.get_priority_score())
-        
-        # 5. Sinon, n'importe quelle tâche active
-        return active_tasks.order_by('-importance_score', '-urgency_score').first()
+        if matrix is None:
+            matrix = TaskMatrix(user)
+        
+        return matrix.recommended()
     
     @staticmethod
-    def check_and_send_alerts(user):
+    def check_and_send_alerts(user, matrix=None):
         """
         Vérifie les tâches nécessitant des alertes.
         
-        Retourne une liste d'alertes à afficher à l'utilisateur.
+        Retourne une liste d'alertes à afficher à l'utilisateur :
+        tâches en retard, dues dans les 24h, et tâches Q2 devenant urgentes.
         
         Args:
             user: L'utilisateur Django
+            matrix (TaskMatrix): Instantané des tâches actives (optionnel)
         
         Returns:
             list: Liste de dictionnaires avec les alertes
         """
-        alerts = []
-        now = timezone.now()
-        
-        tasks = Task.objects.filter(user=user).exclude(status='DONE')
-        
-        # Alerte pour tâches en retard
-        overdue_tasks = tasks.filter(due_date__lt=now)
-        if overdue_tasks.exists():
-            alerts.append({
-                'type': 'danger',
-                'icon': '🚨',
-                'message': f"Vous avez {overdue_tasks.count()} tâche(s) en retard !",
-                'tasks': list(overdue_tasks[:3])  # Limite à 3 pour l'affichage
-            })
-        
-        # Alerte pour tâches dues dans les 24h
-        tomorrow = now + timedelta(hours=24)
-        due_soon = tasks.filter(due_date__gte=now, due_date__lte=tomorrow)
-        if due_soon.exists():
-            alerts.append({
-                'type': 'warning',
-                'icon': '⏰',
-                'message': f"{due_soon.count()} tâche(s) due(s) dans les 24 heures",
-                'tasks': list(due_soon[:3])
-            })
-        
-        # Alerte pour tâches importantes devenant urgentes
-        # (Q2 qui devrait passer en Q1)
-        q2_becoming_urgent = tasks.filter(
-            quadrant='Q2',
-            due_date__lte=now + timedelta(days=2)
-        )
-        if q2_becoming_urgent.exists():
-            alerts.append({
-                'type': 'info',
-                'icon': '📢',
-                'message': f"{q2_becoming_urgent.count()} tâche(s) importante(s) deviennent urgentes",
-                'tasks': list(q2_becoming_urgent[:3])
-            })
+        if matrix is None:
+            matrix = TaskMatrix(user)
         
-        return alerts
+        return matrix.alerts()
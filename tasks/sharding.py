@@ -0,0 +1,188 @@
+"""
+Répartition (sharding) des données de tâches par utilisateur sur plusieurs bases.
+
+Activée par `DB_SHARDS` (nombre de bases de tâches, 0 = désactivée) :
+- `Task`, `TaskArchive`, `TaskStatistics`, les dépendances, les
+  étiquettes et les empreintes (doublons) d'un utilisateur vivent dans
+  une seule base « shard » ; utilisateurs, sessions, jobs... restent
+  dans la base `default`
+- l'annuaire `UserShard` (base `default`) associe chaque utilisateur à son
+  shard ; un nouvel utilisateur est placé par hachage stable (crc32) de son
+  id, ce qui permet d'ajouter des shards sans déplacer les utilisateurs
+  existants
+- `ShardRouter` choisit la base de chaque requête : base de l'instance,
+  shard de l'utilisateur lié, sinon shard courant (`use_shard()`, posé pour
+  chaque requête HTTP par `ShardMiddleware`)
+- les traitements multi-utilisateurs (admin, archivage, récapitulatifs)
+  parcourent `task_databases()`
+
+Toutes les tables sont créées dans toutes les bases (`migrate --database
+shardN`), les clés étrangères vers `auth_user` n'y sont pas contraintes.
+"""
+
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+
+SHARDED_MODELS = {
+    'tasks.task', 'tasks.taskarchive', 'tasks.taskstatistics',
+    'tasks.taskdependency', 'tasks.taskclosure', 'tasks.tag', 'tasks.tasktag',
+    'tasks.tasktombstone', 'tasks.taskfingerprint', 'tasks.tasklshbucket',
+}
+DIRECTORY_CACHE_TIMEOUT = 3600
+
+# Shard courant : alias, ou fonction sans argument qui le calcule (requêtes HTTP)
+_current_shard = ContextVar('task_shard', default=None)
+_END = object()
+
+
+class ShardNotSelected(RuntimeError):
+    """Requête sur un modèle réparti sans utilisateur ni shard courant."""
+
+
+def task_databases():
+    """Bases contenant des tâches (la base `default` si le sharding est désactivé)."""
+    return list(settings.TASK_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def shard_for_user(user_id):
+    """Alias de la base des tâches de l'utilisateur (créé dans l'annuaire au besoin)."""
+    if not settings.TASK_SHARDS:
+        return DEFAULT_DB_ALIAS
+
+    key = f'task_shard:{user_id}'
+    alias = cache.get(key)
+    if alias is None:
+        from .models import UserShard
+
+        alias = settings.TASK_SHARDS[zlib.crc32(str(user_id).encode()) % len(settings.TASK_SHARDS)]
+        entry, _ = UserShard.objects.get_or_create(user_id=user_id, defaults={'alias': alias})
+        alias = entry.alias
+        cache.set(key, alias, DIRECTORY_CACHE_TIMEOUT)
+    return alias
+
+
+@contextmanager
+def use_shard(alias):
+    """Définit le shard courant pour les requêtes sans utilisateur identifiable."""
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def use_user_shard(user_id):
+    return use_shard(shard_for_user(user_id))
+
+
+def current_shard():
+    shard = _current_shard.get()
+    return shard() if callable(shard) else shard
+
+
+class ShardRouter:
+    """Routeur de base de données des modèles répartis par utilisateur."""
+
+    def _db(self, model, **hints):
+        if model._meta.label_lower not in SHARDED_MODELS:
+            # Y compris pour les relations depuis un objet d'un shard (task.user)
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._meta.label_lower in SHARDED_MODELS:
+                if instance._state.db:
+                    return instance._state.db
+                # Les dépendances n'ont pas d'utilisateur : shard courant
+                if getattr(instance, 'user_id', None) is not None:
+                    return shard_for_user(instance.user_id)
+            elif instance._meta.label_lower == 'auth.user' and instance.pk is not None:
+                # Gestionnaires liés : user.tasks.all()
+                return shard_for_user(instance.pk)
+
+        shard = current_shard()
+        if shard is None:
+            raise ShardNotSelected(
+                f"Aucun shard pour {model._meta.label} : utiliser use_shard() ou use_user_shard()."
+            )
+        return shard
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+        if labels & SHARDED_MODELS and 'auth.user' in labels:
+            return True
+        return None
+
+
+def _request_shard(request):
+    """Shard de l'utilisateur de la requête, calculé au premier accès seulement."""
+    shard = None
+
+    def resolve():
+        nonlocal shard
+        if shard is None and request.user.is_authenticated:
+            shard = shard_for_user(request.user.pk)
+        return shard
+
+    return resolve
+
+
+def _bind(streaming_content, shard):
+    """Réapplique le shard de la requête pendant la production d'une réponse en flux."""
+    iterator = iter(streaming_content)
+    while True:
+        token = _current_shard.set(shard)
+        try:
+            chunk = next(iterator, _END)
+        finally:
+            _current_shard.reset(token)
+        if chunk is _END:
+            return
+        yield chunk
+
+
+class ShardMiddleware:
+    """
+    Sélectionne le shard de l'utilisateur connecté pendant la requête.
+    À placer après AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TASK_SHARDS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        shard = _request_shard(request)
+        token = _current_shard.set(shard)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = _bind(response.streaming_content, shard)
+        return response
+
+
+def delete_user_shard_rows(sender, instance, **kwargs):
+    """
+    pre_delete de User : supprime les lignes du shard de l'utilisateur (la
+    cascade de Django ne parcourt que la base de l'utilisateur). Pour les gros
+    historiques, préférer `manage.py purge_user`.
+    """
+    from .models import Tag, Task, TaskArchive, TaskStatistics, TaskTombstone
+
+    with use_user_shard(instance.pk):
+        for model in (Task, TaskArchive, TaskStatistics, Tag, TaskTombstone):
+            model.objects.filter(user_id=instance.pk).delete()
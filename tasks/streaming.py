@@ -0,0 +1,46 @@
+"""
+Pages HTML envoyées en flux, section par section.
+
+`stream_page()` rend le gabarit de la page avec un marqueur à la place des
+sections : tout ce qui le précède (`<head>` et feuilles de style, en-tête,
+messages) part immédiatement, avant la moindre requête sur les tâches ;
+le navigateur charge CSS et scripts pendant que les sections sont
+calculées. Chaque section est ensuite rendue et envoyée dès que ses
+données sont prêtes, puis la fin de la page.
+
+Le gabarit de la page est rendu dans la vue, avant les middlewares : les
+messages affichés sont marqués comme lus et le cookie CSRF est posé
+normalement. Une erreur dans une section ne peut plus produire de page
+500 (l'en-tête est parti) : la page est tronquée et l'erreur journalisée
+par le serveur.
+"""
+
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+SECTIONS_MARKER = '<!--sections-->'
+
+
+def _chunks(request, head, sections, tail):
+    yield head
+    for template_name, context in sections:
+        yield render_to_string(template_name, context, request)
+    yield tail
+
+
+def stream_page(request, template_name, context, sections):
+    """
+    Réponse en flux : `template_name` (qui affiche `{{ sections }}`), puis
+    les sections.
+
+    Args:
+        sections: Itérable (générateur) de couples (gabarit, contexte),
+            calculés au fur et à mesure de l'envoi
+    """
+    get_token(request)
+    page = render_to_string(template_name, {**context, 'sections': mark_safe(SECTIONS_MARKER)}, request)
+    head, tail = page.split(SECTIONS_MARKER)
+    return StreamingHttpResponse(_chunks(request, head, sections, tail), content_type='text/html; charset=utf-8')
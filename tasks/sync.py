@@ -0,0 +1,78 @@
+"""
+Synchronisation différentielle des tâches (clients hors ligne, mobiles).
+
+`GET /tasks/api/sync/?since=<jeton>` (voir `tasks/api.py`) retourne les
+tâches créées ou modifiées depuis le jeton et les identifiants des tâches
+disparues depuis (supprimées, archivées ou réassignées : `TaskTombstone`) :
+- les deux sources forment un seul flux de changements (UNION ALL trié par
+  `(date, id)`), lu sur les index `(user, updated_at)` de `Task` et
+  `(user, deleted_at)` de `TaskTombstone` : une synchronisation sans
+  changement est une requête qui ne lit aucune ligne
+- les colonnes des tâches modifiées sont lues ensuite, en une requête
+- le jeton désigne le dernier changement transmis ; sur la dernière page il
+  recule de `SYNC_LAG` pour ne pas manquer une écriture validée en retard
+  (ces changements récents sont renvoyés, le client les applique à nouveau)
+- sans jeton, ou avec un jeton plus ancien que la rétention des traces
+  (`TASK_SYNC_TOMBSTONE_DAYS`), synchronisation complète
+
+Une tâche restaurée depuis l'archive (`TaskArchive.restore()`) reçoit une
+date de modification actuelle et perd sa trace : elle réapparaît à la
+synchronisation suivante.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from .models import Task, TaskTombstone
+
+
+SYNC_LIMIT = 500
+SYNC_LAG = timedelta(seconds=5)
+
+
+def tombstone_cutoff(now=None):
+    """Date avant laquelle les traces de suppression ne sont plus conservées."""
+    return (now or timezone.now()) - timedelta(days=settings.TASK_SYNC_TOMBSTONE_DAYS)
+
+
+def changes(user, since=None, limit=SYNC_LIMIT):
+    """
+    Au plus `limit` changements postérieurs à `since` (`(date, id)`, None
+    pour tout relire), triés : liste de `(date, id, supprimée)`.
+    """
+    tasks = Task.objects.filter(user=user)
+    if since is None:
+        # Synchronisation complète : les suppressions passées sont sans objet
+        stream = tasks.order_by().values_list('updated_at', 'pk', Value(False))
+    else:
+        at, pk = since
+        tasks = tasks.filter(Q(updated_at__gt=at) | Q(updated_at=at, pk__gt=pk))
+        tombstones = TaskTombstone.objects.filter(user=user).filter(
+            Q(deleted_at__gt=at) | Q(deleted_at=at, task_id__gt=pk)
+        )
+        stream = tasks.order_by().values_list('updated_at', 'pk', Value(False)).union(
+            tombstones.order_by().values_list('deleted_at', 'task_id', Value(True)),
+            all=True,
+        )
+    return list(stream.order_by('updated_at', 'id')[:limit])
+
+
+def task_rows(user, pks, fields):
+    """Colonnes `fields` des tâches `pks` (dictionnaires, avec `pk`)."""
+    if not pks:
+        return []
+    return list(
+        Task.objects
+        .filter(user=user, pk__in=pks)
+        .order_by('updated_at', 'pk')
+        .values('pk', *fields)
+    )
+
+
+def prune_tombstones(using=None, now=None):
+    """Supprime les traces plus anciennes que la rétention ; retourne leur nombre."""
+    deleted, _ = TaskTombstone.objects.using(using).filter(deleted_at__lt=tombstone_cutoff(now)).delete()
+    return deleted
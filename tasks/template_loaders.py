@@ -0,0 +1,62 @@
+"""
+Chargeur de templates compact.
+
+Supprime l'indentation, les lignes vides et les commentaires HTML d'une
+ligne du source des templates du projet, une seule fois au chargement
+(le résultat compilé est mis en cache par `cached.Loader`) : aucun coût
+par requête, contrairement à une minification de la réponse.
+"""
+
+import re
+
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+
+
+# Contenus où les espaces sont significatifs
+PRESERVE_START = re.compile(r'<(pre|textarea)\b', re.IGNORECASE)
+PRESERVE_END = re.compile(r'</(pre|textarea)>', re.IGNORECASE)
+
+# Ligne ne contenant qu'une balise de template ({% ... %} ou {# ... #}) :
+# son saut de ligne serait répété à chaque itération des boucles
+TAG_ONLY = re.compile(r'^(\{%.*%\}|\{#.*#\})$')
+HTML_COMMENT = re.compile(r'^<!--(?!\[if).*-->$')
+
+
+def compact(source):
+    """Retourne le source du template sans indentation ni lignes superflues."""
+    output = []
+    preserving = False
+
+    for line in source.splitlines():
+        if preserving:
+            output.append(line + '\n')
+            preserving = not PRESERVE_END.search(line)
+            continue
+
+        stripped = line.strip()
+        if not stripped or HTML_COMMENT.match(stripped):
+            continue
+
+        if PRESERVE_START.search(stripped) and not PRESERVE_END.search(stripped):
+            # Garder la fin de la ligne telle quelle
+            preserving = True
+            output.append(line.lstrip() + '\n')
+        elif TAG_ONLY.match(stripped):
+            output.append(stripped)
+        else:
+            output.append(stripped + '\n')
+
+    return ''.join(output)
+
+
+class CompactLoader(FilesystemLoader):
+    """
+    `filesystem.Loader` dont le source HTML est compacté avec `compact()`.
+    Les autres templates (e-mails en texte brut...) sont laissés tels quels.
+    """
+
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        if not origin.name.endswith('.html'):
+            return contents
+        return compact(contents)
@@ -0,0 +1,22 @@
+"""
+Balises de template des tâches.
+"""
+
+from django import template
+from django.utils.html import format_html
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def score_dots(score, symbol, css_class):
+    """
+    Affiche un score sur 5 (urgence, importance) avec deux <span> de texte
+    au lieu de cinq icônes : `{% score_dots task.urgency_score '●' 'dot-u' %}`.
+    """
+    score = max(0, min(5, int(score)))
+    return format_html(
+        '<span class="{}">{}</span><span class="dot-off">{}</span>',
+        css_class, symbol * score, symbol * (5 - score),
+    )
@@ -1,3 +1,1686 @@
-from django.test import TestCase
+"""
+Tests de budget de requêtes SQL.
 
-# Create your tests here.
+Chaque vue et chaque méthode de TaskIntelligenceService est exécutée pour un
+utilisateur avec peu de tâches puis pour un utilisateur avec beaucoup de
+tâches : le nombre de requêtes doit rester sous un budget explicite et ne
+pas dépendre du nombre de tâches (pas de N+1).
+"""
+
+import difflib
+import gzip
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from time import sleep
+from unittest import mock, skipIf, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .analytics import TaskHistory, get_analytics
+from .api import DEFAULT_LIMIT, encode_cursor
+from .compression import accepted_encodings
+from .dependencies import DependencyCycle, add_dependency, is_blocked, remove_dependency, unblocked_by
+from .digest import send_alert_digests
+from .duplicates import find_duplicates, index_missing, signature, similar_tasks, similarity
+from .ical import feed_window, fold
+from .jobs import purge_user, registry, requeue_stale, work
+from .matrix import TaskMatrix
+from .models import (
+    AlertDigestRun, CalendarFeed, Job, Tag, Task, TaskArchive, TaskClosure, TaskFingerprint, TaskStatistics, TaskTag,
+    TaskTombstone, UserShard,
+)
+from .reconcile import STAT_FIELDS, expected_statistics, reconcile_range
+from .sharding import shard_for_user, task_databases, use_shard, use_user_shard
+from .services import TaskIntelligenceService
+from .template_loaders import compact
+
+
+SMALL_TASK_COUNT = 4
+LARGE_TASK_COUNT = 200
+
+# Base des jeux de données : avec DB_SHARDS, le premier shard (celui que l'admin
+# affiche par défaut), sinon `default`
+FIXTURE_DB = task_databases()[0]
+
+
+def _normalize(sql):
+    """Masque les valeurs littérales pour comparer la forme des requêtes."""
+    sql = re.sub(r"'[^']*'", "'?'", sql)
+    return re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+
+
+def read(response):
+    """
+    Contenu de la réponse. Une réponse en flux (dashboard) produit ses
+    sections, et leurs requêtes, pendant cette lecture.
+    """
+    if not response.streaming:
+        return response.content
+    content = b''.join(response.streaming_content)
+    response.streaming_content = [content]  # Encore lisible par assertContains
+    return content
+
+
+def create_user(username, **fields):
+    """Utilisateur de test ; avec DB_SHARDS, placé dans le shard des jeux de données."""
+    user = User.objects.create_user(username, **fields)
+    if settings.TASK_SHARDS:
+        UserShard.objects.create(user=user, alias=FIXTURE_DB)
+    return user
+
+
+class capture_queries:
+    """
+    Comme `capture_queries()`, sur la base `default` et celle
+    des jeux de données (requêtes de la base `default` d'abord).
+    """
+
+    def __init__(self):
+        self.contexts = [CaptureQueriesContext(connections[alias]) for alias in dict.fromkeys((DEFAULT_DB_ALIAS, FIXTURE_DB))]
+
+    def __enter__(self):
+        for context in self.contexts:
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in self.contexts:
+            context.__exit__(*exc_info)
+
+    @property
+    def captured_queries(self):
+        return [query for context in self.contexts for query in context.captured_queries]
+
+    def __len__(self):
+        return len(self.captured_queries)
+
+    def __iter__(self):
+        return iter(self.captured_queries)
+
+
+def seed_tasks(user, count):
+    """Crée `count` tâches réparties sur les quadrants, statuts et échéances."""
+    now = timezone.now()
+    tasks = []
+    for i in range(count):
+        task = Task(
+            user=user,
+            title=f'Tâche {i}',
+            description=f'Description de la tâche {i}',
+            due_date=now + timedelta(hours=(i * 7) % 240 - 48),
+            urgency_score=i % 5 + 1,
+            importance_score=(i * 3) % 5 + 1,
+            status=['TODO', 'IN_PROGRESS', 'DONE'][i % 3],
+            recurrence='WEEKLY' if i % 10 == 0 else '',
+        )
+        task.quadrant = task.calculate_quadrant()
+        tasks.append(task)
+    Task.objects.bulk_create(tasks)
+
+    stats, _ = TaskStatistics.objects.get_or_create(user=user)
+    stats.update_statistics()
+
+
+class FixtureTestCase(TestCase):
+    """
+    Tests sur des jeux de données, avec ou sans DB_SHARDS : les utilisateurs
+    (`create_user`) et leurs tâches sont dans `FIXTURE_DB`, shard courant des
+    requêtes sans utilisateur identifiable (`Task.objects.filter(...)`).
+    """
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(use_shard(FIXTURE_DB))
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+
+
+class QueryBudgetTestCase(FixtureTestCase):
+    """
+    Fournit `assertQueryBudget(budget, action)` : `action(user)` est exécutée
+    pour le petit et le grand jeu de données.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small_user = create_user('petit', password='motdepasse')
+        cls.large_user = create_user('grand', password='motdepasse')
+        seed_tasks(cls.small_user, SMALL_TASK_COUNT)
+        seed_tasks(cls.large_user, LARGE_TASK_COUNT)
+
+    def setUp(self):
+        super().setUp()
+        # Connexion hors mesure : un client (et une session) par utilisateur
+        self.clients = {}
+        for user in (self.small_user, self.large_user):
+            self.clients[user.pk] = Client()
+            self.clients[user.pk].force_login(user)
+
+    def _capture(self, action, user):
+        # Annuaire des shards en cache, comme en production après la première requête
+        shard_for_user(user.pk)
+        with capture_queries() as context:
+            action(user)
+        return [query['sql'] for query in context.captured_queries]
+
+    def assertQueryBudget(self, budget, action):
+        small = self._capture(action, self.small_user)
+        large = self._capture(action, self.large_user)
+
+        problems = []
+        if len(large) != len(small):
+            problems.append(
+                f"Le nombre de requêtes dépend du nombre de tâches : "
+                f"{len(small)} pour {SMALL_TASK_COUNT} tâches, {len(large)} pour {LARGE_TASK_COUNT}."
+            )
+        if max(len(small), len(large)) > budget:
+            problems.append(f"Budget dépassé : {max(len(small), len(large))} requêtes pour un budget de {budget}.")
+
+        if problems:
+            diff = difflib.unified_diff(
+                [_normalize(sql) for sql in small],
+                [_normalize(sql) for sql in large],
+                fromfile=f'{SMALL_TASK_COUNT} tâches',
+                tofile=f'{LARGE_TASK_COUNT} tâches',
+                lineterm='',
+            )
+            listing = '\n'.join(f'{i:3}. {sql}' for i, sql in enumerate(large, 1))
+            self.fail('\n'.join(problems) + '\n\nDiff des requêtes :\n' + '\n'.join(diff)
+                      + '\n\nRequêtes (grand jeu) :\n' + listing)
+
+    def first_active_task(self, user):
+        return Task.objects.filter(user=user).exclude(status='DONE').order_by('pk').values_list('pk', flat=True).first()
+
+    def active_task_budget(self, budget, action):
+        """Comme assertQueryBudget, `action(user, pk)` reçoit une tâche active résolue hors mesure."""
+        targets = {user.pk: self.first_active_task(user) for user in (self.small_user, self.large_user)}
+        self.assertQueryBudget(budget, lambda user: action(user, targets[user.pk]))
+
+
+class ViewQueryBudgetTests(QueryBudgetTestCase):
+    """Budgets des vues (session et utilisateur inclus : 2 requêtes)."""
+
+    def get(self, user, name, *args, **params):
+        response = self.clients[user.pk].get(reverse(name, args=args), params)
+        self.assertIn(response.status_code, (200, 302))
+        read(response)
+        return response
+
+    def post(self, user, name, *args, data=None, ajax=False):
+        headers = {'X-Requested-With': 'XMLHttpRequest'} if ajax else {}
+        response = self.clients[user.pk].post(reverse(name, args=args), data or {}, headers=headers)
+        self.assertIn(response.status_code, (200, 302))
+        return response
+
+    def test_dashboard(self):
+        self.assertQueryBudget(7, lambda user: self.get(user, 'tasks:dashboard'))
+
+    def test_dashboard_with_filters(self):
+        self.assertQueryBudget(5, lambda user: self.get(
+            user, 'tasks:dashboard', status='TODO', quadrant='Q1', search='tâche'
+        ))
+
+    def test_dashboard_head_is_sent_before_task_queries(self):
+        response = self.clients[self.large_user.pk].get(reverse('tasks:dashboard'))
+        self.assertTrue(response.streaming)
+        chunks = iter(response.streaming_content)
+        with capture_queries() as queries:
+            head = next(chunks)
+        self.assertIn(b'</head>', head)
+        self.assertEqual(len(queries), 0)
+
+        body = b''.join(chunks)
+        self.assertIn('Q1 - Urgent & Important'.encode(), body)
+        self.assertTrue(body.rstrip().endswith(b'</html>'))
+
+    def test_statistics(self):
+        self.assertQueryBudget(18, lambda user: self.get(user, 'tasks:statistics'))
+
+    def test_task_create_form(self):
+        self.assertQueryBudget(3, lambda user: self.get(user, 'tasks:task_create'))
+
+    def test_task_create(self):
+        due_date = (timezone.localtime() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')
+        # Empreinte MinHash : 2 INSERT + point de sauvegarde, 1 requête de doublons
+        self.assertQueryBudget(18, lambda user: self.post(user, 'tasks:task_create', data={
+            'title': 'Nouvelle tâche',
+            'due_date': due_date,
+            'urgency_score': 3,
+            'importance_score': 4,
+            'status': 'TODO',
+            'recurrence_interval': 1,
+        }))
+
+    def test_task_quick_create(self):
+        due_date = (timezone.localtime() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')
+        self.assertQueryBudget(18, lambda user: self.post(user, 'tasks:task_quick_create', data={
+            'title': 'Tâche rapide',
+            'due_date': due_date,
+        }))
+
+    def test_task_update_form(self):
+        self.active_task_budget(6, lambda user, pk: self.get(
+            user, 'tasks:task_update', pk
+        ))
+
+    def test_task_update(self):
+        due_date = (timezone.localtime() + timedelta(days=5)).strftime('%Y-%m-%dT%H:%M')
+        # Titre modifié : empreinte remplacée (2 DELETE, 2 INSERT, point de sauvegarde) et doublons ;
+        # version vérifiée sous verrou (SELECT ... FOR UPDATE, point de sauvegarde) puis relue
+        self.active_task_budget(17, lambda user, pk: self.post(user, 'tasks:task_update', pk, data={
+            'title': 'Tâche modifiée',
+            'due_date': due_date,
+            'urgency_score': 2,
+            'importance_score': 5,
+            'status': 'IN_PROGRESS',
+            'recurrence_interval': 1,
+        }))
+
+    def test_task_delete_form(self):
+        self.active_task_budget(3, lambda user, pk: self.get(
+            user, 'tasks:task_delete', pk
+        ))
+
+    def test_task_delete(self):
+        # Trace de suppression écrite avec la suppression (INSERT + point de sauvegarde),
+        # empreinte et seaux LSH supprimés en cascade, dépendances directes lues (detach_tasks)
+        self.active_task_budget(23, lambda user, pk: self.post(
+            user, 'tasks:task_delete', pk
+        ))
+
+    def test_task_toggle_status(self):
+        # Occurrence suivante : l'occurrence terminée est enregistrée puis sa version relue,
+        # l'empreinte de la nouvelle occurrence est écrite (point de sauvegarde + 2 INSERT)
+        self.active_task_budget(22, lambda user, pk: self.post(
+            user, 'tasks:task_toggle_status', pk, ajax=True
+        ))
+
+    def test_task_update_quadrant(self):
+        # Sans version envoyée, la nouvelle version est relue pour la réponse
+        self.active_task_budget(4, lambda user, pk: self.post(
+            user, 'tasks:task_update_quadrant', pk,
+            data={'quadrant': 'Q1'}, ajax=True
+        ))
+
+    def test_task_archive(self):
+        self.assertQueryBudget(3, lambda user: self.get(user, 'tasks:task_archive'))
+
+
+@override_settings(TASK_JOBS_ASYNC=True)
+class AsyncJobsViewQueryBudgetTests(ViewQueryBudgetTests):
+    """
+    Budgets des vues d'écriture quand le recalcul des statistiques est mis en
+    file (`TASK_JOBS_ASYNC`) : un INSERT dans `Job` et son point de sauvegarde
+    remplacent le recalcul. Les autres vues héritent des budgets synchrones
+    (`task_update` ne planifie un recalcul qu'à la fin d'une série).
+    """
+
+    def test_job_is_enqueued_once_per_user(self):
+        for _ in range(2):
+            self.post(self.small_user, 'tasks:task_toggle_status', self.first_active_task(self.small_user), ajax=True)
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'payload', 'status')),
+            [('update_statistics', {'user_id': self.small_user.pk}, 'PENDING')],
+        )
+
+    def test_task_create(self):
+        due_date = (timezone.localtime() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')
+        self.assertQueryBudget(11, lambda user: self.post(user, 'tasks:task_create', data={
+            'title': 'Nouvelle tâche',
+            'due_date': due_date,
+            'urgency_score': 3,
+            'importance_score': 4,
+            'status': 'TODO',
+            'recurrence_interval': 1,
+        }))
+
+    def test_task_quick_create(self):
+        due_date = (timezone.localtime() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')
+        self.assertQueryBudget(11, lambda user: self.post(user, 'tasks:task_quick_create', data={
+            'title': 'Tâche rapide',
+            'due_date': due_date,
+        }))
+
+    def test_task_delete(self):
+        self.active_task_budget(16, lambda user, pk: self.post(
+            user, 'tasks:task_delete', pk
+        ))
+
+    def test_task_toggle_status(self):
+        self.active_task_budget(15, lambda user, pk: self.post(
+            user, 'tasks:task_toggle_status', pk, ajax=True
+        ))
+
+
+class ServiceQueryBudgetTests(QueryBudgetTestCase):
+    """Budgets des méthodes de TaskIntelligenceService."""
+
+    def test_suggest_priority(self):
+        self.assertQueryBudget(0, lambda user: TaskIntelligenceService.suggest_priority(
+            'Réunion client importante', '', timezone.now() + timedelta(hours=5)
+        ))
+
+    def test_get_tasks_requiring_attention(self):
+        self.assertQueryBudget(1, lambda user: list(
+            TaskIntelligenceService.get_tasks_requiring_attention(user)
+        ))
+
+    def test_get_productivity_insights(self):
+        self.assertQueryBudget(2, TaskIntelligenceService.get_productivity_insights)
+
+    def test_get_next_recommended_task(self):
+        self.assertQueryBudget(1, TaskIntelligenceService.get_next_recommended_task)
+
+    def test_check_and_send_alerts(self):
+        self.assertQueryBudget(1, TaskIntelligenceService.check_and_send_alerts)
+
+
+class CompactHtmlTests(QueryBudgetTestCase):
+    """Taille des pages : templates compactés et compression des réponses."""
+
+    def test_compact_removes_indentation_and_tag_only_lines(self):
+        source = '<ul>\n    {% for i in items %}\n        <li>{{ i }}</li>\n\n    {% endfor %}\n    <!-- fin -->\n</ul>\n'
+        self.assertEqual(compact(source), '<ul>\n{% for i in items %}<li>{{ i }}</li>\n{% endfor %}</ul>\n')
+
+    def test_compact_preserves_textarea(self):
+        source = '<div>\n    <textarea>\n  ligne 1\n\n  ligne 2</textarea>\n</div>\n'
+        self.assertEqual(compact(source), '<div>\n<textarea>\n  ligne 1\n\n  ligne 2</textarea>\n</div>\n')
+
+    def test_dashboard_is_gzipped(self):
+        client = self.clients[self.large_user.pk]
+        plain = read(client.get(reverse('tasks:dashboard')))
+        response = client.get(reverse('tasks:dashboard'), headers={'Accept-Encoding': 'gzip'})
+        compressed = read(response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(compressed), len(plain) / 5)
+        # Seul le jeton CSRF diffère d'une réponse à l'autre
+        csrf = re.compile(rb'[a-zA-Z0-9]{64}')
+        self.assertEqual(csrf.sub(b'', gzip.decompress(compressed)), csrf.sub(b'', plain))
+
+    def test_small_responses_are_not_compressed(self):
+        task = self.first_active_task(self.small_user)
+        response = self.clients[self.small_user.pk].post(
+            reverse('tasks:task_update_quadrant', args=[task]),
+            {'quadrant': 'Q1'},
+            headers={'Accept-Encoding': 'gzip', 'X-Requested-With': 'XMLHttpRequest'},
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip;q=1.0, br;q=0, identity'), {'gzip', 'identity'})
+
+
+class TaskFlagsTests(QueryBudgetTestCase):
+    """Indicateurs calculés en SQL par Task.objects.with_flags()."""
+
+    def test_flags_match_python_rules(self):
+        now = timezone.now()
+        tasks = list(Task.objects.filter(user=self.large_user).with_flags(now))
+
+        for task in tasks:
+            until_due = task.due_date - now
+            expected_priority = (task.urgency_score + task.importance_score) * 10
+            if until_due < timedelta(hours=24):
+                expected_priority += 20
+            elif until_due < timedelta(days=3):
+                expected_priority += 10
+
+            self.assertEqual(task.is_overdue, task.due_date < now and task.status != 'DONE')
+            self.assertEqual(task.is_due_soon, timedelta(0) < until_due < timedelta(hours=24))
+            self.assertEqual(task.get_priority_score(), min(expected_priority, 100))
+
+    def test_flags_use_the_given_instant(self):
+        task = Task.objects.filter(user=self.small_user).exclude(status='DONE').first()
+        before = Task.objects.with_flags(task.due_date - timedelta(hours=1)).get(pk=task.pk)
+        after = Task.objects.with_flags(task.due_date + timedelta(hours=1)).get(pk=task.pk)
+
+        self.assertTrue(before.is_due_soon)
+        self.assertFalse(before.is_overdue)
+        self.assertTrue(after.is_overdue)
+        self.assertFalse(after.is_due_soon)
+
+
+class AnalyticsTests(QueryBudgetTestCase):
+    """Métriques vectorisées de tasks/analytics.py."""
+
+    def test_metrics_match_row_by_row_computation(self):
+        now = timezone.now()
+        analytics = TaskHistory.load(self.large_user).compute(now)
+        done = [t for t in Task.objects.filter(user=self.large_user) if t.status == 'DONE']
+
+        self.assertEqual(analytics['total'], LARGE_TASK_COUNT)
+        self.assertEqual(analytics['completed'], len(done))
+        self.assertEqual(sum(b['count'] for b in analytics['lead_distribution']), len(done))
+        for quadrant in ('Q1', 'Q2', 'Q3', 'Q4'):
+            self.assertEqual(
+                analytics['quadrants'][quadrant]['completed'],
+                sum(1 for t in done if t.quadrant == quadrant),
+            )
+        on_time = sum(1 for t in done if t.updated_at <= t.due_date)
+        self.assertEqual(analytics['on_time_rate'], round(100 * on_time / len(done)))
+
+    def test_empty_history(self):
+        user = create_user('vide')
+        analytics = TaskHistory.load(user).compute(timezone.now())
+
+        self.assertEqual(analytics['total'], 0)
+        self.assertIsNone(analytics['lead_p50'])
+        self.assertEqual(len(analytics['weekly_trend']), 12)
+
+    def test_results_are_cached_until_history_changes(self):
+        get_analytics(self.small_user)
+        with capture_queries() as context:
+            get_analytics(self.small_user)
+        self.assertEqual(len(context.captured_queries), 2)  # version seulement
+
+        Task.objects.create(user=self.small_user, title='Nouvelle', due_date=timezone.now())
+        self.assertEqual(get_analytics(self.small_user)['total'], SMALL_TASK_COUNT + 1)
+
+
+# Entrées des tâches enregistrées (les occurrences générées ont un suffixe)
+STORED_UID = re.compile(r'UID:task-\d+@')
+
+
+class CalendarFeedTests(QueryBudgetTestCase):
+    """Flux iCalendar : contenu, réponses 304 et cache des entrées."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tokens = {
+            user.pk: CalendarFeed.objects.create(user=user).token
+            for user in (cls.small_user, cls.large_user)
+        }
+
+    def get_feed(self, user, **headers):
+        response = Client().get(reverse('tasks:calendar_feed', args=[self.tokens[user.pk]]), headers=headers)
+        if response.streaming:
+            response.body = b''.join(response.streaming_content).decode('utf-8')
+        return response
+
+    def test_feed_lists_due_dates(self):
+        response = self.get_feed(self.large_user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(response.body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(len(STORED_UID.findall(response.body)), LARGE_TASK_COUNT)
+        for line in response.body.split('\r\n'):
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+
+    def test_todo_entries(self):
+        body = b''.join(Client().get(
+            reverse('tasks:calendar_feed', args=[self.tokens[self.small_user.pk]]), {'kind': 'todo'}
+        ).streaming_content).decode('utf-8')
+
+        self.assertEqual(len(STORED_UID.findall(body)), SMALL_TASK_COUNT)
+        self.assertIn('STATUS:COMPLETED', body)
+
+    def test_window_starts_at_local_midnight(self):
+        # 00:30 à Paris, encore la veille en UTC (heure des requêtes)
+        local = timezone.make_aware(datetime(2026, 3, 29, 0, 30))
+        start, end = feed_window(local.astimezone(dt_timezone.utc))
+        self.assertEqual(start, timezone.make_aware(datetime(2026, 2, 27)))
+        # Passage à l'heure d'été dans la fenêtre : la fin reste à minuit local
+        self.assertEqual(end, timezone.make_aware(datetime(2027, 3, 29)))
+        self.assertEqual(feed_window(local + timedelta(hours=22)), (start, end))
+
+    def test_unknown_token(self):
+        response = Client().get(reverse('tasks:calendar_feed', args=['inconnu']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_unchanged_feed_returns_304(self):
+        etag = self.get_feed(self.large_user)['ETag']
+        with capture_queries() as context:
+            response = self.get_feed(self.large_user, if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 2)  # jeton + agrégat
+
+        task = Task.objects.filter(user=self.large_user).first()
+        task.title = 'Renommée'
+        task.save()
+        self.assertEqual(self.get_feed(self.large_user, if_none_match=etag).status_code, 200)
+
+    def test_entries_are_cached_per_task_version(self):
+        self.get_feed(self.large_user)
+        task = Task.objects.filter(user=self.large_user).first()
+        task.title = 'Renommée'
+        task.save()
+
+        with capture_queries() as context:
+            body = self.get_feed(self.large_user).body
+
+        # jeton + agrégat + (pk, updated_at) + relecture de la seule tâche modifiée + séries
+        self.assertEqual(len(context.captured_queries), 5)
+        self.assertIn('SUMMARY:Renommée', body)
+        self.assertEqual(len(STORED_UID.findall(body)), LARGE_TASK_COUNT)
+
+    def test_recurring_series_are_expanded(self):
+        now = timezone.now()
+        series = Task.objects.create(
+            user=self.small_user, title='Point hebdomadaire', due_date=now + timedelta(days=2),
+            urgency_score=3, importance_score=4, recurrence='WEEKLY',
+            recurrence_end=now + timedelta(days=31),
+        )
+        # Série en retard : ses occurrences à venir sont publiées, elle-même est hors fenêtre
+        overdue = Task.objects.create(
+            user=self.small_user, title='Relevé mensuel', due_date=now - timedelta(days=100),
+            urgency_score=2, importance_score=2, recurrence='MONTHLY',
+        )
+        etag = self.get_feed(self.small_user)['ETag']
+        body = self.get_feed(self.small_user).body
+
+        self.assertEqual(len(re.findall(rf'UID:task-{series.pk}-\d{{8}}T\d{{6}}Z@', body)), 4)
+        self.assertNotIn(f'UID:task-{overdue.pk}@', body)
+        self.assertGreaterEqual(len(re.findall(rf'UID:task-{overdue.pk}-', body)), 12)
+
+        overdue.recurrence = ''
+        overdue.save()
+        response = self.get_feed(self.small_user, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(f'UID:task-{overdue.pk}-', response.body)
+
+    def test_regenerate_token(self):
+        old_token = self.tokens[self.small_user.pk]
+        self.clients[self.small_user.pk].post(reverse('tasks:calendar_settings'))
+
+        self.assertNotEqual(CalendarFeed.objects.get(user=self.small_user).token, old_token)
+        response = Client().get(reverse('tasks:calendar_feed', args=[old_token]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_fold_keeps_utf8_characters_whole(self):
+        folded = fold('SUMMARY:' + 'é' * 80)
+        lines = folded.split('\r\n')
+
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in lines))
+        self.assertEqual(''.join(line[1:] if i else line for i, line in enumerate(lines)), 'SUMMARY:' + 'é' * 80)
+
+
+class TaskApiTests(QueryBudgetTestCase):
+    """API JSON : pagination par curseur, filtres et champs demandés."""
+
+    def get_page(self, user, url=None, **params):
+        response = self.clients[user.pk].get(url or reverse('tasks:api_task_list'), params)
+        return response, json.loads(response.content)
+
+    def test_cursor_walks_every_task_once(self):
+        ids, url, pages = [], None, 0
+        while True:
+            response, data = self.get_page(self.large_user, url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(task['id'] for task in data['results'])
+            pages += 1
+            url = data['next']
+            if not url:
+                break
+
+        expected = Task.objects.filter(user=self.large_user).order_by('due_date', 'pk')
+        self.assertEqual(ids, list(expected.values_list('pk', flat=True)))
+        self.assertEqual(pages, -(-LARGE_TASK_COUNT // DEFAULT_LIMIT))
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        _, first = self.get_page(self.large_user, limit=10)
+        url = first['next']
+        for _ in range(10):
+            url = self.get_page(self.large_user, url)[1]['next']
+
+        with capture_queries() as first_page:
+            self.get_page(self.large_user, limit=10)
+        with capture_queries() as deep_page:
+            self.get_page(self.large_user, url)
+
+        self.assertEqual(len(first_page.captured_queries), len(deep_page.captured_queries))
+        for query in deep_page.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_sparse_fieldsets_select_only_requested_columns(self):
+        with capture_queries() as context:
+            _, data = self.get_page(self.small_user, fields='title,priority')
+
+        self.assertEqual(set(data['results'][0]), {'id', 'title', 'priority'})
+        task_queries = [q['sql'] for q in context.captured_queries if 'tasks_task' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertNotIn('description', task_queries[0])
+
+    def test_description_is_excluded_by_default(self):
+        _, data = self.get_page(self.small_user)
+        self.assertNotIn('description', data['results'][0])
+        _, data = self.get_page(self.small_user, fields='description')
+        self.assertTrue(data['results'][0]['description'].startswith('Description'))
+
+    def test_filters_mirror_dashboard(self):
+        _, data = self.get_page(self.large_user, status='DONE', quadrant='Q1', fields='status,quadrant', limit=200)
+        expected = Task.objects.filter(user=self.large_user, status='DONE', quadrant='Q1').count()
+
+        self.assertEqual(len(data['results']), expected)
+        self.assertTrue(all(t['status'] == 'DONE' and t['quadrant'] == 'Q1' for t in data['results']))
+
+    def test_invalid_parameters(self):
+        for params in ({'fields': 'user'}, {'cursor': 'pas-un-curseur'}, {'status': 'X'}, {'limit': 'a'}):
+            response, data = self.get_page(self.small_user, **params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', data)
+
+    def test_requires_authentication(self):
+        response = Client().get(reverse('tasks:api_task_list'))
+        self.assertEqual(response.status_code, 401)
+
+
+
+class TaskSyncTests(QueryBudgetTestCase):
+    """Synchronisation différentielle : tâches modifiées et traces de suppression."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Hors de la fenêtre SYNC_LAG : une synchronisation suivante ne renvoie rien
+        Task.objects.update(updated_at=F('updated_at') - timedelta(hours=1))
+
+    def sync(self, user, since=None):
+        params = {'since': since} if since else {}
+        response = self.clients[user.pk].get(reverse('tasks:api_task_sync'), params)
+        return response, json.loads(response.content)
+
+    def test_first_sync_returns_every_task(self):
+        response, data = self.sync(self.large_user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['reset'])
+        self.assertFalse(data['more'])
+        self.assertEqual(len(data['tasks']), LARGE_TASK_COUNT)
+        self.assertIn('description', data['tasks'][0])
+        self.assertEqual(data['deleted'], [])
+
+    def test_no_change_sync_is_one_indexed_probe(self):
+        tokens = {user.pk: self.sync(user)[1]['next'] for user in (self.small_user, self.large_user)}
+        self.assertQueryBudget(3, lambda user: self.sync(user, tokens[user.pk]))
+
+        with capture_queries() as context:
+            _, data = self.sync(self.large_user, tokens[self.large_user.pk])
+        self.assertEqual((data['tasks'], data['deleted'], data['reset']), ([], [], False))
+        task_queries = [q['sql'] for q in context.captured_queries if 'tasks_task' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertIn('UNION ALL', task_queries[0])
+
+    def test_returns_changes_and_deletions_since_token(self):
+        token = self.sync(self.large_user)[1]['next']
+        changed, deleted = Task.objects.filter(user=self.large_user).exclude(status='DONE').order_by('pk')[:2]
+        Task.objects.update_if_version(changed.pk, changed.version, status='DONE')
+        self.clients[self.large_user.pk].post(reverse('tasks:task_delete', args=[deleted.pk]))
+
+        _, data = self.sync(self.large_user, token)
+
+        self.assertEqual([(task['id'], task['status']) for task in data['tasks']], [(changed.pk, 'DONE')])
+        self.assertEqual(data['deleted'], [deleted.pk])
+        self.assertFalse(data['reset'])
+
+    def test_admin_owner_change_is_reported_as_deleted(self):
+        token = self.sync(self.small_user)[1]['next']
+        task = Task.objects.filter(user=self.small_user).first()
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+        local_due = timezone.localtime(task.due_date)
+        client.post(reverse('admin:tasks_task_change', args=[task.pk]), {
+            'user': self.large_user.pk, 'title': task.title, 'description': task.description,
+            'urgency_score': task.urgency_score, 'importance_score': task.importance_score, 'status': task.status,
+            'due_date_0': f'{local_due:%Y-%m-%d}', 'due_date_1': f'{local_due:%H:%M:%S}',
+            'recurrence': task.recurrence, 'recurrence_interval': 1,
+        })
+
+        _, data = self.sync(self.small_user, token)
+        self.assertEqual(data['deleted'], [task.pk])
+        self.assertEqual(data['tasks'], [])
+
+    def test_archived_tasks_are_reported_as_deleted(self):
+        token = self.sync(self.small_user)[1]['next']
+        done = list(Task.objects.filter(user=self.small_user, status='DONE').values_list('pk', flat=True))
+        Task.objects.filter(pk__in=done).update(updated_at=timezone.now() - timedelta(days=365))
+
+        call_command('archive_tasks', stdout=io.StringIO())
+
+        _, data = self.sync(self.small_user, token)
+        self.assertEqual(sorted(data['deleted']), sorted(done))
+        self.assertEqual(data['tasks'], [])
+
+        # Traces expirées supprimées par archive_tasks
+        TaskTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=settings.TASK_SYNC_TOMBSTONE_DAYS + 1))
+        call_command('archive_tasks', stdout=io.StringIO())
+        self.assertFalse(TaskTombstone.objects.exists())
+
+    def test_restored_task_is_synced_again(self):
+        done = Task.objects.filter(user=self.small_user, status='DONE').values_list('pk', flat=True).first()
+        Task.objects.filter(pk=done).update(updated_at=timezone.now() - timedelta(days=365))
+        call_command('archive_tasks', stdout=io.StringIO())
+        _, data = self.sync(self.small_user)
+        self.assertNotIn(done, [task['id'] for task in data['tasks']])
+
+        archive = TaskArchive.objects.get(original_id=done)
+        self.assertTrue(TaskTombstone.objects.filter(user=self.small_user, task_id=done).exists())
+        self.clients[self.small_user.pk].post(reverse('tasks:task_restore', args=[archive.pk]))
+        self.assertFalse(TaskTombstone.objects.filter(task_id=done).exists())
+
+        _, data = self.sync(self.small_user, data['next'])
+        self.assertEqual([(task['id'], task['status']) for task in data['tasks']], [(done, 'DONE')])
+        self.assertEqual(data['deleted'], [])
+
+    def test_pages_cover_every_task_once(self):
+        ids, token = [], None
+        with mock.patch('tasks.api.SYNC_LIMIT', 30):
+            while True:
+                _, data = self.sync(self.large_user, token)
+                ids.extend(task['id'] for task in data['tasks'])
+                token = data['next']
+                if not data['more']:
+                    break
+
+        self.assertEqual(sorted(ids), list(Task.objects.filter(user=self.large_user).order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_expired_token_forces_full_sync(self):
+        stale = encode_cursor(timezone.now() - timedelta(days=settings.TASK_SYNC_TOMBSTONE_DAYS + 1), 0)
+        _, data = self.sync(self.small_user, stale)
+
+        self.assertTrue(data['reset'])
+        self.assertEqual(len(data['tasks']), SMALL_TASK_COUNT)
+
+    def test_invalid_token_and_authentication(self):
+        response, _ = self.sync(self.small_user, 'pas-un-jeton')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Client().get(reverse('tasks:api_task_sync')).status_code, 401)
+
+
+class OptimisticConcurrencyTests(QueryBudgetTestCase):
+    """Modifications conditionnelles sur la version des tâches."""
+
+    def post(self, url_name, pk, **data):
+        return self.clients[self.small_user.pk].post(
+            reverse(url_name, args=[pk]), data, headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+
+    def test_save_increments_version(self):
+        task = Task.objects.create(user=self.small_user, title='Versionnée', due_date=timezone.now())
+        self.assertEqual(task.version, 0)
+        task.title = 'Renommée'
+        task.save()
+        task.save(update_fields=['title'])
+        self.assertEqual(Task.objects.get(pk=task.pk).version, 2)
+        self.assertEqual(task.version, 2)
+
+        # Instance périmée : le numéro écrit suit la ligne, pas la mémoire
+        stale = Task.objects.get(pk=task.pk)
+        task.save()
+        stale.save()
+        self.assertEqual(stale.version, 4)
+
+    def test_stale_form_does_not_revert_toggle(self):
+        task = Task.objects.get(pk=self.first_active_task(self.small_user))
+        data = {
+            'title': task.title, 'due_date': timezone.localtime(task.due_date).strftime('%Y-%m-%dT%H:%M'),
+            'urgency_score': 2, 'importance_score': 5, 'status': task.status, 'recurrence_interval': 1,
+            'version': task.version,
+        }
+        self.post('tasks:task_toggle_status', task.pk, version=task.version)
+
+        client = self.clients[self.small_user.pk]
+        response = client.post(reverse('tasks:task_update', args=[task.pk]), data)
+        self.assertContains(response, 'modifiée entre-temps', status_code=409)
+        self.assertEqual(Task.objects.get(pk=task.pk).status, 'DONE')
+
+        # Second envoi, sur la version réaffichée : enregistré
+        data['version'] = response.context['form'].data['version']
+        self.assertEqual(client.post(reverse('tasks:task_update', args=[task.pk]), data).status_code, 302)
+        self.assertEqual(Task.objects.get(pk=task.pk).urgency_score, 2)
+
+    def test_toggle_with_current_version(self):
+        task = Task.objects.get(pk=self.first_active_task(self.small_user))
+        response = self.post('tasks:task_toggle_status', task.pk, version=task.version)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], Task.objects.get(pk=task.pk).version)
+        self.assertEqual(Task.objects.get(pk=task.pk).status, 'DONE')
+
+    def test_toggle_writes_before_reading(self):
+        task = Task.objects.filter(user=self.small_user, recurrence='').exclude(status='DONE').first()
+        with capture_queries() as context:
+            response = self.post('tasks:task_toggle_status', task.pk)
+
+        # Première requête sur les tâches : l'UPDATE, statut calculé en SQL
+        first = next(q['sql'] for q in context.captured_queries if 'tasks_task"' in q['sql'])
+        self.assertTrue(first.startswith('UPDATE'))
+        self.assertIn('CASE WHEN', first)
+        self.assertEqual(response.json()['new_status'], 'DONE')
+        self.assertEqual(response.json()['version'], task.version + 1)
+
+        # Sans version envoyée, la version écrite est retournée
+        response = self.post('tasks:task_update_quadrant', task.pk, quadrant='Q1')
+        self.assertEqual(response.json()['version'], task.version + 2)
+
+    def test_stale_toggle_is_rejected(self):
+        task = Task.objects.get(pk=self.first_active_task(self.small_user))
+        stale_version = task.version
+        # Premier onglet : la tâche est terminée
+        self.post('tasks:task_toggle_status', task.pk, version=stale_version)
+        # Second onglet, avec la version affichée avant : ne doit pas la rouvrir
+        response = self.post('tasks:task_toggle_status', task.pk, version=stale_version)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.json()['conflict'])
+        self.assertEqual(response.json()['status'], 'DONE')
+        self.assertEqual(Task.objects.get(pk=task.pk).status, 'DONE')
+
+    def test_update_quadrant_is_a_single_conditional_update(self):
+        task = Task.objects.get(pk=self.first_active_task(self.small_user))
+        with capture_queries() as context:
+            response = self.post('tasks:task_update_quadrant', task.pk, quadrant='Q2', version=task.version)
+
+        self.assertEqual(response.json()['version'], task.version + 1)
+        task_queries = [q['sql'] for q in context.captured_queries if 'tasks_task"' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+        self.assertTrue(task_queries[0].startswith('UPDATE'))
+
+        task.refresh_from_db()
+        self.assertEqual((task.quadrant, task.urgency_score, task.importance_score), ('Q2', 2, 5))
+
+        response = self.post('tasks:task_update_quadrant', task.pk, quadrant='Q3', version=task.version - 1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Task.objects.get(pk=task.pk).quadrant, 'Q2')
+
+    def test_admin_bulk_actions_bump_version(self):
+        task = Task.objects.get(pk=self.first_active_task(self.small_user))
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+        client.post(reverse('admin:tasks_task_changelist'), {
+            'action': 'move_to_q1', '_selected_action': [task.pk],
+        })
+
+        self.assertEqual(Task.objects.get(pk=task.pk).version, task.version + 1)
+        response = self.post('tasks:task_update_quadrant', task.pk, quadrant='Q2', version=task.version)
+        self.assertEqual(response.status_code, 409)
+
+    def test_other_users_task_is_not_found(self):
+        pk = self.first_active_task(self.large_user)
+        self.assertEqual(self.post('tasks:task_update_quadrant', pk, quadrant='Q1').status_code, 404)
+        self.assertEqual(self.post('tasks:task_toggle_status', pk).status_code, 404)
+
+
+class RecurrenceTests(FixtureTestCase):
+    """Échéances des occurrences, calculées en heure locale."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('recurrence', password='x')
+
+    def series(self, recurrence, due_date):
+        return Task.objects.create(
+            user=self.user, title='Série', due_date=timezone.make_aware(due_date),
+            urgency_score=3, importance_score=3, recurrence=recurrence,
+        )
+
+    def test_monthly_series_keeps_its_day(self):
+        task = self.series('MONTHLY', datetime(2027, 1, 31, 9))
+        until = timezone.make_aware(datetime(2027, 5, 1))
+        days = [timezone.localtime(occurrence.due_date).date() for occurrence in task.occurrences(until)]
+        self.assertEqual(days, [date(2027, 2, 28), date(2027, 3, 31), date(2027, 4, 30)])
+
+        # La série continue sur le même jour d'une occurrence à la suivante
+        for _ in range(2):
+            task = task.spawn_next_occurrence()
+        self.assertEqual(task.recurrence_day, 31)
+        self.assertEqual(timezone.localtime(task.due_date).date(), date(2027, 3, 31))
+
+    def test_moved_due_date_becomes_the_series_day(self):
+        task = self.series('MONTHLY', datetime(2027, 1, 31, 9)).spawn_next_occurrence()
+        task.due_date = timezone.make_aware(datetime(2027, 2, 15, 9))
+        self.assertEqual(timezone.localtime(task.next_due_date()).date(), date(2027, 3, 15))
+
+    def test_wall_clock_time_survives_dst(self):
+        # Passage à l'heure d'été le 28 mars 2027 ; minuit à Paris tombe la veille en UTC
+        for recurrence in ('DAILY', 'WEEKLY', 'MONTHLY'):
+            task = self.series(recurrence, datetime(2027, 3, 27, 0, 30))
+            next_date = timezone.localtime(task.next_due_date())
+            self.assertEqual(next_date.time(), time(0, 30), recurrence)
+            self.assertEqual(next_date.day, {'DAILY': 28, 'WEEKLY': 3, 'MONTHLY': 27}[recurrence])
+
+
+class PurgeUserTests(QueryBudgetTestCase):
+    """Suppression par lots d'un utilisateur et de son historique."""
+
+    def test_purge_deletes_in_batches(self):
+        user_id = self.large_user.pk
+        TaskArchive.objects.create(
+            user=self.large_user, original_id=10 ** 9, title='Archivée', due_date=timezone.now(),
+            created_at=timezone.now(), completed_at=timezone.now(),
+            urgency_score=1, importance_score=1, quadrant='Q4',
+        )
+        with capture_queries() as context:
+            deleted = purge_user(user_id, batch_size=50)
+
+        self.assertEqual(deleted, LARGE_TASK_COUNT + 1)
+        batch_deletes = [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith('DELETE FROM "tasks_task" WHERE "tasks_task"."id" IN')
+        ]
+        self.assertEqual(len(batch_deletes), LARGE_TASK_COUNT // 50)
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+        self.assertFalse(Task.objects.filter(user_id=user_id).exists())
+        self.assertFalse(TaskStatistics.objects.filter(user_id=user_id).exists())
+        self.assertEqual(Task.objects.filter(user=self.small_user).count(), SMALL_TASK_COUNT)
+
+    def test_interrupted_purge_resumes(self):
+        user_id = self.large_user.pk
+
+        def interrupt(count):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            purge_user(user_id, batch_size=50, progress=interrupt)
+
+        # Premier lot validé, compte désactivé, utilisateur toujours présent
+        user = User.objects.get(pk=user_id)
+        self.assertFalse(user.is_active)
+        self.assertEqual(Task.objects.filter(user_id=user_id).count(), LARGE_TASK_COUNT - 50)
+
+        self.assertEqual(purge_user(user_id, batch_size=50), LARGE_TASK_COUNT - 50)
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+
+
+class AlertDigestTests(QueryBudgetTestCase):
+    """Récapitulatifs d'alertes par e-mail (backend locmem des tests)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        User.objects.filter(pk__in=[cls.small_user.pk, cls.large_user.pk]).update(email=Concat(F('username'), Value('@example.com')))
+        Task.objects.create(user=cls.small_user, title='Bientôt', due_date=timezone.now() + timedelta(hours=2))
+
+    def expected(self, since, until):
+        """Tâches signalées, calculées ligne par ligne."""
+        return {
+            task.pk for task in Task.objects.exclude(status='DONE')
+            if since < task.due_date <= until or since + timedelta(hours=24) < task.due_date <= until + timedelta(hours=24)
+        }
+
+    def test_one_digest_per_user_with_a_constant_number_of_queries(self):
+        now = timezone.now()
+        with capture_queries() as context:
+            run = send_alert_digests(now=now)
+
+        # Filigrane + exécution + tâches (une requête pour tous les utilisateurs) + destinataires
+        # du lot + progression du lot + fin de l'exécution
+        self.assertEqual(len(context.captured_queries), 6)
+        expected = self.expected(now - timedelta(days=1), now)
+        user_ids = set(Task.objects.filter(pk__in=expected).values_list('user_id', flat=True))
+        recipients = User.objects.filter(pk__in=user_ids).values_list('email', flat=True)
+        self.assertEqual(len(recipients), 2)
+        self.assertEqual(run.digests_sent, 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(recipients))
+        self.assertEqual(run.task_count, len(expected))
+
+        large_digest = next(m for m in mail.outbox if m.to == ['grand@example.com'])
+        self.assertIn('en retard', large_digest.subject)
+        self.assertIn('Tâches dues dans les 24 heures', large_digest.body)
+
+    def test_watermark_limits_next_run_to_new_crossings(self):
+        now = timezone.now()
+        send_alert_digests(now=now)
+        mail.outbox.clear()
+
+        later = now + timedelta(hours=7)
+        run = send_alert_digests(now=later)
+
+        self.assertEqual(run.task_count, len(self.expected(now, later)))
+        self.assertLess(run.task_count, len(self.expected(later - timedelta(days=1), later)))
+
+        mail.outbox.clear()
+        self.assertEqual(send_alert_digests(now=later).digests_sent, 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_interrupted_run_resumes_after_last_sent_batch(self):
+        now = timezone.now()
+        connection = get_connection()
+        send_messages = connection.send_messages
+        calls = []
+
+        def failing_second_batch(messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionRefusedError('SMTP indisponible')
+            return send_messages(messages)
+
+        with mock.patch.object(connection, 'send_messages', failing_second_batch):
+            with self.assertRaises(ConnectionRefusedError):
+                send_alert_digests(now=now, batch_size=1, connection=connection)
+
+        run = AlertDigestRun.objects.get()
+        self.assertIsNone(run.completed_at)
+        self.assertEqual(run.digests_sent, 1)
+        first = mail.outbox[0].to
+
+        # Reprise : même fenêtre, seul le lot en échec est envoyé
+        resumed = send_alert_digests(now=now + timedelta(hours=1), batch_size=1)
+        self.assertEqual(resumed.pk, run.pk)
+        self.assertEqual(resumed.until, now)
+        self.assertIsNotNone(resumed.completed_at)
+        self.assertEqual(resumed.digests_sent, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertNotEqual(mail.outbox[1].to, first)
+
+
+class DependencyTests(QueryBudgetTestCase):
+    """Dépendances entre tâches et fermeture transitive."""
+
+    def task(self, title, **fields):
+        fields.setdefault('due_date', timezone.now() + timedelta(days=1))
+        return Task.objects.create(user=self.small_user, title=title, **fields)
+
+    def closure(self):
+        return {
+            (ancestor, descendant): paths
+            for ancestor, descendant, paths in TaskClosure.objects.values_list('ancestor_id', 'descendant_id', 'paths')
+        }
+
+    def test_chain_closure_and_cycles(self):
+        a, b, c = self.task('A'), self.task('B'), self.task('C')
+        add_dependency(b, a)
+        add_dependency(c, b)
+        self.assertEqual(self.closure(), {(a.pk, b.pk): 1, (b.pk, c.pk): 1, (a.pk, c.pk): 1})
+
+        with self.assertRaises(DependencyCycle):
+            add_dependency(a, c)
+        with self.assertRaises(DependencyCycle):
+            add_dependency(a, a)
+
+        with self.assertNumQueries(1, using=FIXTURE_DB):
+            self.assertTrue(is_blocked(c))
+        with self.assertNumQueries(1, using=FIXTURE_DB):
+            self.assertEqual(list(unblocked_by(a)), [b])
+
+        # B terminée hors ordre : C reste bloquée par A
+        Task.objects.filter(pk=b.pk).update(status='DONE')
+        self.assertTrue(is_blocked(c))
+        self.assertEqual({task.pk for task in unblocked_by(a)}, {c.pk})
+
+    def test_removing_one_path_keeps_the_other(self):
+        a, b, c, d = self.task('A'), self.task('B'), self.task('C'), self.task('D')
+        add_dependency(b, a)
+        add_dependency(c, a)
+        add_dependency(d, b)
+        add_dependency(d, c)
+        self.assertEqual(self.closure()[(a.pk, d.pk)], 2)
+
+        remove_dependency(d, b)
+        closure = self.closure()
+        self.assertEqual(closure[(a.pk, d.pk)], 1)
+        self.assertNotIn((b.pk, d.pk), closure)
+
+        remove_dependency(d, c)
+        self.assertEqual(set(self.closure()), {(a.pk, b.pk), (a.pk, c.pk)})
+
+    def test_deleting_middle_task_unlinks_chain(self):
+        a, b, c = self.task('A'), self.task('B'), self.task('C')
+        add_dependency(b, a)
+        add_dependency(c, b)
+
+        self.clients[self.small_user.pk].post(reverse('tasks:task_delete', args=[b.pk]))
+        self.assertEqual(self.closure(), {})
+        self.assertFalse(is_blocked(c))
+
+        add_dependency(c, a)
+        remove_dependency(c, a)
+        self.assertEqual(self.closure(), {})
+
+    def test_archiving_unlinks_dependents(self):
+        a, b = self.task('A', status='DONE'), self.task('B')
+        add_dependency(b, a)
+        Task.objects.filter(pk=a.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        call_command('archive_tasks', days=0, stdout=io.StringIO())
+        self.assertFalse(Task.objects.filter(pk=a.pk).exists())
+        self.assertEqual(self.closure(), {})
+        self.assertFalse(is_blocked(b))
+
+    def test_reassigning_unlinks_dependencies(self):
+        a, b, c = self.task('A'), self.task('B'), self.task('C')
+        add_dependency(b, a)
+        add_dependency(c, b)
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+
+        client.post(reverse('admin:tasks_task_changelist'), {
+            'action': 'reassign', '_selected_action': [c.pk], 'username': self.large_user.username,
+        })
+        self.assertEqual(self.closure(), {(a.pk, b.pk): 1})
+        self.assertFalse(Task.objects.with_blocked().get(pk=c.pk).is_blocked)
+
+        local_due = timezone.localtime(b.due_date)
+        client.post(reverse('admin:tasks_task_change', args=[b.pk]), {
+            'user': self.large_user.pk, 'title': 'B', 'description': '',
+            'urgency_score': 3, 'importance_score': 3, 'status': 'TODO',
+            'due_date_0': f'{local_due:%Y-%m-%d}', 'due_date_1': f'{local_due:%H:%M:%S}',
+            'recurrence': '', 'recurrence_interval': 1,
+        })
+        self.assertEqual(Task.objects.get(pk=b.pk).user, self.large_user)
+        self.assertEqual(self.closure(), {})
+
+    def test_recommendation_skips_blocked_tasks(self):
+        Task.objects.filter(user=self.small_user).delete()
+        blocker = self.task('Préparer', urgency_score=1, importance_score=1)
+        blocked = self.task('Livrer', urgency_score=5, importance_score=5, due_date=timezone.now() - timedelta(hours=1))
+        add_dependency(blocked, blocker)
+
+        with self.assertNumQueries(1, using=FIXTURE_DB):
+            matrix = TaskMatrix(self.small_user)
+        self.assertTrue(matrix.column('Q1')[0].is_blocked)
+        self.assertEqual(matrix.recommended().pk, blocker.pk)
+
+        Task.objects.filter(pk=blocker.pk).update(status='DONE')
+        self.assertEqual(TaskMatrix(self.small_user).recommended().pk, blocked.pk)
+
+    def test_form_rejects_cycles_and_toggle_reports_unblocked(self):
+        a, b = self.task('Alpha'), self.task('Bravo')
+        add_dependency(b, a)
+        client = self.clients[self.small_user.pk]
+
+        response = client.post(reverse('tasks:task_update', args=[a.pk]), {
+            'title': 'Alpha', 'due_date': timezone.localtime(a.due_date).strftime('%Y-%m-%dT%H:%M'),
+            'urgency_score': 3, 'importance_score': 3, 'status': 'TODO', 'recurrence_interval': 1,
+            'depends_on': [b.pk],
+        })
+        self.assertContains(response, 'Dépendance circulaire')
+
+        response = client.post(
+            reverse('tasks:task_toggle_status', args=[a.pk]), headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+        self.assertEqual(response.json()['unblocked'], ['Bravo'])
+
+        # Dépendances enregistrées par le formulaire
+        c = self.task('Charlie')
+        client.post(reverse('tasks:task_update', args=[b.pk]), {
+            'title': 'Bravo', 'due_date': timezone.localtime(b.due_date).strftime('%Y-%m-%dT%H:%M'),
+            'urgency_score': 3, 'importance_score': 3, 'status': 'TODO', 'recurrence_interval': 1,
+            'depends_on': [c.pk],
+        })
+        self.assertEqual(list(b.dependencies.values_list('blocker_id', flat=True)), [c.pk])
+        self.assertEqual(set(self.closure()), {(c.pk, b.pk)})
+
+
+class TagTests(QueryBudgetTestCase):
+    """Étiquettes : filtre indexé, comptes par quadrant, rendu sans N+1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Deux étiquettes par tâche, pour les deux jeux de données
+        for user in (cls.small_user, cls.large_user):
+            work, home = Tag.objects.bulk_create([Tag(user=user, name='travail'), Tag(user=user, name='maison')])
+            links = []
+            for index, pk in enumerate(Task.objects.filter(user=user).values_list('pk', flat=True)):
+                links.append(TaskTag(task_id=pk, tag=work if index % 2 else home))
+                links.append(TaskTag(task_id=pk, tag=Tag.objects.get_or_create(user=user, name=f'lot {index % 3}')[0]))
+            TaskTag.objects.bulk_create(links)
+
+    def test_dashboard_renders_tags_with_constant_queries(self):
+        response = self.clients[self.large_user.pk].get(reverse('tasks:dashboard'))
+        self.assertContains(response, '#travail')
+        self.assertQueryBudget(7, lambda user: read(self.clients[user.pk].get(reverse('tasks:dashboard'))))
+        with capture_queries() as context:
+            response = self.clients[self.large_user.pk].get(reverse('tasks:dashboard'), {'tag': '#Travail'})
+            read(response)
+        self.assertEqual(len(context), 7)
+        self.assertContains(response, '<span class="tag-chip tag-chip-active">#travail</span>', html=True)
+
+    def test_tag_filter_and_counts(self):
+        tagged = Task.objects.tagged(self.large_user, 'travail')
+        expected = set(TaskTag.objects.filter(tag__user=self.large_user, tag__name='travail').values_list('task_id', flat=True))
+        self.assertEqual(set(tagged.values_list('pk', flat=True)), expected)
+        self.assertNotIn('icontains', str(tagged.query))
+
+        matrix = TaskMatrix(self.large_user)
+        for quadrant in TaskMatrix.QUADRANTS:
+            column = matrix.column(quadrant, tag='travail')
+            self.assertTrue(all('travail' in task.tag_names for task in column))
+            counts = dict(matrix.tag_counts()[quadrant])
+            self.assertEqual(counts.get('travail', 0), len(column))
+
+        response = self.clients[self.large_user.pk].get(reverse('tasks:api_task_list'), {'tag': 'maison', 'limit': 200})
+        maison = set(Task.objects.tagged(self.large_user, 'maison').values_list('pk', flat=True))
+        self.assertEqual({row['id'] for row in response.json()['results']}, maison)
+
+    def test_form_sets_tags(self):
+        task = Task.objects.filter(user=self.small_user).first()
+        self.clients[self.small_user.pk].post(reverse('tasks:task_update', args=[task.pk]), {
+            'title': task.title, 'due_date': timezone.localtime(task.due_date).strftime('%Y-%m-%dT%H:%M'),
+            'urgency_score': 3, 'importance_score': 3, 'status': 'TODO', 'recurrence_interval': 1,
+            'tag_list': '#Projet  X, maison, , projet x',
+        })
+        self.assertEqual(Task.objects.get(pk=task.pk).tag_names, ['maison', 'projet x'])
+
+    def test_reassigning_drops_previous_owner_tags(self):
+        first, second = Task.objects.filter(user=self.small_user).order_by('pk').values_list('pk', flat=True)[:2]
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+
+        client.post(reverse('admin:tasks_task_changelist'), {
+            'action': 'reassign', '_selected_action': [first], 'username': self.large_user.username,
+        })
+        self.assertFalse(TaskTag.objects.filter(task_id=first).exists())
+        self.assertFalse(Task.objects.tagged(self.small_user, 'maison').filter(pk=first).exists())
+
+        task = Task.objects.get(pk=second)
+        local_due = timezone.localtime(task.due_date)
+        client.post(reverse('admin:tasks_task_change', args=[second]), {
+            'user': self.large_user.pk, 'title': task.title, 'description': task.description,
+            'urgency_score': task.urgency_score, 'importance_score': task.importance_score, 'status': task.status,
+            'due_date_0': f'{local_due:%Y-%m-%d}', 'due_date_1': f'{local_due:%H:%M:%S}',
+            'recurrence': task.recurrence, 'recurrence_interval': 1,
+        })
+        self.assertEqual(Task.objects.get(pk=second).user, self.large_user)
+        self.assertFalse(TaskTag.objects.filter(task_id=second).exists())
+
+
+class DuplicateTests(QueryBudgetTestCase):
+    """Quasi-doublons : signatures MinHash, seaux LSH, formulaires et find_duplicates."""
+
+    def create(self, user, title, description='', status='TODO'):
+        return Task.objects.create(
+            user=user, title=title, description=description, status=status,
+            due_date=timezone.now() + timedelta(days=3),
+        )
+
+    def test_signatures_estimate_similarity(self):
+        near = similarity(signature('Appeler le plombier pour la fuite'), signature('appeler plombier pour la fuite !'))
+        accents = similarity(signature('Préparer la réunion budget'), signature('Preparer reunion budget'))
+        far = similarity(signature('Finir le rapport trimestriel'), signature('Faire les courses'))
+
+        self.assertGreater(near, 0.8)
+        self.assertGreater(accents, 0.8)
+        self.assertLess(far, 0.2)
+        self.assertIsNone(signature('  ', ''))
+
+    def test_form_warns_in_constant_queries(self):
+        due_date = (timezone.localtime() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')
+        for user in (self.small_user, self.large_user):
+            self.clients[user.pk].post(reverse('tasks:task_quick_create'), {
+                'title': 'Appeler le plombier pour la fuite', 'due_date': due_date,
+            })
+        self.assertEqual(TaskFingerprint.objects.filter(task__title__startswith='Appeler').count(), 2)
+
+        task = Task.objects.get(user=self.large_user, title__startswith='Appeler')
+        duplicate = self.create(self.large_user, 'appeler plombier pour la fuite !')
+        with self.assertNumQueries(1, using=FIXTURE_DB):
+            self.assertEqual([pk for _, pk, _ in similar_tasks(duplicate)], [task.pk])
+
+        response = self.clients[self.large_user.pk].post(reverse('tasks:task_quick_create'), {
+            'title': 'Appeler le plombier pour la fuite !', 'due_date': due_date,
+        }, follow=True)
+        self.assertContains(response, 'similaire(s) déjà présente(s) : « Appeler le plombier pour la fuite »')
+
+    def test_done_tasks_are_not_duplicates(self):
+        done = self.create(self.small_user, 'Renouveler le passeport', status='DONE')
+        task = self.create(self.small_user, 'Renouveler le passeport')
+        index_missing()
+
+        self.assertEqual(similar_tasks(task), [])
+        self.assertNotIn(done.pk, {pk for group in find_duplicates() for pk, _ in group['tasks']})
+
+    def test_done_tasks_do_not_fill_buckets(self):
+        for _ in range(3):
+            self.create(self.small_user, 'Renouveler le passeport', status='DONE')
+        active = [self.create(self.small_user, 'Renouveler le passeport') for _ in range(2)]
+        index_missing()
+
+        with mock.patch('tasks.duplicates.MAX_BUCKET_SIZE', 3):
+            groups = list(find_duplicates(user_id=self.small_user.pk))
+        self.assertIn([task.pk for task in active], [[pk for pk, _ in group['tasks']] for group in groups])
+
+    def test_other_write_paths_index_tasks(self):
+        fingerprinted = lambda task: TaskFingerprint.objects.filter(task_id=task.pk).exists()
+
+        series = Task.objects.create(
+            user=self.small_user, title='Sortir les poubelles', due_date=timezone.now(), recurrence='WEEKLY',
+        )
+        self.assertTrue(fingerprinted(series.spawn_next_occurrence()))
+
+        done = self.create(self.small_user, 'Classer les factures', status='DONE')
+        archive = TaskArchive.from_task(done)
+        archive.save()
+        done.delete()
+        self.assertTrue(fingerprinted(archive.restore()))
+
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+        task = self.create(self.small_user, 'Texte initial')
+        index_missing()
+        local_due = timezone.localtime(task.due_date)
+        client.post(reverse('admin:tasks_task_change', args=[task.pk]), {
+            'user': self.small_user.pk, 'title': 'Réserver la salle de réunion', 'description': '',
+            'urgency_score': 3, 'importance_score': 3, 'status': 'TODO',
+            'due_date_0': f'{local_due:%Y-%m-%d}', 'due_date_1': f'{local_due:%H:%M:%S}',
+            'recurrence': '', 'recurrence_interval': 1,
+        })
+        duplicate = self.create(self.small_user, 'Réserver la salle de réunion !')
+        self.assertEqual([pk for _, pk, _ in similar_tasks(duplicate)], [task.pk])
+
+        # Réassignée : ses seaux suivent, elle n'est plus candidate chez l'ancien propriétaire
+        client.post(reverse('admin:tasks_task_changelist'), {
+            'action': 'reassign', '_selected_action': [task.pk], 'username': self.large_user.username,
+        })
+        self.assertEqual(similar_tasks(duplicate), [])
+        moved = Task.objects.get(pk=task.pk)
+        self.assertEqual([pk for _, pk, _ in similar_tasks(self.create(self.large_user, moved.title))], [task.pk])
+
+    def test_tasks_without_signature_are_indexed_once(self):
+        blank = self.create(self.small_user, '?!')
+        index_missing()
+        self.assertEqual(bytes(TaskFingerprint.objects.get(task=blank).signature), b'')
+        self.assertFalse(Task.objects.filter(fingerprint__isnull=True).exists())
+
+        # Plus rien à relire : une requête, aucune écriture
+        with self.assertNumQueries(1, using=FIXTURE_DB):
+            self.assertEqual(index_missing(), 0)
+        self.assertEqual(similar_tasks(self.create(self.small_user, '?!')), [])
+
+    def test_find_duplicates_indexes_and_groups(self):
+        titles = ['Envoyer le devis au client', 'Envoyer le devis au client.', 'envoyer devis au client', 'Arroser les plantes']
+        Task.objects.bulk_create([
+            Task(user=self.small_user, title=title, due_date=timezone.now(), quadrant='Q4') for title in titles
+        ])
+        out = io.StringIO()
+        call_command('find_duplicates', user=self.small_user.username, stdout=out)
+
+        expected = Task.objects.filter(user=self.small_user).count()
+        self.assertEqual(TaskFingerprint.objects.filter(task__user=self.small_user).count(), expected)
+        groups = find_duplicates(user_id=self.small_user.pk)
+        devis = [group for group in groups if any('devis' in title for _, title in group['tasks'])]
+        self.assertEqual(len(devis), 1)
+        self.assertEqual(len(devis[0]['tasks']), 3)
+        self.assertIn('envoyer devis au client', out.getvalue())
+
+
+class ReconcileStatsTests(QueryBudgetTestCase):
+    """Réconciliation des statistiques : écarts détectés puis corrigés en masse."""
+
+    def stored(self, user):
+        return TaskStatistics.objects.filter(user=user).values(*STAT_FIELDS).first()
+
+    def recomputed(self, user):
+        """Valeurs de référence : `update_statistics()` (enregistrées, lire `stored` avant)."""
+        stats, _ = TaskStatistics.objects.get_or_create(user=user)
+        stats.update_statistics()
+        return {field: getattr(stats, field) for field in STAT_FIELDS}
+
+    def reconcile(self, *args):
+        out = io.StringIO()
+        call_command('reconcile_stats', '--workers', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_drift(self):
+        self.assertIn('2 utilisateur(s) vérifié(s) (1 plage(s)), aucun écart', self.reconcile())
+
+    def test_expected_statistics_match_update_statistics(self):
+        call_command('archive_tasks', days=0, stdout=io.StringIO())
+        self.assertTrue(TaskArchive.objects.filter(user=self.large_user).exists())
+        low, high = min(self.small_user.pk, self.large_user.pk), max(self.small_user.pk, self.large_user.pk) + 1
+
+        with self.assertNumQueries(2, using=FIXTURE_DB):
+            expected = expected_statistics(low=low, high=high)
+        for user in (self.small_user, self.large_user):
+            self.assertEqual(expected[user.pk], self.recomputed(user))
+
+    def test_drift_is_reported_then_fixed(self):
+        # Suppressions hors des vues : les compteurs ne sont pas recalculés
+        Task.objects.filter(user=self.large_user, status='DONE', quadrant='Q1').delete()
+        TaskStatistics.objects.filter(user=self.small_user).delete()
+        before = self.stored(self.large_user)
+
+        report = self.reconcile('--dry-run')
+        self.assertIn('2 en écart dont 1 sans statistiques', report)
+        self.assertIn('Q1 complétées 13 → 0', report)
+        self.assertEqual(self.stored(self.large_user), before)
+        self.assertIsNone(self.stored(self.small_user))
+
+        self.assertIn('corrigé(s)', self.reconcile())
+        for user in (self.small_user, self.large_user):
+            self.assertEqual(self.stored(user), self.recomputed(user))
+        self.assertIn('aucun écart', self.reconcile())
+
+    def test_fix_is_batched(self):
+        TaskStatistics.objects.update(total_tasks_created=0)
+        low, high = min(self.small_user.pk, self.large_user.pk), max(self.small_user.pk, self.large_user.pk) + 1
+
+        # Lecture (3) et utilisateurs existants, transaction : verrou, recalcul (2), bulk_update
+        with capture_queries() as queries:
+            result = reconcile_range(FIXTURE_DB, low, high)
+        self.assertEqual(set(result['drift']), {self.small_user.pk, self.large_user.pk})
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(self.stored(self.large_user)['total_tasks_created'], LARGE_TASK_COUNT)
+
+    def test_row_created_during_fix_is_updated(self):
+        TaskStatistics.objects.filter(user=self.small_user).delete()
+
+        def racing_view(using=None, low=None, high=None, user_ids=None):
+            # Une vue crée la ligne après la lecture verrouillée des statistiques
+            if user_ids is not None:
+                TaskStatistics.objects.get_or_create(user=self.small_user)
+            return expected_statistics(using, low, high, user_ids)
+
+        with mock.patch('tasks.reconcile.expected_statistics', racing_view):
+            self.assertIn('corrigé(s)', self.reconcile())
+        self.assertEqual(self.stored(self.small_user), self.recomputed(self.small_user))
+
+    def test_deleted_users_statistics_are_deleted(self):
+        gone = User.objects.order_by('-pk').values_list('pk', flat=True)[0] + 1
+        TaskStatistics.objects.create(user_id=gone, total_tasks_created=4)
+
+        report = self.reconcile('--dry-run')
+        self.assertIn("Statistiques d'utilisateurs supprimés : 1 ligne(s)", report)
+        self.assertTrue(TaskStatistics.objects.filter(user_id=gone).exists())
+
+        self.assertIn('0 en écart dont 0 sans statistiques, 1 utilisateur(s) supprimé(s)', self.reconcile())
+        self.assertFalse(TaskStatistics.objects.filter(user_id=gone).exists())
+
+
+class ReconcileStatsPoolTests(TransactionTestCase):
+    """Réconciliation répartie sur un pool : une plage par tâche, résultats fusionnés."""
+
+    databases = '__all__'
+
+    def test_ranges_are_fanned_out(self):
+        users = [create_user(f'pool{i}') for i in range(3)]
+        with use_shard(FIXTURE_DB):
+            for user in users:
+                seed_tasks(user, 6)
+            TaskStatistics.objects.update(total_tasks_created=0)
+
+        out = io.StringIO()
+        # Threads à la place des processus : la base de test en mémoire n'est
+        # pas visible d'un autre processus. Lecture seule (--dry-run) : pas de
+        # verrou d'écriture entre threads sur SQLite
+        with mock.patch('tasks.management.commands.reconcile_stats.ProcessPoolExecutor', ThreadPoolExecutor):
+            call_command('reconcile_stats', '--workers', '2', '--range-size', '1', '--dry-run', stdout=out)
+
+        report = out.getvalue()
+        for user in users:
+            self.assertIn(f'{user.username} : Total créées 0 → 6', report)
+        self.assertIn(f'3 utilisateur(s) vérifié(s) ({users[-1].pk - users[0].pk + 1} plage(s)), 3 en écart', report)
+
+
+class JobWorkerTests(TransactionTestCase):
+    """Worker : jobs abandonnés remis en file, battement des jobs longs."""
+
+    databases = '__all__'
+
+    def test_stale_jobs_are_requeued_by_the_worker(self):
+        user = create_user('worker')
+        stale = Job.objects.create(
+            name='update_statistics', payload={'user_id': user.pk}, status='RUNNING', attempts=1,
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+
+        self.assertEqual(work(burst=True, stale_timeout=60), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), ('DONE', 2))
+
+    def test_running_job_keeps_its_lock(self):
+        timeout = 0.3
+
+        def slow():
+            sleep(timeout * 2)
+            # Sans battement, le job serait considéré comme abandonné
+            self.assertEqual(requeue_stale(timeout), 0)
+
+        job = Job.objects.create(name='lent')
+        with mock.patch.dict(registry, {'lent': slow}):
+            self.assertEqual(work(burst=True, stale_timeout=timeout), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('DONE', ''))
+
+
+@skipIf(settings.TASK_SHARDS, 'DB_SHARDS=0 requis')
+class ShardingDisabledTests(TestCase):
+    """Sans DB_SHARDS, tout reste dans la base `default`, sans requête d'annuaire."""
+
+    def test_single_database(self):
+        user = User.objects.create_user('seul')
+        with self.assertNumQueries(0):
+            self.assertEqual(shard_for_user(user.pk), 'default')
+        self.assertEqual(task_databases(), ['default'])
+        self.assertFalse(UserShard.objects.exists())
+
+
+@skipUnless(len(settings.TASK_SHARDS) > 1, 'DB_SHARDS=2 (ou plus) requis')
+class ShardingTests(TestCase):
+    """Répartition des tâches entre shards (lancer avec DB_SHARDS=2)."""
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        # Annuaire en cache d'une classe précédente (mêmes identifiants après rollback)
+        cache.clear()
+        # Deux utilisateurs placés dans deux shards différents
+        cls.users = {}
+        index = 0
+        while len(cls.users) < 2:
+            user = User.objects.create_user(f'shard{index}', email=f'shard{index}@example.com', password='motdepasse')
+            cls.users.setdefault(shard_for_user(user.pk), user)
+            index += 1
+        for alias, user in cls.users.items():
+            with use_user_shard(user.pk):
+                Task.objects.create(user=user, title=f'Tâche de {alias}', due_date=timezone.now() + timedelta(hours=2))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tasks_live_in_the_user_shard(self):
+        for alias, user in self.users.items():
+            self.assertEqual(UserShard.objects.get(user=user).alias, alias)
+            for other in task_databases():
+                titles = list(Task.objects.using(other).filter(user=user).values_list('title', flat=True))
+                self.assertEqual(titles, [f'Tâche de {alias}'] if other == alias else [])
+
+    def test_views_use_the_user_shard(self):
+        for alias, user in self.users.items():
+            client = Client()
+            client.force_login(user)
+            response = client.get(reverse('tasks:dashboard'))
+            self.assertContains(response, f'Tâche de {alias}')
+            self.assertEqual(Task.objects.using(alias).get(user=user).user, user)
+
+    def test_sync_reads_the_user_shard(self):
+        for alias, user in self.users.items():
+            client = Client()
+            client.force_login(user)
+            data = json.loads(client.get(reverse('tasks:api_task_sync')).content)
+            self.assertEqual([task['title'] for task in data['tasks']], [f'Tâche de {alias}'])
+
+    def test_calendar_feed_reads_the_user_shard(self):
+        for alias, user in self.users.items():
+            token = CalendarFeed.objects.create(user=user).token
+            content = read(Client().get(reverse('tasks:calendar_feed', args=[token]))).decode()
+            self.assertIn(f'SUMMARY:Tâche de {alias}', content)
+            for other in self.users:
+                if other != alias:
+                    self.assertNotIn(f'Tâche de {other}', content)
+
+    def test_archive_covers_every_shard(self):
+        for alias in self.users:
+            Task.objects.using(alias).update(status='DONE', updated_at=timezone.now() - timedelta(days=365))
+
+        call_command('archive_tasks', stdout=io.StringIO())
+
+        for alias, user in self.users.items():
+            self.assertFalse(Task.objects.using(alias).exists())
+            self.assertEqual(
+                list(TaskArchive.objects.using(alias).values_list('title', flat=True)), [f'Tâche de {alias}']
+            )
+            self.assertTrue(TaskTombstone.objects.using(alias).filter(user=user).exists())
+
+    def test_reconcile_covers_every_shard(self):
+        for alias in self.users:
+            TaskStatistics.objects.using(alias).all().delete()
+
+        out = io.StringIO()
+        call_command('reconcile_stats', '--workers', '1', stdout=out)
+        self.assertIn('2 en écart dont 2 sans statistiques', out.getvalue())
+
+        for alias, user in self.users.items():
+            stats = TaskStatistics.objects.using(alias).get()
+            self.assertEqual((stats.user_id, stats.total_tasks_created), (user.pk, 1))
+
+    def test_digests_fan_out_across_shards(self):
+        run = send_alert_digests(now=timezone.now())
+        self.assertEqual(run.digests_sent, 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(u.email for u in self.users.values()))
+
+    def test_admin_lists_one_shard(self):
+        admin_user = User.objects.create_superuser('admin', password='motdepasse')
+        client = Client()
+        client.force_login(admin_user)
+        for alias in self.users:
+            response = client.get(reverse('admin:tasks_task_changelist'), {'shard': alias})
+            self.assertContains(response, f'Tâche de {alias}')
+            for other in self.users:
+                if other != alias:
+                    self.assertNotContains(response, f'Tâche de {other}')
+
+            # Page de modification : shard conservé par les filtres préservés
+            task = Task.objects.using(alias).get()
+            response = client.get(
+                reverse('admin:tasks_task_change', args=[task.pk]), {'_changelist_filters': f'shard={alias}'}
+            )
+            self.assertContains(response, f'Tâche de {alias}')
+
+    def test_deleting_a_user_deletes_its_shard_rows(self):
+        alias, user = next(iter(self.users.items()))
+        purge_user(user.pk)
+        self.assertFalse(Task.objects.using(alias).filter(user_id=user.pk).exists())
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
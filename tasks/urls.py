@@ -3,7 +3,7 @@ URLs pour l'application tasks.
 """
 
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'tasks'
 
@@ -23,4 +23,16 @@ urlpatterns = [
     
     # Statistiques
     path('statistics/', views.statistics, name='statistics'),
+    
+    # Archives
+    path('archive/', views.task_archive, name='task_archive'),
+    path('archive/<int:pk>/restore/', views.task_restore, name='task_restore'),
+    
+    # Flux iCalendar des échéances
+    path('calendar/', views.calendar_settings, name='calendar_settings'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    
+    # API JSON
+    path('api/tasks/', api.task_list, name='api_task_list'),
+    path('api/sync/', api.task_sync, name='api_task_sync'),
 ]
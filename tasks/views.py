@@ -5,14 +5,29 @@ Vues Django pour l'application de gestion de tâches.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST, require_safe
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
-from .models import Task, TaskStatistics
+from .models import CalendarFeed, Task, TaskArchive, TaskStatistics, TaskTombstone
 from .forms import TaskForm, QuickTaskForm, TaskFilterForm
 from .services import TaskIntelligenceService
+from .analytics import get_analytics
+from .dependencies import detach_tasks, unblocked_by
+from .ical import KINDS, feed_version, iter_feed
+from .matrix import TaskMatrix, request_now
+from .streaming import stream_page
+from .jobs import schedule_statistics_update
+
+
+# Tâches débloquées citées dans le message de complétion
+UNBLOCKED_LIMIT = 3
 
 
 @login_required
@@ -20,62 +35,79 @@ def dashboard(request):
     """
     Vue principale du dashboard avec la matrice d'Eisenhower.
     Affiche les 4 quadrants et les statistiques.
-    """
-    # Récupérer toutes les tâches de l'utilisateur
-    tasks = Task.objects.filter(user=request.user)
     
+    La page est envoyée en flux (`tasks/streaming.py`) : l'en-tête part
+    avant toute requête sur les tâches, puis chaque section dès que ses
+    données sont prêtes. Les tâches actives sont chargées une seule fois
+    (TaskMatrix) puis partagées entre les colonnes, les insights, les
+    alertes et la recommandation.
+    """
     # Appliquer les filtres si présents
+    status = quadrant = search = tag = None
     filter_form = TaskFilterForm(request.GET)
     if filter_form.is_valid():
         status = filter_form.cleaned_data.get('status')
         quadrant = filter_form.cleaned_data.get('quadrant')
         search = filter_form.cleaned_data.get('search')
+        tag = filter_form.cleaned_data.get('tag')
+    
+    def sections():
+        matrix = TaskMatrix.for_request(request)
+        
+        # Obtenir les alertes
+        alerts = TaskIntelligenceService.check_and_send_alerts(request.user, matrix=matrix)
+        yield 'tasks/dashboard/alerts.html', {'alerts': alerts}
         
-        if status:
-            tasks = tasks.filter(status=status)
+        # Tâche recommandée
+        recommended_task = TaskIntelligenceService.get_next_recommended_task(request.user, matrix=matrix)
+        yield 'tasks/dashboard/recommended.html', {'recommended_task': recommended_task}
+        
+        # Séparer les tâches par quadrant (un filtre de quadrant vide les autres colonnes)
+        columns = {
+            q: matrix.column(q, status=status, search=search, tag=tag) if not quadrant or quadrant == q else []
+            for q in TaskMatrix.QUADRANTS
+        }
+        
+        # Obtenir les insights de productivité
+        insights = TaskIntelligenceService.get_productivity_insights(request.user, matrix=matrix)
+        yield 'tasks/dashboard/summary.html', {
+            'insights': insights,
+            'total_active': sum(len(column) for column in columns.values()),
+        }
+        
+        # Formulaire pour ajout rapide
+        yield 'tasks/dashboard/quick_add.html', {'quick_form': QuickTaskForm(), 'active_tag': tag}
+        
+        yield 'tasks/dashboard/quadrants.html', {
+            'q1_tasks': columns['Q1'],
+            'q2_tasks': columns['Q2'],
+            'q3_tasks': columns['Q3'],
+            'q4_tasks': columns['Q4'],
+            'tag_counts': matrix.tag_counts(),
+        }
+        
+        # Tâches complétées (pour affichage séparé)
+        completed_tasks = Task.objects.filter(user=request.user, status='DONE').prefetch_related('tags')
+        if tag:
+            completed_tasks = completed_tasks.tagged(request.user, tag)
         if quadrant:
-            tasks = tasks.filter(quadrant=quadrant)
+            completed_tasks = completed_tasks.filter(quadrant=quadrant)
         if search:
-            tasks = tasks.filter(
+            completed_tasks = completed_tasks.filter(
                 Q(title__icontains=search) | Q(description__icontains=search)
             )
+        if status and status != 'DONE':
+            completed_tasks = completed_tasks.none()
+        yield 'tasks/dashboard/completed.html', {'completed_tasks': completed_tasks.order_by('-updated_at')[:10]}
     
-    # Séparer les tâches par quadrant
-    q1_tasks = tasks.filter(quadrant='Q1').exclude(status='DONE').order_by('-urgency_score', 'due_date')
-    q2_tasks = tasks.filter(quadrant='Q2').exclude(status='DONE').order_by('-importance_score', 'due_date')
-    q3_tasks = tasks.filter(quadrant='Q3').exclude(status='DONE').order_by('due_date')
-    q4_tasks = tasks.filter(quadrant='Q4').exclude(status='DONE').order_by('due_date')
-    
-    # Tâches complétées (pour affichage séparé)
-    completed_tasks = tasks.filter(status='DONE').order_by('-updated_at')[:10]
-    
-    # Obtenir les insights de productivité
-    insights = TaskIntelligenceService.get_productivity_insights(request.user)
-    
-    # Obtenir les alertes
-    alerts = TaskIntelligenceService.check_and_send_alerts(request.user)
-    
-    # Tâche recommandée
-    recommended_task = TaskIntelligenceService.get_next_recommended_task(request.user)
-    
-    # Formulaire pour ajout rapide
-    quick_form = QuickTaskForm()
-    
-    context = {
-        'q1_tasks': q1_tasks,
-        'q2_tasks': q2_tasks,
-        'q3_tasks': q3_tasks,
-        'q4_tasks': q4_tasks,
-        'completed_tasks': completed_tasks,
-        'insights': insights,
-        'alerts': alerts,
-        'recommended_task': recommended_task,
-        'quick_form': quick_form,
-        'filter_form': filter_form,
-        'total_active': tasks.exclude(status='DONE').count(),
-    }
-    
-    return render(request, 'tasks/dashboard.html', context)
+    return stream_page(request, 'tasks/dashboard.html', {'filter_form': filter_form}, sections())
+
+
+def _warn_duplicates(request, form):
+    """Signale les quasi-doublons trouvés à l'enregistrement du formulaire."""
+    if form.duplicates:
+        titles = ', '.join(f'« {title} »' for _, _, title in form.duplicates)
+        messages.warning(request, f'⚠️ Tâche(s) similaire(s) déjà présente(s) : {titles}.')
 
 
 @login_required
@@ -84,24 +116,25 @@ def task_create(request):
     Vue pour créer une nouvelle tâche.
     """
     if request.method == 'POST':
-        form = TaskForm(request.POST)
+        form = TaskForm(request.POST, user=request.user)
         if form.is_valid():
             task = form.save(commit=False)
             task.user = request.user
             task.save()
+            form.save_m2m()
             
             messages.success(
                 request, 
                 f'✅ Tâche "{task.title}" créée avec succès dans {task.get_quadrant_display()}!'
             )
+            _warn_duplicates(request, form)
             
-            # Mettre à jour les statistiques
-            stats, _ = TaskStatistics.objects.get_or_create(user=request.user)
-            stats.update_statistics()
+            # Mettre à jour les statistiques (tâche de fond)
+            schedule_statistics_update(request.user.pk)
             
             return redirect('tasks:dashboard')
     else:
-        form = TaskForm()
+        form = TaskForm(user=request.user)
     
     context = {
         'form': form,
@@ -122,12 +155,13 @@ def task_quick_create(request):
         if form.is_valid():
             task = form.save(commit=False, user=request.user)
             task.save()
+            form.save_m2m()
             
             messages.success(request, f'✅ Tâche "{task.title}" ajoutée !')
+            _warn_duplicates(request, form)
             
-            # Mettre à jour les statistiques
-            stats, _ = TaskStatistics.objects.get_or_create(user=request.user)
-            stats.update_statistics()
+            # Mettre à jour les statistiques (tâche de fond)
+            schedule_statistics_update(request.user.pk)
             
             return redirect('tasks:dashboard')
     
@@ -138,20 +172,47 @@ def task_quick_create(request):
 def task_update(request, pk):
     """
     Vue pour modifier une tâche existante.
+    
+    La version affichée dans le formulaire est comparée à celle de la
+    ligne, verrouillée jusqu'à l'enregistrement : une modification
+    concurrente (changement de statut, déplacement...) n'est pas écrasée
+    en silence, le formulaire est réaffiché avec un avertissement (409).
     """
     task = get_object_or_404(Task, pk=pk, user=request.user)
+    status = 200
     
     if request.method == 'POST':
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
-            task = form.save()
+            with transaction.atomic():
+                current = get_object_or_404(
+                    Task.objects.select_for_update().filter(user=request.user).values_list('version', flat=True),
+                    pk=pk,
+                )
+                expected = form.cleaned_data['version']
+                conflict = current != (task.version if expected is None else expected)
+                if not conflict:
+                    task = form.save()
             
-            messages.success(
-                request, 
-                f'✅ Tâche "{task.title}" mise à jour dans {task.get_quadrant_display()}!'
-            )
+            if not conflict:
+                messages.success(
+                    request, 
+                    f'✅ Tâche "{task.title}" mise à jour dans {task.get_quadrant_display()}!'
+                )
+                _warn_duplicates(request, form)
+                
+                # Tâche récurrente terminée : créer l'occurrence suivante
+                if 'status' in form.changed_data and task.status == 'DONE' and task.recurrence:
+                    task.spawn_next_occurrence()
+                    schedule_statistics_update(request.user.pk)
+                
+                return redirect('tasks:dashboard')
             
-            return redirect('tasks:dashboard')
+            # Un second envoi enregistre le formulaire sur la version courante
+            form.data = form.data.copy()
+            form.data['version'] = current
+            form.add_error(None, 'Cette tâche a été modifiée entre-temps : vérifiez vos changements puis enregistrez à nouveau.')
+            status = 409
     else:
         form = TaskForm(instance=task)
     
@@ -162,7 +223,7 @@ def task_update(request, pk):
         'button_text': 'Enregistrer les modifications',
     }
     
-    return render(request, 'tasks/task_form.html', context)
+    return render(request, 'tasks/task_form.html', context, status=status)
 
 
 @login_required
@@ -174,13 +235,16 @@ def task_delete(request, pk):
     
     if request.method == 'POST':
         task_title = task.title
-        task.delete()
+        with transaction.atomic():
+            # Trace pour les clients synchronisés (`tasks/sync.py`)
+            TaskTombstone.record([task])
+            detach_tasks([task], using=task._state.db)
+            task.delete()
         
         messages.success(request, f'🗑️ Tâche "{task_title}" supprimée.')
         
-        # Mettre à jour les statistiques
-        stats, _ = TaskStatistics.objects.get_or_create(user=request.user)
-        stats.update_statistics()
+        # Mettre à jour les statistiques (tâche de fond)
+        schedule_statistics_update(request.user.pk)
         
         return redirect('tasks:dashboard')
     
@@ -191,31 +255,76 @@ def task_delete(request, pk):
     return render(request, 'tasks/task_confirm_delete.html', context)
 
 
+def _expected_version(request):
+    """Version de la tâche connue du client (champ POST `version`), ou None."""
+    try:
+        return int(request.POST['version'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _conflict_response(request, pk):
+    """
+    Réponse à une modification refusée : 404 si la tâche n'existe pas,
+    sinon 409 avec l'état courant pour que le client puisse réessayer.
+    """
+    current = get_object_or_404(
+        Task.objects.filter(user=request.user).values('version', 'status', 'quadrant'), pk=pk
+    )
+    message = 'Cette tâche a été modifiée entre-temps, veuillez réessayer.'
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': False, 'conflict': True, 'message': message, **current}, status=409)
+    
+    messages.warning(request, message)
+    return redirect('tasks:dashboard')
+
+
 @login_required
 @require_POST
 def task_toggle_status(request, pk):
     """
     Vue AJAX pour basculer le statut d'une tâche (TODO <-> DONE).
+    
+    Un seul UPDATE conditionnel, le nouveau statut étant calculé en SQL :
+    deux clics concurrents ne peuvent pas s'annuler en silence. La ligne
+    écrite est relue ensuite pour la réponse et l'occurrence suivante
+    (MySQL n'a pas d'`UPDATE ... RETURNING`), sans la réécrire.
     """
-    task = get_object_or_404(Task, pk=pk, user=request.user)
+    tasks = Task.objects.filter(user=request.user)
+    toggled = Case(When(status='DONE', then=Value('TODO')), default=Value('DONE'))
+    if not tasks.update_if_version(pk, _expected_version(request), status=toggled):
+        return _conflict_response(request, pk)
+    task = tasks.get(pk=pk)
+    new_status = task.status
     
-    if task.status == 'DONE':
-        task.status = 'TODO'
-        message = f'Tâche "{task.title}" marquée comme à faire'
-    else:
-        task.status = 'DONE'
+    unblocked = []
+    if new_status == 'DONE':
         message = f'✅ Tâche "{task.title}" complétée !'
+        # Tâches dont c'était la dernière dépendance non terminée
+        unblocked = list(unblocked_by(task).values_list('title', flat=True)[:UNBLOCKED_LIMIT + 1])
+        if unblocked:
+            titles = ', '.join(f'"{title}"' for title in unblocked[:UNBLOCKED_LIMIT])
+            more = '…' if len(unblocked) > UNBLOCKED_LIMIT else ''
+            message += f' Débloque : {titles}{more}.'
+    else:
+        message = f'Tâche "{task.title}" marquée comme à faire'
     
-    task.save()
+    # Tâche récurrente terminée : créer l'occurrence suivante
+    if task.status == 'DONE' and task.recurrence:
+        next_task = task.spawn_next_occurrence()
+        if next_task:
+            message += f' Prochaine occurrence le {timezone.localtime(next_task.due_date):%d/%m/%Y}.'
     
-    # Mettre à jour les statistiques
-    stats, _ = TaskStatistics.objects.get_or_create(user=request.user)
-    stats.update_statistics()
+    # Mettre à jour les statistiques (tâche de fond)
+    schedule_statistics_update(request.user.pk)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
             'new_status': task.status,
+            'version': task.version,
+            'unblocked': unblocked[:UNBLOCKED_LIMIT],
             'message': message
         })
     
@@ -228,32 +337,46 @@ def task_toggle_status(request, pk):
 def task_update_quadrant(request, pk):
     """
     Vue AJAX pour déplacer une tâche vers un autre quadrant (drag & drop).
+    
+    Un seul UPDATE conditionnel (scores et quadrant cible sont connus
+    d'avance) ; si le client envoie `version`, la modification est refusée
+    (409) quand la tâche a changé entre-temps. Sinon, la nouvelle version
+    est relue pour la réponse.
     """
-    task = get_object_or_404(Task, pk=pk, user=request.user)
     new_quadrant = request.POST.get('quadrant')
+    if new_quadrant not in Task.QUADRANT_SCORES:
+        return JsonResponse({'success': False}, status=400)
     
-    if new_quadrant in ['Q1', 'Q2', 'Q3', 'Q4']:
-        # Calculer les nouveaux scores basés sur le quadrant cible
-        quadrant_scores = {
-            'Q1': {'urgency': 5, 'importance': 5},
-            'Q2': {'urgency': 2, 'importance': 5},
-            'Q3': {'urgency': 5, 'importance': 2},
-            'Q4': {'urgency': 2, 'importance': 2},
-        }
-        
-        scores = quadrant_scores[new_quadrant]
-        task.urgency_score = scores['urgency']
-        task.importance_score = scores['importance']
-        task.save()
-        
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({
-                'success': True,
-                'new_quadrant': task.quadrant,
-                'message': f'Tâche déplacée vers {task.get_quadrant_display()}'
-            })
+    # Nouveaux scores basés sur le quadrant cible
+    scores = Task.QUADRANT_SCORES[new_quadrant]
+    expected = _expected_version(request)
+    updated = Task.objects.filter(user=request.user).update_if_version(
+        pk, expected,
+        urgency_score=scores['urgency'],
+        importance_score=scores['importance'],
+        quadrant=new_quadrant,
+    )
+    if not updated:
+        return _conflict_response(request, pk)
+    
+    # Sans version du client, la version écrite est relue
+    if expected is None:
+        version = Task.objects.filter(user=request.user, pk=pk).values_list('version', flat=True).first()
+    else:
+        version = expected + 1
+    
+    message = f'Tâche déplacée vers {dict(Task.QUADRANT_CHOICES)[new_quadrant]}'
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': True,
+            'new_quadrant': new_quadrant,
+            'version': version,
+            'message': message
+        })
     
-    return JsonResponse({'success': False}, status=400)
+    messages.success(request, message)
+    return redirect('tasks:dashboard')
 
 
 @login_required
@@ -264,39 +387,106 @@ def statistics(request):
     stats, _ = TaskStatistics.objects.get_or_create(user=request.user)
     stats.update_statistics()
     
-    tasks = Task.objects.filter(user=request.user)
-    
-    # Statistiques par quadrant
-    quadrant_stats = {
-        'Q1': {
-            'total': tasks.filter(quadrant='Q1').count(),
-            'completed': tasks.filter(quadrant='Q1', status='DONE').count(),
-            'active': tasks.filter(quadrant='Q1').exclude(status='DONE').count(),
-        },
-        'Q2': {
-            'total': tasks.filter(quadrant='Q2').count(),
-            'completed': tasks.filter(quadrant='Q2', status='DONE').count(),
-            'active': tasks.filter(quadrant='Q2').exclude(status='DONE').count(),
-        },
-        'Q3': {
-            'total': tasks.filter(quadrant='Q3').count(),
-            'completed': tasks.filter(quadrant='Q3', status='DONE').count(),
-            'active': tasks.filter(quadrant='Q3').exclude(status='DONE').count(),
-        },
-        'Q4': {
-            'total': tasks.filter(quadrant='Q4').count(),
-            'completed': tasks.filter(quadrant='Q4', status='DONE').count(),
-            'active': tasks.filter(quadrant='Q4').exclude(status='DONE').count(),
-        },
-    }
+    # Délais, respect des échéances et tendances (tâches + archives, en cache)
+    analytics = get_analytics(request.user, now=request_now(request))
     
     # Insights
-    insights = TaskIntelligenceService.get_productivity_insights(request.user)
+    insights = TaskIntelligenceService.get_productivity_insights(
+        request.user, matrix=TaskMatrix.for_request(request)
+    )
     
     context = {
         'stats': stats,
-        'quadrant_stats': quadrant_stats,
+        'quadrant_stats': analytics['quadrants'],
+        'analytics': analytics,
         'insights': insights,
     }
     
     return render(request, 'tasks/statistics.html', context)
+
+
+@login_required
+def task_archive(request):
+    """
+    Vue de l'historique des tâches archivées (paginé).
+    """
+    archives = TaskArchive.objects.filter(user=request.user).defer('description_zlib')
+    page = Paginator(archives, 50).get_page(request.GET.get('page'))
+    
+    context = {
+        'page': page,
+        'archived_count': page.paginator.count,
+    }
+    
+    return render(request, 'tasks/archive.html', context)
+
+
+@login_required
+@require_POST
+def task_restore(request, pk):
+    """
+    Restaure une tâche archivée dans la table des tâches.
+    """
+    archive = get_object_or_404(TaskArchive, pk=pk, user=request.user)
+    task = archive.restore()
+    
+    messages.success(request, f'♻️ Tâche "{task.title}" restaurée.')
+    
+    return redirect('tasks:task_archive')
+
+
+@login_required
+def calendar_settings(request):
+    """
+    Adresse d'abonnement au flux iCalendar des échéances.
+    Un POST régénère le jeton (l'ancienne adresse cesse de fonctionner).
+    """
+    feed, _ = CalendarFeed.objects.get_or_create(user=request.user)
+    
+    if request.method == 'POST':
+        feed.regenerate()
+        messages.success(request, '🔑 Nouvelle adresse de flux générée.')
+        return redirect('tasks:calendar_settings')
+    
+    feed_url = request.build_absolute_uri(reverse('tasks:calendar_feed', args=[feed.token]))
+    
+    context = {
+        'feed_url': feed_url,
+        'todo_url': feed_url + '?kind=todo',
+        'webcal_url': 'webcal://' + feed_url.split('://', 1)[1],
+    }
+    
+    return render(request, 'tasks/calendar.html', context)
+
+
+@require_safe
+def calendar_feed(request, token):
+    """
+    Flux iCalendar des échéances, authentifié par le jeton de l'URL.
+    
+    Répond 304 si le flux n'a pas changé (ETag / Last-Modified), sinon
+    produit les entrées au fil de l'eau. Voir `tasks/ical.py`.
+    """
+    feed = get_object_or_404(CalendarFeed.objects.select_related('user'), token=token)
+    kind = request.GET.get('kind')
+    if kind not in KINDS:
+        kind = KINDS[0]
+    
+    now = request_now(request)
+    version, last_modified = feed_version(feed.user, now, kind)
+    etag = quote_etag(version)
+    last_modified = int(last_modified.timestamp())
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            iter_feed(feed.user, now, kind),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="echeances.ics"'
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Toujours revalider : la réponse est propre au jeton
+    response['Cache-Control'] = 'private, no-cache'
+    return response
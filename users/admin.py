@@ -1,3 +1,35 @@
-from django.contrib import admin
+"""
+Configuration de l'interface d'administration pour les utilisateurs.
+"""
 
-# Register your models here.
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+
+from tasks.jobs import schedule_user_purge
+
+
+@admin.action(description='Supprimer par lots (tâche de fond)')
+def purge_users(modeladmin, request, queryset):
+    """
+    Planifie la suppression des utilisateurs sélectionnés et de leur
+    historique par courtes transactions (voir `tasks.jobs.purge_user`).
+    """
+    user_ids = list(queryset.exclude(pk=request.user.pk).values_list('pk', flat=True))
+    for user_id in user_ids:
+        schedule_user_purge(user_id)
+    modeladmin.message_user(
+        request, f'Suppression planifiée pour {len(user_ids)} utilisateur(s).', messages.SUCCESS
+    )
+
+
+class UserAdmin(BaseUserAdmin):
+    """
+    Administration des utilisateurs, avec la suppression par lots adaptée
+    aux comptes ayant un gros historique de tâches.
+    """
+    actions = [purge_users]
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,21 @@
+"""
+Hachage des mots de passe.
+
+PBKDF2 (même algorithme et même format que le hacheur par défaut de Django)
+dont le coût est réglé par `PASSWORD_HASH_ITERATIONS`. Quand ce réglage
+change, les mots de passe existants sont re-hachés au coût courant lors de
+la connexion suivante (`must_update`), sans action des utilisateurs.
+
+Mesurer le coût d'une connexion : `python manage.py loginbench`.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher as DjangoPBKDF2PasswordHasher
+
+
+class PBKDF2PasswordHasher(DjangoPBKDF2PasswordHasher):
+    """PBKDF2-SHA256 avec un nombre d'itérations configurable."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,123 @@
+"""
+Banc d'essai de la connexion : débit et coût CPU par connexion.
+
+Mesure d'abord le coût d'un hachage du mot de passe au coût configuré,
+puis enchaîne des connexions complètes (POST sur la vue de connexion) et
+en déduit le nombre de hachages par connexion.
+
+Usage :
+    python manage.py loginbench --logins 50
+    python manage.py loginbench --iterations 600000 --concurrency 4
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+USERNAME = 'loginbench'
+PASSWORD = 'Banc-d-essai-2024!'
+
+
+def _login(count):
+    """Effectue `count` connexions ; retourne (latences, statuts)."""
+    client = Client(HTTP_HOST='127.0.0.1')
+    url = reverse('users:login')
+    latencies = []
+    statuses = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post(url, {'username': USERNAME, 'password': PASSWORD})
+            latencies.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+            client.cookies.clear()  # Session suivante : nouvel utilisateur anonyme
+    finally:
+        connections.close_all()
+    return latencies, statuses
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Banc d'essai de la connexion : connexions/s et temps CPU par connexion."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50, help="Nombre de connexions")
+        parser.add_argument('--concurrency', type=int, default=1, help="Connexions en parallèle (threads)")
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            help="Coût PBKDF2 à mesurer (défaut : PASSWORD_HASH_ITERATIONS)",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        if options['logins'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--logins et --concurrency doivent être positifs")
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+            user, _ = User.objects.get_or_create(username=USERNAME)
+            user.set_password(PASSWORD)
+            user.save(update_fields=['password'])
+            try:
+                hash_cpu = self._measure_hash(user.password)
+                wall, cpu, latencies, statuses = self._measure_logins(options['logins'], options['concurrency'])
+            finally:
+                user.delete()
+
+        self._report(iterations, hash_cpu, wall, cpu, latencies, statuses, options['concurrency'])
+
+    def _measure_hash(self, encoded, rounds=5):
+        """Temps CPU (s) d'une vérification du mot de passe."""
+        hasher = get_hasher()
+        start = time.process_time()
+        for _ in range(rounds):
+            hasher.verify(PASSWORD, encoded)
+        return (time.process_time() - start) / rounds
+
+    def _measure_logins(self, logins, concurrency):
+        shares = [logins // concurrency + (1 if i < logins % concurrency else 0) for i in range(concurrency)]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(_login, [share for share in shares if share]))
+        cpu = time.process_time() - start_cpu
+        wall = time.perf_counter() - start_wall
+
+        latencies = [latency for user_latencies, _ in results for latency in user_latencies]
+        statuses = [status for _, user_statuses in results for status in user_statuses]
+        return wall, cpu, latencies, statuses
+
+    def _report(self, iterations, hash_cpu, wall, cpu, latencies, statuses, concurrency):
+        logins = len(latencies)
+        failed = sum(1 for status in statuses if status != 302)
+        cpu_per_login = cpu / logins
+
+        self.stdout.write("")
+        self.stdout.write(f"Hacheur : {get_hasher().algorithm}, {iterations} itérations")
+        self.stdout.write(f"Coût d'un hachage : {hash_cpu * 1000:.1f} ms CPU")
+        self.stdout.write(
+            f"Connexions : {logins} en {wall:.2f} s ({logins / wall:.1f}/s, {concurrency} thread(s))"
+            + (f", {failed} échec(s)" if failed else "")
+        )
+        self.stdout.write(f"CPU par connexion : {cpu_per_login * 1000:.1f} ms")
+        self.stdout.write(f"Hachages par connexion (estimés) : {cpu_per_login / hash_cpu:.2f}")
+        self.stdout.write(
+            f"Latence (ms) : moy. {statistics.fmean(latencies) * 1000:.1f}, "
+            f"p50 {_percentile(latencies, 50) * 1000:.1f}, p90 {_percentile(latencies, 90) * 1000:.1f}, "
+            f"max {max(latencies) * 1000:.1f}"
+        )
@@ -1,3 +1,50 @@
-from django.test import TestCase
+"""
+Tests de la connexion : un seul hachage du mot de passe par connexion et
+re-hachage transparent quand le coût configuré change.
+"""
 
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth.hashers import identify_hasher
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .hashers import PBKDF2PasswordHasher
+
+
+PASSWORD = 'motdepasse-solide'
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password=PASSWORD)
+
+    def login(self, password=PASSWORD):
+        return self.client.post(reverse('users:login'), {'username': 'alice', 'password': password})
+
+    def test_login_hashes_the_password_once(self):
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.encode) as encode:
+            response = self.login()
+
+        self.assertRedirects(response, reverse('tasks:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_wrong_password(self):
+        response = self.login('mauvais')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_password_is_rehashed_when_cost_changes(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.login()
+
+        self.user.refresh_from_db()
+        decoded = identify_hasher(self.user.password).decode(self.user.password)
+        self.assertEqual(decoded['iterations'], 2000)
+        self.assertTrue(self.user.check_password(PASSWORD))
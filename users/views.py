@@ -3,7 +3,7 @@ Vues pour l'authentification des utilisateurs.
 """
 
 from django.shortcuts import render, redirect
-from django.contrib.auth import login, authenticate, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -40,6 +40,10 @@ def register(request):
 def user_login(request):
     """
     Vue pour la connexion d'un utilisateur.
+    
+    `AuthenticationForm.is_valid()` authentifie déjà l'utilisateur : on
+    réutilise `form.get_user()` plutôt que de hacher le mot de passe une
+    seconde fois avec `authenticate()`.
     """
     if request.user.is_authenticated:
         return redirect('tasks:dashboard')
@@ -47,17 +51,13 @@ def user_login(request):
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'👋 Bon retour, {user.get_username()} !')
             
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'👋 Bon retour, {username} !')
-                
-                # Redirection vers la page demandée ou dashboard
-                next_page = request.GET.get('next', 'tasks:dashboard')
-                return redirect(next_page)
+            # Redirection vers la page demandée ou dashboard
+            next_page = request.GET.get('next', 'tasks:dashboard')
+            return redirect(next_page)
         else:
             messages.error(request, '❌ Nom d\'utilisateur ou mot de passe incorrect.')
     else: